@@ -0,0 +1,97 @@
+"""
+cron 引擎基准测试
+用逐分钟扫描校验位集合 cron 引擎的下一次执行时间，并统计大量任务下的编译和计算耗时
+
+运行方式: python benchmarks/cron_bench.py
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.services.cron import CronExpression
+
+TASK_COUNT = 5000
+VERIFY_COUNT = 40
+SEED = 20250316
+
+FIXED_EXPRESSIONS = [
+    "30 21 * * 3",
+    "15 21 * * 0,1,2,3,4,5,0",
+    "*/5 * * * *",
+    "0 9-18/3 * * mon-fri",
+    "0 0 1 * *",
+    "0 12 13 * 5",
+    "59 23 31 12 *",
+    "0 8 29 2 *",
+    "5/15 8 * jan,jul sun",
+]
+
+
+def random_expression(rng):
+    minute = rng.choice(["*", "*/5", str(rng.randint(0, 59)), f"{rng.randint(0, 29)}-{rng.randint(30, 59)}"])
+    hour = rng.choice(["*", str(rng.randint(0, 23)), f"{rng.randint(0, 11)}-{rng.randint(12, 23)}/2"])
+    day = rng.choice(["*", "*", str(rng.randint(1, 28)), "1,15"])
+    month = rng.choice(["*", "*", str(rng.randint(1, 12)), "3-9"])
+    weekday = rng.choice(["*", "*", str(rng.randint(0, 7)), "1-5", "sat,sun"])
+    return f"{minute} {hour} {day} {month} {weekday}"
+
+
+def brute_force_next(cron, after, limit_days=800):
+    """逐分钟扫描得到的参考结果"""
+    dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    end = dt + timedelta(days=limit_days)
+    while dt < end:
+        day_ok = cron.days >> dt.day & 1
+        weekday_ok = cron.weekdays >> (dt.isoweekday() % 7) & 1
+        if cron.days_any or cron.weekdays_any:
+            date_ok = day_ok and weekday_ok
+        else:
+            date_ok = day_ok or weekday_ok
+        if (cron.minutes >> dt.minute & 1 and cron.hours >> dt.hour & 1
+                and cron.months >> dt.month & 1 and date_ok):
+            return dt
+        dt += timedelta(minutes=1)
+    return None
+
+
+def run_benchmark():
+    rng = random.Random(SEED)
+    now = datetime(2025, 3, 16, 17, 39, 12)
+
+    verify = FIXED_EXPRESSIONS + [random_expression(rng) for _ in range(VERIFY_COUNT)]
+    mismatches = []
+    for expression in verify:
+        cron = CronExpression(expression)
+        expected = brute_force_next(cron, now)
+        actual = cron.next_after(now)
+        if expected is not None and actual != expected:
+            mismatches.append((expression, expected, actual))
+
+    expressions = [random_expression(rng) for _ in range(TASK_COUNT)]
+    start = time.perf_counter()
+    compiled = [CronExpression(expression) for expression in expressions]
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for cron in compiled:
+        fire = now
+        for _ in range(10):
+            fire = cron.next_after(fire)
+    next_us = (time.perf_counter() - start) * 1e6 / (TASK_COUNT * 10)
+
+    print(f"校验表达式: {len(verify)} 条，与逐分钟扫描结果不一致: {len(mismatches)} 条")
+    for expression, expected, actual in mismatches:
+        print(f"  {expression}: 期望 {expected}, 实际 {actual}")
+    print(f"编译 {TASK_COUNT} 条表达式: {compile_ms:.1f}ms")
+    print(f"计算下一次执行时间: 平均 {next_us:.1f}us/次")
+    print(f"示例: '30 21 * * 3' 下一次执行 {CronExpression('30 21 * * 3').next_after(now)} (周三)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,139 @@
+"""
+意图识别基准测试
+对比统一意图路由器与原先各处理器分别扫描消息的耗时，并校验识别结果一致
+
+运行方式: python benchmarks/intent_router_bench.py
+"""
+
+import os
+import re
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.handlers.intent import (
+    IntentRouter, INTENT_VOICE, INTENT_RANDOM_IMAGE, INTENT_IMAGE_GENERATION,
+    INTENT_DEBUG, INTENT_REMINDER
+)
+
+ITERATIONS = 2000
+
+CORPUS = [
+    "晚安",
+    "你在干嘛呀，今天好累",
+    "[2025-03-16 17:39:00]\n你好呀\n在干嘛呢\n我刚下班，好想吃火锅",
+    "来张图",
+    "发个语音给我听听",
+    "帮我画一只可爱的小猫",
+    "/help",
+    "三分钟后提醒我喝水",
+    "明天早上八点叫我起床，记得哦",
+    "今天天气真好，我们出去玩吧，去公园散步，然后吃冰淇淋",
+    "我想要一张风景图",
+    "能给我画画吗",
+    "哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈哈",
+    "发送了表情包：一只猫在睡觉",
+]
+
+
+# —— 原实现（从各处理器中复制，作为对照） ——
+
+def legacy_is_voice_request(text):
+    voice_keywords = ["语音"]
+    return any(keyword in text for keyword in voice_keywords)
+
+
+def legacy_is_random_image_request(message):
+    basic_patterns = [r'来个图', r'来张图', r'来点图', r'想看图']
+    message = message.lower()
+    if any(pattern in message for pattern in basic_patterns):
+        return True
+    complex_patterns = [r'来[张个幅]图', r'发[张个幅]图', r'看[张个幅]图']
+    if any(re.search(pattern, message) for pattern in complex_patterns):
+        return True
+    return False
+
+
+def legacy_is_image_generation_request(text):
+    draw_verbs = ["画", "绘", "生成", "创建", "做"]
+    image_nouns = ["图", "图片", "画", "照片", "插画", "像"]
+    quantity = ["一下", "一个", "一张", "个", "张", "幅"]
+    patterns = [
+        r"画.*[猫狗人物花草山水]", r"画.*[一个张只条串份副幅]", r"帮.*画.*", r"给.*画.*",
+        r"生成.*图", r"创建.*图", r"能.*画.*吗", r"可以.*画.*吗", r"要.*[张个幅].*图",
+        r"想要.*图", r"做[一个张]*.*图", r"画画", r"画一画",
+    ]
+    if any(re.search(pattern, text) for pattern in patterns):
+        return True
+    for verb in draw_verbs:
+        for noun in image_nouns:
+            if f"{verb}{noun}" in text:
+                return True
+            for q in quantity:
+                if f"{verb}{q}{noun}" in text:
+                    return True
+                if f"{verb}{noun}{q}" in text:
+                    return True
+    special_phrases = [
+        "帮我画", "给我画", "帮画", "给画", "能画吗", "可以画吗", "会画吗",
+        "想要图", "要图", "需要图",
+    ]
+    return any(phrase in text for phrase in special_phrases)
+
+
+def legacy_is_debug_command(message):
+    return message.strip().startswith("/")
+
+
+def legacy_has_reminder_keyword(text):
+    return any(k in text for k in ['提醒我', '提醒', '叫我', '叫醒我', '喊我', '记得',
+                                   '别忘了', '别忘记', '通知我', '定个闹钟', '闹钟'])
+
+
+def legacy_route(text):
+    intents = set()
+    if legacy_is_debug_command(text):
+        intents.add(INTENT_DEBUG)
+    if legacy_is_voice_request(text):
+        intents.add(INTENT_VOICE)
+    if legacy_is_random_image_request(text):
+        intents.add(INTENT_RANDOM_IMAGE)
+    if legacy_is_image_generation_request(text):
+        intents.add(INTENT_IMAGE_GENERATION)
+    if legacy_has_reminder_keyword(text):
+        intents.add(INTENT_REMINDER)
+    return intents
+
+
+def bench(func):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for text in CORPUS:
+            func(text)
+    return (time.perf_counter() - start) * 1e6 / (ITERATIONS * len(CORPUS))
+
+
+def run_benchmark():
+    compile_start = time.perf_counter()
+    router = IntentRouter()
+    compile_ms = (time.perf_counter() - compile_start) * 1000
+
+    mismatches = [t for t in CORPUS if legacy_route(t) != router.route(t)]
+
+    legacy_us = bench(legacy_route)
+    router_us = bench(router.route)
+    print(f"语料条数: {len(CORPUS)}, 迭代次数: {ITERATIONS}")
+    print(f"路由器编译耗时: {compile_ms:.2f}ms")
+    print(f"原实现(逐个处理器扫描): {legacy_us:.2f}us/条")
+    print(f"统一意图路由器: {router_us:.2f}us/条")
+    print(f"加速比: {legacy_us / router_us:.1f}x")
+    if mismatches:
+        print(f"识别结果不一致: {mismatches}")
+    else:
+        print("识别结果与原实现一致")
+
+
+if __name__ == "__main__":
+    run_benchmark()
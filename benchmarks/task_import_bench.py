@@ -0,0 +1,87 @@
+"""
+定时任务导入基准测试
+对比逐个添加（每次重写整个任务文件）与批量同步（校验后只写一次）的耗时
+
+运行方式: python benchmarks/task_import_bench.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.AutoTasker.autoTasker import AutoTasker
+
+TASK_COUNT = 1000
+
+
+class _NullMessageHandler:
+    def add_to_queue(self, **kwargs):
+        pass
+
+
+def make_tasks(count, suffix=""):
+    tasks = []
+    for i in range(count):
+        if i % 2:
+            schedule_type, schedule_time = 'cron', f"{i % 60} {i % 24} * * {i % 7}"
+        else:
+            schedule_type, schedule_time = 'interval', str(3600 + i)
+        tasks.append({
+            'task_id': f"task_{i}",
+            'chat_id': "文件传输助手",
+            'content': f"定时消息 {i}{suffix}",
+            'schedule_type': schedule_type,
+            'schedule_time': schedule_time,
+            'is_active': True
+        })
+    return tasks
+
+
+def legacy_import(path, tasks):
+    """原实现：每添加一个任务就把全部任务重新写入文件"""
+    saved = {}
+    for task in tasks:
+        saved[task['task_id']] = task
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(list(saved.values()), f, ensure_ascii=False, indent=4)
+
+
+def run_benchmark():
+    work_dir = tempfile.mkdtemp()
+    try:
+        tasks = make_tasks(TASK_COUNT)
+
+        start = time.perf_counter()
+        legacy_import(os.path.join(work_dir, "legacy.json"), tasks)
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        tasker = AutoTasker(_NullMessageHandler(), os.path.join(work_dir, "tasks.json"))
+        start = time.perf_counter()
+        tasker.sync_tasks(tasks)
+        import_ms = (time.perf_counter() - start) * 1000
+
+        # 模拟网页编辑：修改10个、删除5个
+        edited = make_tasks(TASK_COUNT)[5:]
+        for task in edited[:10]:
+            task['content'] += "（已修改）"
+        start = time.perf_counter()
+        added, changed, removed = tasker.sync_tasks(edited)
+        edit_ms = (time.perf_counter() - start) * 1000
+
+        tasker.clear_jobs()
+        print(f"任务数: {TASK_COUNT}")
+        print(f"原实现(逐个添加，每次重写文件): {legacy_ms:.1f}ms")
+        print(f"批量同步(写一次文件): {import_ms:.1f}ms")
+        print(f"增量同步(新增 {added}，修改 {changed}，删除 {removed}): {edit_ms:.1f}ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_benchmark()
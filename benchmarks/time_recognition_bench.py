@@ -0,0 +1,114 @@
+"""
+时间识别基准测试
+使用典型聊天语料统计本地规则解析能避免多少次LLM调用
+
+运行方式: python benchmarks/time_recognition_bench.py
+"""
+
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.reminder.time_recognition import (
+    LocalTimeParser, PARSE_OK, PARSE_AMBIGUOUS, PARSE_NOT_TIME_RELATED
+)
+
+# 语料：(消息, 是否为提醒请求)
+CORPUS = [
+    # 日常闲聊
+    ("晚安", False),
+    ("早安呀", False),
+    ("你在干嘛", False),
+    ("今天好累啊", False),
+    ("哈哈哈哈哈", False),
+    ("我去洗个澡", False),
+    ("我先去吃饭了", False),
+    ("你吃饭了吗", False),
+    ("今天天气真好", False),
+    ("想你了", False),
+    ("你还记得我吗", False),
+    ("记得多喝水哦", False),
+    ("明天要上班，好烦", False),
+    ("周末去哪玩呢", False),
+    ("我刚下班", False),
+    ("在吗", False),
+    ("给我讲个笑话", False),
+    ("你喜欢什么颜色", False),
+    ("晚上吃火锅", False),
+    ("下午开了三个小时的会", False),
+    ("我8点就起床了", False),
+    ("好的", False),
+    ("嗯嗯", False),
+    ("来张图", False),
+    ("发个语音给我听听", False),
+    ("你是谁", False),
+    ("今天是星期几", False),
+    ("好想睡觉", False),
+    ("我不开心", False),
+    ("别忘了你是我的小助手", False),
+    ("[2025-03-16 17:39:00]\n今天加班到十点", False),
+    ("[2025-03-16 17:39:00]\n你好呀\n在干嘛呢", False),
+    ("考试考砸了", False),
+    ("刚刚看了一部电影", False),
+    ("猫咪好可爱", False),
+    # 明确的提醒请求
+    ("三分钟后叫我", True),
+    ("十分钟后提醒我喝水", True),
+    ("半小时后提醒我关火", True),
+    ("一个半小时后叫我起来", True),
+    ("过二十分钟提醒我收衣服", True),
+    ("三分钟后提醒我喝水，五分钟后提醒我吃饭", True),
+    ("明天早上八点叫我起床", True),
+    ("明早7点半叫我", True),
+    ("今晚十点提醒我睡觉", True),
+    ("下周三晚上7点提醒我交作业", True),
+    ("周五下午三点提醒我开会", True),
+    ("3月5号下午两点提醒我去医院", True),
+    ("21:30提醒我看电视", True),
+    ("明天下午三点开会记得提醒我", True),
+    ("一刻钟后叫我", True),
+    ("两个小时后提醒我吃药", True),
+    ("[2025-03-16 17:39:00]\n二十分钟后提醒我拿快递", True),
+    # 有提醒意图但时间模糊，需要LLM判断
+    ("待会提醒我吃药", True),
+    ("明天提醒我交作业", True),
+    ("下周三晚上提醒我交作业", True),
+    ("晚点叫我一下", True),
+]
+
+
+def run_benchmark():
+    parser = LocalTimeParser()
+    now = datetime.now()
+    statuses = Counter()
+    misclassified = []
+
+    start = time.perf_counter()
+    for message, is_reminder in CORPUS:
+        status, reminders = parser.parse(message, now)
+        statuses[status] += 1
+        if status == PARSE_OK and not is_reminder:
+            misclassified.append(message)
+        if status == PARSE_NOT_TIME_RELATED and is_reminder:
+            misclassified.append(message)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    total = len(CORPUS)
+    llm_calls = statuses[PARSE_AMBIGUOUS]
+    print(f"语料条数: {total}")
+    print(f"本地判定无需提醒: {statuses[PARSE_NOT_TIME_RELATED]}")
+    print(f"本地解析成功: {statuses[PARSE_OK]}")
+    print(f"回退到LLM: {llm_calls}")
+    print(f"避免的LLM调用比例: {(total - llm_calls) / total:.1%} (原实现每条消息都调用LLM)")
+    print(f"本地解析总耗时: {elapsed_ms:.2f}ms (平均 {elapsed_ms / total:.3f}ms/条)")
+    if misclassified:
+        print(f"误判: {misclassified}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -3,10 +3,15 @@ import json
 import logging
 from typing import List, Dict, Optional
 from datetime import datetime
-from src.services.ai.llm_service import LLMService
+from src.config import LLMSettings
+from src.services.ai.model_router import get_model_router, CALL_MEMORY_SUMMARY
+from src.services.background import get_background_queue
 
 logger = logging.getLogger('main')
 
+# 核心记忆更新最迟在触发后多少秒内执行
+CORE_MEMORY_DEADLINE = 600
+
 class MemoryService:
     """
     新版记忆服务模块，包含两种记忆类型:
@@ -51,16 +56,17 @@ class MemoryService:
             logger.error(f"初始化记忆文件失败: {str(e)}")
 
     def _get_llm_client(self):
-        """获取或创建LLM客户端"""
+        """获取或创建LLM客户端（记忆摘要路由到轻量模型，路由未配置的字段使用构造参数）"""
         if not self.llm_client:
-            self.llm_client = LLMService(
+            fallback = LLMSettings(
                 api_key=self.api_key,
                 base_url=self.base_url,
                 model=self.model,
-                max_token=self.max_token,
-                temperature=self.temperature,
-                max_groups=5  # 这里只需要较小的上下文
+                max_tokens=self.max_token,
+                temperature=self.temperature
             )
+            # 这里只需要较小的上下文
+            self.llm_client = get_model_router().get_service(CALL_MEMORY_SUMMARY, max_groups=5, fallback=fallback)
         return self.llm_client
 
     def _get_avatar_memory_dir(self, avatar_name: str) -> str:
@@ -133,10 +139,13 @@ class MemoryService:
             # 更新对话计数
             self.conversation_count[avatar_name] += 1
             
-            # 每10轮对话更新一次核心记忆
+            # 每10轮对话更新一次核心记忆（放入后台队列，空闲时执行）
             if self.conversation_count[avatar_name] >= 10:
-                logger.info(f"角色 {avatar_name} 达到10轮对话，开始更新核心记忆")
-                self.update_core_memory(avatar_name)
+                logger.info(f"角色 {avatar_name} 达到10轮对话，安排更新核心记忆")
+                get_background_queue().submit(
+                    "core_memory", self.update_core_memory, avatar_name,
+                    deadline=CORE_MEMORY_DEADLINE, key=f"core_memory:{avatar_name}"
+                )
                 self.conversation_count[avatar_name] = 0
                 
         except Exception as e:
@@ -4,5 +4,6 @@
 """
 from .reminder_service import ReminderService
 from .time_recognition import TimeRecognitionService
+from .reminder_store import Reminder, ReminderStore
 
-__all__ = ['ReminderService', 'TimeRecognitionService']
\ No newline at end of file
+__all__ = ['ReminderService', 'TimeRecognitionService', 'Reminder', 'ReminderStore']
\ No newline at end of file
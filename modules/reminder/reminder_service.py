@@ -1,30 +1,80 @@
 """
 提醒服务
-负责管理和执行提醒任务
+负责管理和执行提醒任务，包括:
+- 提醒持久化，重启后自动恢复
+- 同一聊天同一分钟内的提醒合并发送
+- 查询和取消提醒
 """
 
 # 合并 src/services/reminder_service.py 和 modules/reminder/reminder_service.py 的内容
 import logging
-import time
-import random
-from datetime import datetime
-from typing import Dict
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 # 修改后的导入路径
 from src.utils.console import print_status
+from src.utils.metrics import metrics
+from src.services.scheduler import get_scheduler, DateTrigger
+from src.handlers.message_source import MessageSource
+from modules.reminder.reminder_store import Reminder, ReminderStore
 
 logger = logging.getLogger('main')
 
 class ReminderService:
     # 保留原有核心逻辑，合并重复的方法
-    def __init__(self, message_handler):
-        self.scheduler = BackgroundScheduler()
+    def __init__(self, message_handler, store: Optional[ReminderStore] = None):
+        self.scheduler = get_scheduler()
         self.message_handler = message_handler
-        self.active_reminders: Dict[str, dict] = {}
-        self.scheduler.start()
+        self.store = store or ReminderStore()
+        self.active_reminders: Dict[int, Reminder] = {}
+        # 合并桶：同一聊天同一分钟的提醒共用一个调度任务，格式：{bucket_key: [reminder_id]}
+        self.buckets: Dict[str, List[int]] = {}
+        # 提醒所在的合并桶，取消时直接定位，格式：{reminder_id: bucket_key}
+        self.reminder_buckets: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        self._restore_reminders()
         logger.info("统一提醒服务已启动")
 
+    @staticmethod
+    def _bucket_key(chat_id: str, fire_time: datetime) -> str:
+        return f"reminder_{chat_id}_{fire_time.strftime('%Y%m%d%H%M')}"
+
+    def _schedule(self, reminder: Reminder, run_date: datetime):
+        """把提醒放入合并桶，桶内第一条提醒负责创建调度任务"""
+        bucket_key = self._bucket_key(reminder.chat_id, run_date)
+        self.active_reminders[reminder.id] = reminder
+        self.reminder_buckets[reminder.id] = bucket_key
+        if bucket_key in self.buckets:
+            self.buckets[bucket_key].append(reminder.id)
+            return
+        self.buckets[bucket_key] = [reminder.id]
+        self.scheduler.add_job(
+            self._fire_bucket,
+            trigger=DateTrigger(run_date=run_date),
+            args=(bucket_key,),
+            job_id=bucket_key,
+            group="reminder"
+        )
+
+    def _restore_reminders(self):
+        """启动时一次性加载数据库中的全部待执行提醒，已过期的立即补发"""
+        try:
+            pending = self.store.list_pending()
+            now = datetime.now()
+            overdue = 0
+            with self.lock:
+                for reminder in pending:
+                    if reminder.fire_time <= now:
+                        overdue += 1
+                        self._schedule(reminder, now + timedelta(seconds=1))
+                    else:
+                        self._schedule(reminder, reminder.fire_time)
+            if pending:
+                logger.info(f"已恢复 {len(pending)} 条提醒任务，其中 {overdue} 条已过期将立即发送")
+            metrics.set_gauge("reminders.pending", len(self.active_reminders))
+        except Exception as e:
+            logger.error(f"恢复提醒任务失败: {str(e)}")
+
     def add_reminder(self, chat_id: str, target_time: datetime, 
                     content: str, sender_name: str, silent: bool = True) -> bool:
         """
@@ -39,24 +89,13 @@ class ReminderService:
             bool: 是否添加成功
         """
         try:
-            task_id = f"reminder_{chat_id}_{datetime.now().timestamp()}"
-            
-            job = self.scheduler.add_job(
-                self.send_reminder,
-                trigger=DateTrigger(run_date=target_time),
-                args=[chat_id, content, sender_name],
-                id=task_id
-            )
-            
-            self.active_reminders[task_id] = {
-                'chat_id': chat_id,
-                'time': target_time,
-                'content': content,
-                'sender_name': sender_name
-            }
+            reminder = self.store.add(chat_id, target_time, content, sender_name)
+            with self.lock:
+                self._schedule(reminder, target_time)
+                metrics.set_gauge("reminders.pending", len(self.active_reminders))
             
-            self._print_task_info(task_id, "新建", sender_name, target_time, content)
-            logger.info(f"已添加提醒任务: {task_id}")
+            self._print_task_info(reminder.id, "新建", sender_name, target_time, content)
+            logger.info(f"已添加提醒任务: {reminder.id}")
             return True
             
         except Exception as e:
@@ -64,6 +103,67 @@ class ReminderService:
             print_status(f"添加提醒任务失败: {str(e)}", "error", "CROSS")
             return False
 
+    def list_reminders(self, chat_id: Optional[str] = None) -> List[Reminder]:
+        """
+        查询待执行的提醒
+        Args:
+            chat_id: 聊天ID，为空时返回全部
+        Returns:
+            List[Reminder]: 按提醒时间排序的提醒列表
+        """
+        with self.lock:
+            reminders = [r for r in self.active_reminders.values()
+                         if chat_id is None or r.chat_id == chat_id]
+        return sorted(reminders, key=lambda r: r.fire_time)
+
+    def cancel_reminder(self, reminder_id: int, chat_id: Optional[str] = None) -> bool:
+        """
+        取消提醒
+        Args:
+            reminder_id: 提醒ID
+            chat_id: 只允许取消该聊天的提醒，为空时不限制
+        Returns:
+            bool: 是否取消成功
+        """
+        try:
+            with self.lock:
+                reminder = self.active_reminders.get(reminder_id)
+                if reminder is None or (chat_id is not None and reminder.chat_id != chat_id):
+                    return False
+                del self.active_reminders[reminder_id]
+                bucket_key = self.reminder_buckets.pop(reminder_id)
+                ids = self.buckets[bucket_key]
+                ids.remove(reminder_id)
+                if not ids:
+                    del self.buckets[bucket_key]
+                    self.scheduler.remove_job(bucket_key)
+                metrics.set_gauge("reminders.pending", len(self.active_reminders))
+            self.store.remove([reminder_id])
+            logger.info(f"已取消提醒任务: {reminder_id}")
+            return True
+        except Exception as e:
+            logger.error(f"取消提醒任务失败: {str(e)}")
+            return False
+
+    def _fire_bucket(self, bucket_key: str):
+        """发送合并桶中的全部提醒"""
+        with self.lock:
+            ids = self.buckets.pop(bucket_key, [])
+            for rid in ids:
+                self.reminder_buckets.pop(rid, None)
+            reminders = [self.active_reminders.pop(rid) for rid in ids if rid in self.active_reminders]
+            metrics.set_gauge("reminders.pending", len(self.active_reminders))
+        if not reminders:
+            return
+        if len(reminders) > 1:
+            metrics.incr("reminders.coalesced", len(reminders) - 1)
+        contents = "、".join(r.content for r in reminders)
+        self.send_reminder(reminders[0].chat_id, contents, reminders[0].sender_name)
+        try:
+            self.store.remove(r.id for r in reminders)
+        except Exception as e:
+            logger.error(f"删除已发送的提醒失败: {str(e)}")
+
     def send_reminder(self, chat_id: str, content: str, sender_name: str):
         """发送提醒消息"""
         try:
@@ -77,8 +177,10 @@ class ReminderService:
                 chat_id=chat_id,
                 sender_name="System",
                 username="System",
-                is_group=False
+                is_group=False,
+                source=MessageSource.REMINDER
             )
+            metrics.incr("reminders.sent")
             
             # 记录提醒已发送
             print_status(
@@ -88,9 +190,6 @@ class ReminderService:
             )
             logger.info(f"已发送提醒消息给 {sender_name}")
             
-            # 移除已完成的提醒
-            self._remove_reminder(chat_id, content)
-            
         except Exception as e:
             logger.error(f"发送提醒消息失败: {str(e)}")
 
@@ -104,22 +203,7 @@ class ReminderService:
         """
         return f"""现在时间到了，用户之前让你提醒他{content}。请以你的人设中的身份主动找用户聊天。保持角色设定的一致性和上下文的连贯性"""
 
-    def _remove_reminder(self, chat_id: str, content: str):
-        """
-        移除已完成的提醒
-        Args:
-            chat_id: 聊天ID
-            content: 提醒内容
-        """
-        task_id = next(
-            (tid for tid, task in self.active_reminders.items() 
-             if task['chat_id'] == chat_id and task['content'] == content),
-            None
-        )
-        if task_id:
-            del self.active_reminders[task_id]
-
-    def _print_task_info(self, task_id: str, action: str, 
+    def _print_task_info(self, task_id: int, action: str, 
                         sender_name: str, target_time: datetime, content: str):
         """
         打印任务信息
@@ -0,0 +1,107 @@
+"""
+提醒存储模块
+负责持久化提醒任务，包括:
+- 新增、删除提醒记录
+- 按聊天查询待执行的提醒
+- 启动时一次性加载全部待执行提醒
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from src.services.database import Session, ReminderRecord
+
+logger = logging.getLogger('main')
+
+
+@dataclass
+class Reminder:
+    """提醒任务"""
+    id: int
+    chat_id: str
+    sender_name: str
+    content: str
+    fire_time: datetime
+
+
+def _to_reminder(record: ReminderRecord) -> Reminder:
+    return Reminder(
+        id=record.id,
+        chat_id=record.chat_id,
+        sender_name=record.sender_name,
+        content=record.content,
+        fire_time=record.fire_time
+    )
+
+
+class ReminderStore:
+    """基于 SQLite 的提醒存储（reminders 表，按 chat_id 和 fire_time 建索引）"""
+
+    def __init__(self, session_factory=Session):
+        self.session_factory = session_factory
+
+    def add(self, chat_id: str, fire_time: datetime, content: str, sender_name: str) -> Reminder:
+        """
+        保存一条提醒
+
+        Returns:
+            Reminder: 带数据库ID的提醒
+        """
+        session = self.session_factory()
+        try:
+            record = ReminderRecord(
+                chat_id=chat_id,
+                sender_name=sender_name,
+                content=content,
+                fire_time=fire_time
+            )
+            session.add(record)
+            session.commit()
+            return _to_reminder(record)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def remove(self, reminder_ids: Iterable[int]) -> int:
+        """
+        删除提醒（已发送或已取消）
+
+        Returns:
+            int: 删除的条数
+        """
+        ids = list(reminder_ids)
+        if not ids:
+            return 0
+        session = self.session_factory()
+        try:
+            count = session.query(ReminderRecord).filter(
+                ReminderRecord.id.in_(ids)
+            ).delete(synchronize_session=False)
+            session.commit()
+            return count
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def list_pending(self, chat_id: Optional[str] = None) -> List[Reminder]:
+        """
+        按提醒时间顺序查询待执行的提醒
+
+        Args:
+            chat_id: 只查询该聊天的提醒，为空时查询全部
+        """
+        session = self.session_factory()
+        try:
+            query = session.query(ReminderRecord)
+            if chat_id is not None:
+                query = query.filter(ReminderRecord.chat_id == chat_id)
+            records = query.order_by(ReminderRecord.fire_time).all()
+            return [_to_reminder(record) for record in records]
+        finally:
+            session.close()
@@ -5,18 +5,16 @@
 import logging
 from datetime import datetime
 from typing import Dict, Optional
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
 from utils.console import print_status  # 添加这行
+from src.services.scheduler import get_scheduler, DateTrigger
 
 logger = logging.getLogger('main')
 
 class TaskManager:
     def __init__(self):
         """初始化任务管理器"""
-        self.scheduler = BackgroundScheduler()
+        self.scheduler = get_scheduler()
         self.active_tasks: Dict[str, dict] = {}
-        self.scheduler.start()
         print_status("任务管理器已启动", "success", "CHECK")  # 添加启动提示
         logger.info("任务管理器已启动")
 
@@ -33,8 +31,9 @@ class TaskManager:
             self.scheduler.add_job(
                 callback,
                 trigger=DateTrigger(run_date=target_time),
-                args=args or [],
-                id=task_id
+                args=tuple(args or []),
+                job_id=task_id,
+                group="task_manager"
             )
             
             # 添加任务信息显示
@@ -61,7 +60,8 @@ class TaskManager:
     def remove_task(self, task_id: str):
         """移除任务"""
         try:
-            self.scheduler.remove_job(task_id)
+            if not self.scheduler.remove_job(task_id):
+                raise KeyError(f"任务不存在: {task_id}")
             print_status(f"已移除任务: {task_id}", "info", "INFO")
             logger.info(f"已移除任务: {task_id}")
         except Exception as e:
@@ -69,7 +69,7 @@ class TaskManager:
             print_status(f"移除任务失败: {str(e)}", "error", "CROSS")
 
     def shutdown(self):
-        """关闭调度器"""
-        self.scheduler.shutdown()
+        """移除本管理器的全部任务（统一调度器由进程共享，不在此关闭）"""
+        self.scheduler.remove_group("task_manager")
         print_status("任务管理器已关闭", "warning", "WARNING")
         logger.info("任务管理器已关闭") 
\ No newline at end of file
@@ -1,12 +1,17 @@
 """
 时间识别服务
 负责识别消息中的时间信息和提醒意图
+- 本地规则解析常见的中文时间表达
+- 仅在有提醒意图但本地解析不确定时调用LLM
 """
 
 import json
 import logging
-from datetime import datetime
-from typing import Optional, Tuple
+import re
+import calendar
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from src.utils.metrics import metrics
 
 # 在文件开头添加日志器声明
 import logging
@@ -18,6 +23,374 @@ logger = logging.getLogger('main')
 from datetime import datetime
 import dateparser
 
+# 本地解析结果状态
+PARSE_NOT_TIME_RELATED = "not_time_related"  # 无提醒意图或无时间信息，无需调用LLM
+PARSE_OK = "ok"                              # 本地解析成功
+PARSE_AMBIGUOUS = "ambiguous"                # 有提醒意图但解析不确定，需要LLM兜底
+
+_CN_DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+              '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_CN_UNITS = {'十': 10, '百': 100}
+_NUM = r'[0-9零〇一二两三四五六七八九十百]+'
+
+_UNIT_SECONDS = {
+    '秒': 1, '秒钟': 1,
+    '分': 60, '分钟': 60,
+    '刻': 900, '刻钟': 900,
+    '小时': 3600, '钟头': 3600,
+    '天': 86400, '日': 86400,
+    '周': 604800, '星期': 604800, '礼拜': 604800,
+}
+_REL_UNIT = r'秒钟|秒|分钟|分|刻钟|刻|小时|钟头|天|日|周|星期|礼拜|月'
+_REL_PART_RE = re.compile(rf'({_NUM}|半)(个)?(半)?({_REL_UNIT})(半)?')
+_REL_SPAN_RE = re.compile(rf'(过)?((?:(?:{_NUM}|半)个?半?(?:{_REL_UNIT})半?)+)(之后|以后|后)?')
+
+_DAY_WORDS = {
+    '大后天': (3, None), '后天': (2, None),
+    '明天': (1, None), '明日': (1, None), '明早': (1, '早上'), '明晚': (1, '晚上'),
+    '今天': (0, None), '今日': (0, None), '今早': (0, '早上'), '今晚': (0, '晚上'),
+}
+_DAY_RE = re.compile('|'.join(sorted(_DAY_WORDS, key=len, reverse=True)))
+_WEEKDAY_RE = re.compile(r'(下下|下个?|这个?|本)?(周|星期|礼拜)([一二三四五六日天1-7])')
+_WEEKDAY_INDEX = {'一': 0, '二': 1, '三': 2, '四': 3, '五': 4, '六': 5, '日': 6, '天': 6,
+                  '1': 0, '2': 1, '3': 2, '4': 3, '5': 4, '6': 5, '7': 6}
+_MONTH_DAY_RE = re.compile(rf'(?:({_NUM})月)?({_NUM})[日号](?!后|之后|以后)')
+_PERIOD_RE = re.compile(r'凌晨|早上|早晨|上午|中午|下午|傍晚|晚上|夜里|夜间|半夜|早|晚')
+_CLOCK_RE = re.compile(
+    rf'(?<![快慢多少好大小有])({_NUM})[点時时](?!儿|点)钟?(?:(半)|(一刻)|(三刻)|({_NUM})分?)?'
+    r'|(\d{1,2})[:：](\d{2})'
+)
+_FUZZY_TIME_RE = re.compile(r'待会|一会|等会|等下|过会|晚点|稍后|回头|改天|有空')
+
+# 提醒意图关键词（按长度降序匹配）
+REMINDER_INTENT_KEYWORDS = sorted([
+    '提醒我', '提醒', '叫我', '叫醒我', '喊我', '记得', '别忘了', '别忘记',
+    '通知我', '定个闹钟', '闹钟'
+], key=len, reverse=True)
+_INTENT_RE = re.compile("|".join(REMINDER_INTENT_KEYWORDS))
+# 只靠这些词触发时，往往是叙述或叮嘱而不是让机器人提醒，交给LLM判断
+_WEAK_INTENT_KEYWORDS = {'记得', '别忘了', '别忘记'}
+# 出现这些词时时间可能指向过去（"上次记得..."、"昨天提醒我..."），交给LLM判断
+_PAST_RE = re.compile(r'上次|上回|昨天|昨晚|前天|那时|当时')
+_CLAUSE_SPLIT_RE = re.compile(r'[，,。；;！!？?\n]+')
+_TIMESTAMP_RE = re.compile(r'\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\]')
+# 去掉提醒内容首尾的标点、语气词和"我/一下"，按整词匹配，不会误删"下楼"里的"下"
+_CONTENT_PUNCT = r'[，,。.；;！!？?~～\s　]'
+_CONTENT_TRIM_RE = re.compile(
+    rf'^(?:{_CONTENT_PUNCT}|一下|我(?!们))+'
+    rf'|(?:{_CONTENT_PUNCT}|一下|的|哦|哈|啊|呀|吧|喔|噢|嘛|啦)+$'
+)
+
+
+def chinese_to_int(text: str) -> Optional[int]:
+    """
+    将中文或阿拉伯数字转换为整数
+    Args:
+        text: 如 "十五"、"二十三"、"两"、"15"
+    Returns:
+        Optional[int]: 转换结果，无法识别时返回None
+    """
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    total, num = 0, 0
+    for ch in text:
+        if ch in _CN_DIGITS:
+            num = _CN_DIGITS[ch]
+        elif ch in _CN_UNITS:
+            unit = _CN_UNITS[ch]
+            total += (num or 1) * unit
+            num = 0
+        elif ch.isdigit():
+            num = num * 10 + int(ch)
+        else:
+            return None
+    return total + num
+
+
+def _add_months(base: datetime, months: int) -> datetime:
+    """按自然月增加月份"""
+    month_index = base.month - 1 + months
+    year = base.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(base.day, calendar.monthrange(year, month)[1])
+    return base.replace(year=year, month=month, day=day)
+
+
+class LocalTimeParser:
+    """
+    本地中文时间表达解析器
+    支持相对时间（三分钟后、一个半小时后、过十分钟）和
+    绝对时间（明天早上八点、下周三晚上7点半、3月5号下午两点、21:30）
+    """
+
+    def has_intent(self, text: str) -> bool:
+        """判断是否包含提醒意图关键词"""
+        return _INTENT_RE.search(text) is not None
+
+    def parse(self, text: str, now: Optional[datetime] = None) -> Tuple[str, Optional[list]]:
+        """
+        解析消息中的提醒请求
+        Args:
+            text: 用户消息
+            now: 当前时间（默认为系统时间）
+        Returns:
+            Tuple[str, Optional[list]]: (状态, [(目标时间, 提醒内容), ...])
+        """
+        now = now or datetime.now()
+        text = _TIMESTAMP_RE.sub('', text).strip()
+        if not self.has_intent(text):
+            return PARSE_NOT_TIME_RELATED, None
+        if self._has_time_cue(text) and (self._only_weak_intent(text) or _PAST_RE.search(text)):
+            return PARSE_AMBIGUOUS, None
+
+        reminders = []
+        pending_time = None  # 前一个子句中出现但没有提醒意图的时间
+        ambiguous = False
+        for clause in _CLAUSE_SPLIT_RE.split(text):
+            clause = clause.strip()
+            if not clause:
+                continue
+            status, target_time, spans = self._parse_clause_time(clause, now)
+            if status == PARSE_AMBIGUOUS:
+                ambiguous = True
+                continue
+            intent = _INTENT_RE.search(clause)
+            if not intent:
+                if target_time:
+                    pending_time = target_time
+                continue
+            if target_time is None:
+                target_time, pending_time = pending_time, None
+            if target_time is None:
+                continue
+            reminders.append((target_time, self._extract_content(clause, spans)))
+
+        if ambiguous:
+            return PARSE_AMBIGUOUS, None
+        if reminders:
+            return PARSE_OK, reminders
+        # 有意图但没有任何时间线索，按规则不创建提醒
+        if not self._has_time_cue(text):
+            return PARSE_NOT_TIME_RELATED, None
+        return PARSE_AMBIGUOUS, None
+
+    def _only_weak_intent(self, text: str) -> bool:
+        """提醒意图是否只来自"记得"、"别忘了"这类弱关键词"""
+        return all(match.group(0) in _WEAK_INTENT_KEYWORDS for match in _INTENT_RE.finditer(text))
+
+    def _has_time_cue(self, text: str) -> bool:
+        """是否包含任何时间线索（包括无法精确解析的模糊时间）"""
+        return any(pattern.search(text) for pattern in (
+            _REL_SPAN_RE, _DAY_RE, _WEEKDAY_RE, _MONTH_DAY_RE, _CLOCK_RE, _FUZZY_TIME_RE
+        ))
+
+    def _parse_clause_time(self, clause: str, now: datetime) -> Tuple[str, Optional[datetime], list]:
+        """
+        解析单个子句中的时间
+        Returns:
+            Tuple[str, Optional[datetime], list]: (状态, 目标时间, 时间表达所在区间)
+        """
+        # 相对时间优先
+        for match in _REL_SPAN_RE.finditer(clause):
+            if not (match.group(1) or match.group(3)):
+                continue
+            target = self._apply_relative(match.group(2), now)
+            if target is None:
+                return PARSE_AMBIGUOUS, None, []
+            return PARSE_OK, target, [match.span()]
+
+        spans = []
+        day_offset, date_value, period = None, None, None
+
+        day_match = _DAY_RE.search(clause)
+        if day_match:
+            day_offset, period = _DAY_WORDS[day_match.group(0)]
+            spans.append(day_match.span())
+
+        weekday_match = _WEEKDAY_RE.search(clause)
+        if weekday_match:
+            date_value = self._resolve_weekday(weekday_match, now)
+            spans.append(weekday_match.span())
+
+        month_day_match = _MONTH_DAY_RE.search(clause)
+        if month_day_match and date_value is None:
+            date_value = self._resolve_month_day(month_day_match, now)
+            if date_value is None:
+                return PARSE_AMBIGUOUS, None, []
+            spans.append(month_day_match.span())
+
+        period_match = _PERIOD_RE.search(clause)
+        if period_match:
+            period = period_match.group(0)
+            spans.append(period_match.span())
+
+        clock_match = _CLOCK_RE.search(clause)
+        has_date = day_offset is not None or date_value is not None
+        if not clock_match:
+            if has_date or _FUZZY_TIME_RE.search(clause):
+                # 只有日期没有具体时刻，或者是模糊时间，交给LLM判断
+                return PARSE_AMBIGUOUS, None, []
+            return PARSE_OK, None, []
+        if period is None and not has_date and self._is_bare_clock(clock_match):
+            # "喝一点水"里的"一点"不是时刻：没有时段和日期时，只认"三点钟"、"三点半"、"三点十分"这类写法
+            return PARSE_AMBIGUOUS, None, []
+        spans.append(clock_match.span())
+
+        hour, minute = self._read_clock(clock_match)
+        if hour is None or hour > 24 or minute > 59:
+            return PARSE_AMBIGUOUS, None, []
+
+        if date_value is None:
+            base_date = (now + timedelta(days=day_offset or 0)).date()
+        else:
+            base_date = date_value.date()
+
+        candidates = self._candidate_hours(hour, period, has_date)
+        for candidate_hour, extra_days in candidates:
+            target = datetime.combine(base_date, datetime.min.time()) + timedelta(
+                days=extra_days, hours=candidate_hour, minutes=minute
+            )
+            if target > now:
+                return PARSE_OK, target, spans
+        if not has_date:
+            # 今天的时刻都已过去，顺延到明天
+            candidate_hour, extra_days = candidates[0]
+            target = datetime.combine(base_date, datetime.min.time()) + timedelta(
+                days=extra_days + 1, hours=candidate_hour, minutes=minute
+            )
+            return PARSE_OK, target, spans
+        # 明确日期的时间已经过去
+        return PARSE_AMBIGUOUS, None, []
+
+    def _apply_relative(self, expr: str, now: datetime) -> Optional[datetime]:
+        """计算相对时间表达对应的时间点"""
+        seconds, months = 0.0, 0
+        for num_text, _, half, unit, half_after in _REL_PART_RE.findall(expr):
+            value = 0.5 if num_text == '半' else chinese_to_int(num_text)
+            if value is None:
+                return None
+            if half or half_after:
+                value += 0.5
+            if unit == '月':
+                if value != int(value):
+                    return None
+                months += int(value)
+            else:
+                seconds += value * _UNIT_SECONDS[unit]
+        if seconds <= 0 and months <= 0:
+            return None
+        target = now + timedelta(seconds=seconds)
+        if months:
+            target = _add_months(target, months)
+        return target.replace(microsecond=0)
+
+    def _resolve_weekday(self, match, now: datetime) -> datetime:
+        """解析"周三"、"下周三"等表达对应的日期"""
+        prefix, _, day = match.groups()
+        weekday = _WEEKDAY_INDEX[day]
+        monday = now - timedelta(days=now.weekday())
+        if prefix and prefix.startswith('下下'):
+            return monday + timedelta(days=14 + weekday)
+        if prefix and prefix.startswith('下'):
+            return monday + timedelta(days=7 + weekday)
+        target = monday + timedelta(days=weekday)
+        if target.date() < now.date():
+            target += timedelta(days=7)
+        return target
+
+    def _resolve_month_day(self, match, now: datetime) -> Optional[datetime]:
+        """解析"3月5号"、"15号"等表达对应的日期"""
+        month = chinese_to_int(match.group(1)) if match.group(1) else now.month
+        day = chinese_to_int(match.group(2))
+        if not month or not day or month > 12:
+            return None
+        year = now.year
+        try:
+            target = datetime(year, month, day)
+            if target.date() < now.date():
+                target = datetime(year + 1, month, day) if match.group(1) else _add_months(target, 1)
+        except ValueError:
+            return None
+        return target
+
+    def _is_bare_clock(self, match) -> bool:
+        """是否只是"数字+点"，没有"钟"、"半"、"刻"或分钟"""
+        return match.group(1) is not None and match.group(0).endswith('点')
+
+    def _read_clock(self, match) -> Tuple[Optional[int], int]:
+        """读取时刻中的小时和分钟"""
+        if match.group(6) is not None:
+            return int(match.group(6)), int(match.group(7))
+        hour = chinese_to_int(match.group(1))
+        if match.group(2):
+            minute = 30
+        elif match.group(3):
+            minute = 15
+        elif match.group(4):
+            minute = 45
+        elif match.group(5):
+            minute = chinese_to_int(match.group(5)) or 0
+        else:
+            minute = 0
+        return hour, minute
+
+    def _candidate_hours(self, hour: int, period: Optional[str], has_date: bool) -> List[Tuple[int, int]]:
+        """
+        根据时段确定24小时制的小时数
+        Returns:
+            List[Tuple[int, int]]: 按优先级排列的 (小时, 额外天数)
+        """
+        if hour == 24:
+            return [(0, 1)]
+        if period in ('下午', '傍晚'):
+            return [(hour + 12 if hour < 12 else hour, 0)]
+        if period in ('晚上', '晚', '夜里', '夜间'):
+            if hour == 12:
+                return [(0, 1)]
+            if hour <= 4 and period != '晚':
+                return [(hour, 1)]
+            return [(hour + 12 if hour < 12 else hour, 0)]
+        if period == '半夜':
+            return [(0, 1)] if hour == 12 else [(hour, 1 if hour <= 6 else 0)]
+        if period == '中午':
+            return [(hour + 12 if hour < 6 else hour, 0)]
+        if period == '凌晨':
+            return [(0 if hour == 12 else hour, 0)]
+        if period in ('早上', '早晨', '上午', '早'):
+            return [(hour, 0)]
+        if hour > 12:
+            return [(hour, 0)]
+        if has_date:
+            # 带日期但没有时段："明天八点"指早上，"明天三点"指下午
+            return [(hour + 12 if 1 <= hour <= 6 else hour, 0)]
+        # 没有日期和时段时取最近的未来时刻
+        return [(hour, 0), (hour + 12 if hour < 12 else hour, 0)]
+
+    def _extract_content(self, clause: str, spans: list) -> str:
+        """提取提醒内容"""
+        intents = list(_INTENT_RE.finditer(clause))
+        last = intents[-1]
+        after = clause[last.end():]
+        for start, end in sorted(spans, reverse=True):
+            if start >= last.end():
+                after = after[:start - last.end()] + after[end - last.end():]
+        content = _CONTENT_TRIM_RE.sub('', after)
+        if content:
+            return content
+
+        # 内容在关键词之前，如"明天下午三点开会记得提醒我"
+        before = clause[:last.start()]
+        for start, end in sorted(spans, reverse=True):
+            if end <= last.start():
+                before = before[:start] + before[end:]
+        before = _INTENT_RE.sub('', before)
+        before = _PERIOD_RE.sub('', before)
+        content = _CONTENT_TRIM_RE.sub('', before)
+        return content or last.group(0)
+
+
 class TimeRecognitionService:
     def __init__(self):
         self._configure_dateparser()
@@ -44,6 +417,7 @@ class TimeRecognitionService:
             llm_service: LLM服务实例，用于时间识别
         """
         self.llm_service = llm_service
+        self.local_parser = LocalTimeParser()
         self._load_prompts()
 
     def _load_prompts(self):
@@ -131,16 +505,28 @@ class TimeRecognitionService:
             logger.error(f"解析时间信息失败: {str(e)}")
             return None
 
-    def recognize_time(self, message: str) -> Optional[list]:
+    def recognize_time(self, message: str, now: Optional[datetime] = None) -> Optional[list]:
         """
         识别消息中的时间信息，支持多个提醒
         Args:
             message: 用户消息
+            now: 消息收到的时间，相对时间以此为准（延后识别时传入），默认为当前时间
         Returns:
             Optional[list]: [(目标时间, 提醒内容), ...] 或 None
         """
         try:
-            current_time = datetime.now()
+            # 先使用本地规则解析，只有不确定时才调用LLM
+            status, reminders = self.local_parser.parse(message, now)
+            if status == PARSE_NOT_TIME_RELATED:
+                metrics.incr("time_recognition.local_skip")
+                return None
+            if status == PARSE_OK:
+                metrics.incr("time_recognition.local_parsed")
+                logger.info(f"本地解析到提醒: {reminders}")
+                return reminders
+            metrics.incr("time_recognition.llm_fallback")
+
+            current_time = now or datetime.now()
             user_prompt = f"""当前时间是：{current_time.strftime('%Y-%m-%d %H:%M:%S')}
 请严格按照JSON格式分析这条消息中的提醒请求：{message}"""
             
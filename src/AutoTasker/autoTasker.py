@@ -1,65 +1,57 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 import logging
-import json
 import os
+from src.handlers.message_source import MessageSource
+from src.services.scheduler import get_scheduler, CronTrigger, IntervalTrigger
+from src.AutoTasker.task_repository import TaskRepository, TaskBatch, diff_tasks, normalize_task
 
 logger = logging.getLogger(__name__)
 
+# 统一调度器中的任务分组
+JOB_GROUP = "auto_task"
+# 任务允许的最大延迟（秒），超过则跳过本次执行
+MISFIRE_GRACE_TIME = 60
+
 class AutoTasker:
     def __init__(self, message_handler, task_file_path="data/tasks.json"):
         """
         初始化自动任务管理器
-        
+
         Args:
             message_handler: 消息处理器实例，用于发送消息
             task_file_path: 任务配置文件路径
         """
         self.message_handler = message_handler
         self.task_file_path = task_file_path
-        self.scheduler = BackgroundScheduler()
+        self.scheduler = get_scheduler()
+        self.repository = TaskRepository(task_file_path)
         self.tasks = {}
-        
+
         # 确保任务文件目录存在
         os.makedirs(os.path.dirname(task_file_path), exist_ok=True)
-        
+
         # 加载已存在的任务
         self.load_tasks()
-        
-        # 启动调度器
-        self.scheduler.start()
+
         logger.info("AutoTasker 初始化完成")
 
     def load_tasks(self):
         """从配置文件加载任务列表"""
         try:
             if os.path.exists(self.task_file_path):
-                with open(self.task_file_path, 'r', encoding='utf-8') as f:
-                    tasks_list = json.load(f)
-                    
-                # 确保tasks_list是列表
-                if not isinstance(tasks_list, list):
-                    tasks_list = []
-                
+                tasks = self.repository.load()
+
                 # 清空现有任务
-                for task_id in list(self.tasks.keys()):
-                    self.remove_task(task_id)
-                
-                # 加载每个任务
-                for task in tasks_list:
-                    if isinstance(task, dict) and 'task_id' in task:
-                        self.add_task(
-                            task_id=task['task_id'],
-                            chat_id=task['chat_id'],
-                            content=task['content'],
-                            schedule_type=task['schedule_type'],
-                            schedule_time=task['schedule_time'],
-                            interval=task.get('interval'),
-                            is_active=task.get('is_active', True)
-                        )
-                logger.info(f"成功加载 {len(tasks_list)} 个任务")
+                self.clear_jobs()
+                self.tasks = {}
+
+                # 加载每个任务（文件已是最新，无需回写）
+                for task_id, task in tasks.items():
+                    try:
+                        self._schedule(task)
+                    except Exception as e:
+                        logger.error(f"加载任务 {task_id} 失败: {str(e)}")
+                logger.info(f"成功加载 {len(tasks)} 个任务")
             else:
                 logger.info("任务配置文件不存在，将创建新文件")
         except Exception as e:
@@ -70,30 +62,92 @@ class AutoTasker:
     def save_tasks(self):
         """保存任务配置到文件"""
         try:
-            # 将任务转换为列表格式
-            tasks_list = []
+            batch = TaskBatch()
+            for task_id in self.repository.tasks:
+                if task_id not in self.tasks:
+                    batch.delete(task_id)
             for task_id, task in self.tasks.items():
-                task_data = {
-                    'task_id': task_id,
-                    'chat_id': task['chat_id'],
-                    'content': task['content'],
-                    'schedule_type': task['schedule_type'],
-                    'schedule_time': task['schedule_time'],
-                    'interval': task.get('interval'),
-                    'is_active': task['is_active']
-                }
-                tasks_list.append(task_data)
-            
-            with open(self.task_file_path, 'w', encoding='utf-8') as f:
-                json.dump(tasks_list, f, ensure_ascii=False, indent=4)
-            logger.info(f"任务配置已保存，共 {len(tasks_list)} 个任务")
+                batch.put(dict(task, task_id=task_id))
+            self.repository.commit(batch)
         except Exception as e:
             logger.error(f"保存任务失败: {str(e)}")
 
+    def _commit(self, batch: TaskBatch):
+        """
+        校验并提交一组修改：先写文件，成功后再更新调度器
+
+        Raises:
+            ValueError: 任一任务无效时整组修改都不生效
+        """
+        self.repository.commit(batch)
+        for task_id in batch.deletes:
+            self._unschedule(task_id)
+        for task in batch.puts.values():
+            self._schedule(task)
+
+    def _schedule(self, task):
+        """把任务注册到统一调度器（同ID任务会被替换）"""
+        task_id = task['task_id']
+        schedule_type = task['schedule_type']
+        schedule_time = task['schedule_time']
+        if schedule_type == 'cron':
+            trigger = CronTrigger.from_crontab(schedule_time)
+        elif schedule_type == 'interval':
+            # 确保interval是有效的整数
+            if not schedule_time or not str(schedule_time).isdigit():
+                raise ValueError(f"无效的时间间隔: {schedule_time}")
+            trigger = IntervalTrigger(seconds=int(schedule_time))
+        else:
+            raise ValueError(f"不支持的调度类型: {schedule_type}")
+
+        # 创建任务执行函数
+        def task_func():
+            try:
+                if self.tasks[task_id]['is_active']:
+                    # 使用任务中保存的chat_id
+                    task_chat_id = self.tasks[task_id]['chat_id']
+                    self.message_handler.add_to_queue(
+                        chat_id=task_chat_id,
+                        content=self.tasks[task_id]['content'],
+                        sender_name="System",
+                        username="AutoTasker",
+                        is_group=False,
+                        source=MessageSource.SCHEDULED_TASK
+                    )
+                    logger.info(f"执行定时任务 {task_id} 发送给 {task_chat_id}")
+            except Exception as e:
+                logger.error(f"执行任务 {task_id} 失败: {str(e)}")
+
+        # 添加任务到调度器
+        job = self.scheduler.add_job(
+            task_func,
+            trigger=trigger,
+            job_id=self._job_id(task_id),
+            group=JOB_GROUP,
+            misfire_grace_time=MISFIRE_GRACE_TIME
+        )
+
+        # 保存任务信息
+        self.tasks[task_id] = {
+            'chat_id': task['chat_id'],
+            'content': task['content'],
+            'schedule_type': schedule_type,
+            'schedule_time': schedule_time,
+            'interval': schedule_time if schedule_type == 'interval' else None,
+            'is_active': task['is_active'],
+            'job': job
+        }
+
+    def _unschedule(self, task_id):
+        """从调度器中移除任务"""
+        task = self.tasks.pop(task_id, None)
+        if task:
+            self.scheduler.remove_job(task['job'])
+
     def add_task(self, task_id, chat_id, content, schedule_type, schedule_time, interval=None, is_active=True):
         """
         添加新任务
-        
+
         Args:
             task_id: 任务ID
             chat_id: 接收消息的聊天ID
@@ -104,65 +158,53 @@ class AutoTasker:
             is_active: 是否激活任务
         """
         try:
-            if schedule_type == 'cron':
-                trigger = CronTrigger.from_crontab(schedule_time)
-            elif schedule_type == 'interval':
-                # 确保interval是有效的整数
-                if not schedule_time or not str(schedule_time).isdigit():
-                    raise ValueError(f"无效的时间间隔: {schedule_time}")
-                trigger = IntervalTrigger(seconds=int(schedule_time))
-            else:
-                raise ValueError(f"不支持的调度类型: {schedule_type}")
-
-            # 创建任务执行函数
-            def task_func():
-                try:
-                    if self.tasks[task_id]['is_active']:
-                        # 使用任务中保存的chat_id
-                        task_chat_id = self.tasks[task_id]['chat_id']
-                        self.message_handler.add_to_queue(
-                            chat_id=task_chat_id,
-                            content=content,
-                            sender_name="System",
-                            username="AutoTasker",
-                            is_group=False
-                        )
-                        logger.info(f"执行定时任务 {task_id} 发送给 {task_chat_id}")
-                except Exception as e:
-                    logger.error(f"执行任务 {task_id} 失败: {str(e)}")
-
-            # 添加任务到调度器
-            job = self.scheduler.add_job(
-                task_func,
-                trigger=trigger,
-                id=task_id
-            )
-
-            # 保存任务信息
-            self.tasks[task_id] = {
+            batch = TaskBatch()
+            batch.put({
+                'task_id': task_id,
                 'chat_id': chat_id,
                 'content': content,
                 'schedule_type': schedule_type,
                 'schedule_time': schedule_time,
-                'interval': schedule_time if schedule_type == 'interval' else None,
-                'is_active': is_active,
-                'job': job
-            }
-
-            self.save_tasks()
+                'is_active': is_active
+            })
+            self._commit(batch)
             logger.info(f"添加任务成功: {task_id}")
-            
+
         except Exception as e:
             logger.error(f"添加任务失败: {str(e)}")
             raise
 
+    def sync_tasks(self, tasks_list):
+        """
+        用新的完整任务列表替换当前任务，只更新有变化的任务，文件只写一次
+
+        Args:
+            tasks_list: 任务列表，每项包含 task_id、chat_id、content、schedule_type、schedule_time、is_active
+
+        Returns:
+            tuple: (新增数, 修改数, 删除数)
+
+        Raises:
+            ValueError: 任一任务无效时整组修改都不生效
+        """
+        current = {task_id: dict(task, task_id=task_id) for task_id, task in self.tasks.items()}
+        added, changed, removed = diff_tasks(current, tasks_list)
+        batch = TaskBatch()
+        for task_id in removed:
+            batch.delete(task_id)
+        for task in added + changed:
+            batch.put(task)
+        self._commit(batch)
+        logger.info(f"同步任务完成: 新增 {len(added)}，修改 {len(changed)}，删除 {len(removed)}")
+        return len(added), len(changed), len(removed)
+
     def remove_task(self, task_id):
         """删除任务"""
         try:
             if task_id in self.tasks:
-                self.tasks[task_id]['job'].remove()
-                del self.tasks[task_id]
-                self.save_tasks()
+                batch = TaskBatch()
+                batch.delete(task_id)
+                self._commit(batch)
                 logger.info(f"删除任务成功: {task_id}")
             else:
                 logger.warning(f"任务不存在: {task_id}")
@@ -175,30 +217,25 @@ class AutoTasker:
             if task_id not in self.tasks:
                 raise ValueError(f"任务不存在: {task_id}")
 
-            task = self.tasks[task_id]
-            
+            task = dict(self.tasks[task_id], task_id=task_id)
+
             # 更新任务参数
             for key, value in kwargs.items():
                 if key in task:
                     task[key] = value
 
-            # 如果需要更新调度
+            batch = TaskBatch()
+            batch.put(normalize_task(task))
+
+            # 调度参数有变化时才重新调度
             if 'schedule_type' in kwargs or 'schedule_time' in kwargs or 'interval' in kwargs:
-                self.remove_task(task_id)
-                self.add_task(
-                    task_id=task_id,
-                    chat_id=task['chat_id'],
-                    content=task['content'],
-                    schedule_type=task['schedule_type'],
-                    schedule_time=task['schedule_time'],
-                    interval=task.get('interval'),
-                    is_active=task['is_active']
-                )
+                self._commit(batch)
             else:
-                self.save_tasks()
-                
+                self.repository.commit(batch)
+                self.tasks[task_id].update({k: v for k, v in task.items() if k in self.tasks[task_id]})
+
             logger.info(f"更新任务成功: {task_id}")
-            
+
         except Exception as e:
             logger.error(f"更新任务失败: {str(e)}")
             raise
@@ -208,7 +245,9 @@ class AutoTasker:
         try:
             if task_id in self.tasks:
                 self.tasks[task_id]['is_active'] = not self.tasks[task_id]['is_active']
-                self.save_tasks()
+                batch = TaskBatch()
+                batch.put(dict(self.tasks[task_id], task_id=task_id))
+                self.repository.commit(batch)
                 status = "激活" if self.tasks[task_id]['is_active'] else "暂停"
                 logger.info(f"任务 {task_id} 已{status}")
             else:
@@ -229,7 +268,12 @@ class AutoTasker:
             for task_id, task_info in self.tasks.items()
         }
 
-    def __del__(self):
-        """清理资源"""
-        if hasattr(self, 'scheduler'):
-            self.scheduler.shutdown()
+    @staticmethod
+    def _job_id(task_id):
+        """统一调度器中的任务ID"""
+        return f"{JOB_GROUP}_{task_id}"
+
+    def clear_jobs(self):
+        """从调度器中移除全部定时任务（保留任务配置）"""
+        for task_id in self.tasks:
+            self.scheduler.remove_job(self._job_id(task_id))
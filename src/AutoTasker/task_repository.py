@@ -0,0 +1,172 @@
+"""
+任务存储模块
+负责定时任务配置文件的读写，包括:
+- 批量修改统一校验，全部通过后只写一次文件
+- 临时文件 + 原子替换，避免写到一半时文件损坏
+- 计算新旧任务列表的差异，只更新变化的任务
+"""
+
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, Iterable, List, Tuple
+
+from src.services.cron import CronExpression
+
+logger = logging.getLogger(__name__)
+
+# 任务文件中保存的字段
+TASK_FIELDS = ('task_id', 'chat_id', 'content', 'schedule_type', 'schedule_time', 'interval', 'is_active')
+
+
+def normalize_task(task: dict) -> dict:
+    """按任务文件格式整理任务字段"""
+    schedule_type = task.get('schedule_type')
+    schedule_time = task.get('schedule_time')
+    return {
+        'task_id': task.get('task_id'),
+        'chat_id': task.get('chat_id'),
+        'content': task.get('content'),
+        'schedule_type': schedule_type,
+        'schedule_time': schedule_time,
+        'interval': schedule_time if schedule_type == 'interval' else None,
+        'is_active': task.get('is_active', True),
+    }
+
+
+def validate_task(task: dict):
+    """
+    校验任务配置
+
+    Raises:
+        ValueError: 任务配置无效
+    """
+    for key in ('task_id', 'chat_id', 'content', 'schedule_type'):
+        if not task.get(key):
+            raise ValueError(f"缺少字段: {key}")
+    schedule_type = task['schedule_type']
+    schedule_time = task.get('schedule_time')
+    if schedule_type == 'cron':
+        CronExpression(str(schedule_time or ''))
+    elif schedule_type == 'interval':
+        if not schedule_time or not str(schedule_time).isdigit() or int(schedule_time) <= 0:
+            raise ValueError(f"无效的时间间隔: {schedule_time}")
+    else:
+        raise ValueError(f"不支持的调度类型: {schedule_type}")
+
+
+def diff_tasks(current: Dict[str, dict], new_tasks: Iterable[dict]) -> Tuple[List[dict], List[dict], List[str]]:
+    """
+    计算任务列表差异
+
+    Args:
+        current: 当前任务 task_id -> 任务
+        new_tasks: 新的完整任务列表
+
+    Returns:
+        Tuple[List[dict], List[dict], List[str]]: (新增的任务, 修改的任务, 删除的任务ID)
+    """
+    added, changed = [], []
+    seen = set()
+    for task in new_tasks:
+        task = normalize_task(task)
+        task_id = task['task_id']
+        seen.add(task_id)
+        old = current.get(task_id)
+        if old is None:
+            added.append(task)
+        elif normalize_task(old) != task:
+            changed.append(task)
+    removed = [task_id for task_id in current if task_id not in seen]
+    return added, changed, removed
+
+
+class TaskBatch:
+    """一组待提交的任务修改"""
+
+    def __init__(self):
+        self.puts: Dict[str, dict] = {}
+        self.deletes: List[str] = []
+
+    def put(self, task: dict):
+        """新增或替换任务"""
+        task = normalize_task(task)
+        self.puts[task['task_id']] = task
+        if task['task_id'] in self.deletes:
+            self.deletes.remove(task['task_id'])
+
+    def delete(self, task_id: str):
+        """删除任务"""
+        self.puts.pop(task_id, None)
+        self.deletes.append(task_id)
+
+    def __len__(self):
+        return len(self.puts) + len(self.deletes)
+
+
+class TaskRepository:
+    """任务配置文件（JSON 列表）的存储"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tasks: Dict[str, dict] = {}
+
+    def load(self) -> Dict[str, dict]:
+        """读取任务文件，无效条目跳过"""
+        self.tasks = {}
+        if not os.path.exists(self.path):
+            return self.tasks
+        with open(self.path, 'r', encoding='utf-8') as f:
+            tasks_list = json.load(f)
+        if not isinstance(tasks_list, list):
+            tasks_list = []
+        for task in tasks_list:
+            if isinstance(task, dict) and 'task_id' in task:
+                task = normalize_task(task)
+                self.tasks[task['task_id']] = task
+        return self.tasks
+
+    def commit(self, batch: TaskBatch) -> Dict[str, dict]:
+        """
+        校验并提交一组修改，全部成功后写一次文件
+
+        Raises:
+            ValueError: 任一任务无效时整组修改都不生效
+
+        Returns:
+            Dict[str, dict]: 提交后的全部任务
+        """
+        errors = []
+        for task_id, task in batch.puts.items():
+            try:
+                validate_task(task)
+            except ValueError as e:
+                errors.append(f"{task_id}: {str(e)}")
+        if errors:
+            raise ValueError("任务校验失败: " + "; ".join(errors))
+
+        tasks = dict(self.tasks)
+        for task_id in batch.deletes:
+            tasks.pop(task_id, None)
+        tasks.update(batch.puts)
+        if len(batch):
+            self._write(tasks)
+        self.tasks = tasks
+        return tasks
+
+    def _write(self, tasks: Dict[str, dict]):
+        """写入临时文件后原子替换任务文件"""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tasks_', suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump([{key: task.get(key) for key in TASK_FIELDS} for task in tasks.values()],
+                          f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.info(f"任务配置已保存，共 {len(tasks)} 个任务")
@@ -2,8 +2,8 @@ import os
 import json
 import logging
 import shutil
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +18,7 @@ class LLMSettings:
     model: str
     max_tokens: int
     temperature: float
+    max_concurrent_replies: int = 2  # 同时生成的回复数（所有聊天合计）
 
 @dataclass
 class ImageRecognitionSettings:
@@ -30,23 +31,36 @@ class ImageRecognitionSettings:
 class ImageGenerationSettings:
     model: str
     temp_dir: str
+    enabled: bool = False  # 是否响应画图请求（在后台生成，完成后发送）
+    max_concurrent: int = 1  # 同时生成的图片数
+    max_pending: int = 8  # 排队和生成中的任务总数上限
 
 @dataclass
 class TextToSpeechSettings:
     tts_api_url: str
     voice_dir: str
+    cache_mb: int = 100  # 合成结果缓存大小上限（MB）
+    max_workers: int = 3  # 长回复分句后同时合成的句子数
+
+@dataclass
+class RandomImageSettings:
+    source: str = "https://t.mwm.moe/pc"  # 随机图片地址，或本地图片目录（离线时使用）
+    pool_size: int = 5  # 预取的图片数
+    max_pool_mb: int = 50  # 预取目录大小上限（MB）
 
 @dataclass
 class MediaSettings:
     image_recognition: ImageRecognitionSettings
     image_generation: ImageGenerationSettings
     text_to_speech: TextToSpeechSettings
+    random_image: RandomImageSettings = field(default_factory=RandomImageSettings)
 
 @dataclass
 class AutoMessageSettings:
     content: str
     min_hours: float
     max_hours: float
+    max_per_tick: int = 3  # 每轮最多发送的主动消息数
 
 @dataclass
 class QuietTimeSettings:
@@ -82,6 +96,46 @@ class BehaviorSettings:
 class AuthSettings:
     admin_password: str
 
+@dataclass
+class ModelRouteSettings:
+    model: str
+    max_tokens: int
+    temperature: float
+    base_url: str = ""  # 为空时沿用 llm_settings 中的地址
+    api_key: str = ""   # 为空时沿用 llm_settings 中的密钥
+
+@dataclass
+class ModelRoutingSettings:
+    routes: Dict[str, ModelRouteSettings] = field(default_factory=dict)
+
+    def resolve(self, call_class: str, llm: LLMSettings) -> ModelRouteSettings:
+        """获取调用类别对应的模型配置，未配置的字段回退到主模型配置"""
+        route = self.routes.get(call_class)
+        if route is None:
+            return ModelRouteSettings(
+                model=llm.model,
+                max_tokens=llm.max_tokens,
+                temperature=llm.temperature,
+                base_url=llm.base_url,
+                api_key=llm.api_key
+            )
+        return ModelRouteSettings(
+            model=route.model or llm.model,
+            max_tokens=route.max_tokens or llm.max_tokens,
+            temperature=llm.temperature if route.temperature is None else route.temperature,
+            base_url=route.base_url or llm.base_url,
+            api_key=route.api_key or llm.api_key
+        )
+
+@dataclass
+class IntentSettings:
+    keywords: Dict[str, List[str]] = field(default_factory=dict)  # 意图 -> 追加的触发关键词
+    patterns: Dict[str, List[str]] = field(default_factory=dict)  # 意图 -> 追加的正则表达式
+
+@dataclass
+class GroupSettings:
+    aggregate_mentions: bool = False  # 合并同一群聊中同时@机器人的多位成员，一次请求分别回复
+
 @dataclass
 class Config:
     def __init__(self):
@@ -90,6 +144,9 @@ class Config:
         self.media: MediaSettings
         self.behavior: BehaviorSettings
         self.auth: AuthSettings
+        self.model_routing: ModelRoutingSettings
+        self.group: GroupSettings
+        self.intent: IntentSettings
         self.load_config()
     
     @property
@@ -165,11 +222,13 @@ class Config:
                     base_url=llm_data['base_url']['value'],
                     model=llm_data['model']['value'],
                     max_tokens=llm_data['max_tokens']['value'],
-                    temperature=llm_data['temperature']['value']
+                    temperature=llm_data['temperature']['value'],
+                    max_concurrent_replies=llm_data.get('max_concurrent_replies', {}).get('value', 2)
                 )
                 
                 # 媒体设置
                 media_data = categories['media_settings']['settings']
+                random_image_data = media_data.get('random_image', {})  # 可选
                 self.media = MediaSettings(
                     image_recognition=ImageRecognitionSettings(
                         api_key=media_data['image_recognition']['api_key']['value'],
@@ -179,11 +238,21 @@ class Config:
                     ),
                     image_generation=ImageGenerationSettings(
                         model=media_data['image_generation']['model']['value'],
-                        temp_dir=media_data['image_generation']['temp_dir']['value']
+                        temp_dir=media_data['image_generation']['temp_dir']['value'],
+                        enabled=media_data['image_generation'].get('enabled', {}).get('value', False),
+                        max_concurrent=media_data['image_generation'].get('max_concurrent', {}).get('value', 1),
+                        max_pending=media_data['image_generation'].get('max_pending', {}).get('value', 8)
                     ),
                     text_to_speech=TextToSpeechSettings(
                         tts_api_url=media_data['text_to_speech']['tts_api_url']['value'],
-                        voice_dir=media_data['text_to_speech']['voice_dir']['value']
+                        voice_dir=media_data['text_to_speech']['voice_dir']['value'],
+                        cache_mb=media_data['text_to_speech'].get('cache_mb', {}).get('value', 100),
+                        max_workers=media_data['text_to_speech'].get('max_workers', {}).get('value', 3)
+                    ),
+                    random_image=RandomImageSettings(
+                        source=random_image_data.get('source', {}).get('value', "https://t.mwm.moe/pc"),
+                        pool_size=random_image_data.get('pool_size', {}).get('value', 5),
+                        max_pool_mb=random_image_data.get('max_pool_mb', {}).get('value', 50)
                     )
                 )
                 
@@ -210,7 +279,8 @@ class Config:
                     auto_message=AutoMessageSettings(
                         content=behavior_data['auto_message']['content']['value'],
                         min_hours=behavior_data['auto_message']['countdown']['min_hours']['value'],
-                        max_hours=behavior_data['auto_message']['countdown']['max_hours']['value']
+                        max_hours=behavior_data['auto_message']['countdown']['max_hours']['value'],
+                        max_per_tick=behavior_data['auto_message'].get('max_per_tick', {}).get('value', 3)
                     ),
                     quiet_time=QuietTimeSettings(
                         start=behavior_data['quiet_time']['start']['value'],
@@ -230,6 +300,33 @@ class Config:
                 self.auth = AuthSettings(
                     admin_password=auth_data['admin_password']['value']
                 )
+
+                # 模型路由设置（可选）
+                routes = {}
+                if 'model_routing' in categories:
+                    routing_data = categories['model_routing'].get('settings', {})
+                    for call_class, route in routing_data.get('routes', {}).get('value', {}).items():
+                        routes[call_class] = ModelRouteSettings(
+                            model=route.get('model', ''),
+                            max_tokens=route.get('max_tokens', 0),
+                            temperature=route.get('temperature'),
+                            base_url=route.get('base_url', ''),
+                            api_key=route.get('api_key', '')
+                        )
+                self.model_routing = ModelRoutingSettings(routes=routes)
+
+                # 意图识别扩展设置（可选）
+                intent_data = categories.get('intent_settings', {}).get('settings', {})
+                self.intent = IntentSettings(
+                    keywords=intent_data.get('keywords', {}).get('value', {}),
+                    patterns=intent_data.get('patterns', {}).get('value', {})
+                )
+
+                # 群聊设置（可选）
+                group_data = categories.get('group_settings', {}).get('settings', {})
+                self.group = GroupSettings(
+                    aggregate_mentions=group_data.get('aggregate_mentions', {}).get('value', False)
+                )
                 
         except Exception as e:
             logger.error(f"加载配置文件失败: {str(e)}")
@@ -6,14 +6,18 @@
 import os
 import logging
 import json
+import time
 from typing import List, Dict, Tuple, Any, Optional
+from src.utils.metrics import metrics
+from src.services.image_jobs import JOB_STATUS_TEXT
 
 logger = logging.getLogger('main')
 
 class DebugCommandHandler:
     """调试命令处理器类，处理各种调试命令"""
     
-    def __init__(self, root_dir: str, memory_service=None, llm_service=None):
+    def __init__(self, root_dir: str, memory_service=None, llm_service=None, reminder_service=None,
+                 image_jobs=None):
         """
         初始化调试命令处理器
         
@@ -21,10 +25,14 @@ class DebugCommandHandler:
             root_dir: 项目根目录
             memory_service: 记忆服务实例
             llm_service: LLM服务实例
+            reminder_service: 提醒服务实例
+            image_jobs: 画图任务队列实例
         """
         self.root_dir = root_dir
         self.memory_service = memory_service
         self.llm_service = llm_service
+        self.reminder_service = reminder_service
+        self.image_jobs = image_jobs
         self.avatars_dir = os.path.join(root_dir, "data", "avatars")
         self.DEBUG_PREFIX = "/"
         
@@ -75,6 +83,22 @@ class DebugCommandHandler:
         elif cmd == "context":
             return True, self._clear_context(user_id)
             
+        # 显示运行指标
+        elif cmd == "stats" or cmd.startswith("stats "):
+            return True, self._show_stats(cmd[len("stats"):].strip())
+            
+        # 显示当前聊天的待执行提醒
+        elif cmd == "reminders":
+            return True, self._list_reminders(user_id)
+            
+        # 取消提醒
+        elif cmd == "cancel" or cmd.startswith("cancel "):
+            return True, self._cancel_reminder(user_id, cmd[len("cancel"):].strip())
+            
+        # 显示或取消当前聊天的画图任务
+        elif cmd == "images" or cmd.startswith("images "):
+            return True, self._image_jobs(user_id, cmd[len("images"):].strip())
+            
         # 退出调试模式
         elif cmd == "exit":
             return True, "已退出调试模式"
@@ -91,8 +115,102 @@ class DebugCommandHandler:
 - /reset: 重置当前角色的最近记忆
 - /clear: 清空当前角色的核心记忆
 - /context: 清空当前角色的对话上下文
+- /stats [前缀]: 显示运行指标（如 /stats llm）
+- /reminders: 显示当前聊天的待执行提醒
+- /cancel <ID>: 取消指定提醒
+- /images: 显示当前聊天的画图任务
+- /images cancel <ID>: 取消指定画图任务
 - /exit: 退出调试模式"""
     
+    def _show_stats(self, prefix: str = "") -> str:
+        """
+        显示运行指标
+        
+        Args:
+            prefix: 指标名前缀过滤
+            
+        Returns:
+            str: 指标报告
+        """
+        return f"【运行指标】\n{metrics.format_report(prefix)}"
+    
+    def _list_reminders(self, user_id: str) -> str:
+        """
+        显示当前聊天的待执行提醒
+        
+        Args:
+            user_id: 用户ID
+            
+        Returns:
+            str: 提醒列表
+        """
+        if not self.reminder_service:
+            return "错误: 提醒服务未初始化"
+            
+        reminders = self.reminder_service.list_reminders(user_id)
+        if not reminders:
+            return "当前没有待执行的提醒"
+        lines = [f"【待执行提醒】共 {len(reminders)} 条"]
+        for reminder in reminders:
+            lines.append(f"#{reminder.id} {reminder.fire_time.strftime('%Y-%m-%d %H:%M')} {reminder.content}")
+        lines.append("使用 /cancel <ID> 取消提醒")
+        return "\n".join(lines)
+    
+    def _cancel_reminder(self, user_id: str, arg: str) -> str:
+        """
+        取消当前聊天的提醒
+        
+        Args:
+            user_id: 用户ID
+            arg: 提醒ID
+            
+        Returns:
+            str: 操作结果
+        """
+        if not self.reminder_service:
+            return "错误: 提醒服务未初始化"
+            
+        reminder_id = arg.lstrip("#")
+        if not reminder_id.isdigit():
+            return "用法: /cancel <ID>，ID 可通过 /reminders 查看"
+        if self.reminder_service.cancel_reminder(int(reminder_id), chat_id=user_id):
+            return f"已取消提醒 #{reminder_id}"
+        return f"未找到提醒 #{reminder_id}"
+    
+    def _image_jobs(self, user_id: str, arg: str) -> str:
+        """
+        显示或取消当前聊天的画图任务
+        
+        Args:
+            user_id: 用户ID
+            arg: 为空时显示任务列表，"cancel <ID>" 取消任务
+            
+        Returns:
+            str: 任务列表或操作结果
+        """
+        if not self.image_jobs:
+            return "错误: 画图任务队列未初始化"
+            
+        if arg.startswith("cancel"):
+            job_id = arg[len("cancel"):].strip().lstrip("#")
+            if not job_id.isdigit():
+                return "用法: /images cancel <ID>，ID 可通过 /images 查看"
+            if self.image_jobs.cancel(int(job_id), chat_id=user_id):
+                return f"已取消画图任务 #{job_id}"
+            return f"未找到进行中的画图任务 #{job_id}"
+            
+        jobs = self.image_jobs.list_jobs(user_id)
+        if not jobs:
+            return "当前没有画图任务"
+        now = time.time()
+        lines = [f"【画图任务】共 {len(jobs)} 个"]
+        for job in jobs:
+            elapsed = (job.finished_at or now) - job.created_at
+            lines.append(f"#{job.id} {JOB_STATUS_TEXT.get(job.status, job.status)} "
+                         f"{elapsed:.0f}秒 {job.prompt[:20]}")
+        lines.append("使用 /images cancel <ID> 取消任务")
+        return "\n".join(lines)
+    
     def _show_memory(self, avatar_name: str) -> str:
         """
         显示当前角色的记忆
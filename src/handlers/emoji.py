@@ -2,12 +2,11 @@
 表情包处理模块
 负责处理表情包相关功能，包括:
 - 表情标签识别
-- 表情包选择
+- 表情包选择（使用内存中的表情包索引）
 - 文件管理
 """
 
 import os
-import random
 import logging
 from typing import Optional
 from datetime import datetime
@@ -15,6 +14,7 @@ import pyautogui
 import time
 from wxauto import WeChat
 from config import config
+from src.services.emoji_catalog import get_emoji_catalog
 
 logger = logging.getLogger('main')
 
@@ -23,6 +23,8 @@ class EmojiHandler:
         self.root_dir = root_dir
         # 修改表情包目录路径为avatar目录下的emojis
         self.emoji_dir = os.path.join(root_dir, config.behavior.context.avatar_dir, "emojis")
+        # 所有人设共用的表情包索引
+        self.catalog = get_emoji_catalog()
         
         # 支持的表情类型
         self.emotion_types = ['happy', 'sad', 'angry', 'neutral','love','funny','cute']
@@ -48,25 +50,29 @@ class EmojiHandler:
             start = end + 1
         return tags
 
-    def get_emoji_for_emotion(self, emotion_type: str) -> Optional[str]:
-        """根据情感类型获取对应表情包"""
-        try:
-            target_dir = os.path.join(self.emoji_dir, emotion_type)
-            logger.info(f"查找表情包目录: {target_dir}")
-            
-            if not os.path.exists(target_dir):
-                logger.warning(f"情感目录不存在: {target_dir}")
-                return None
+    def preload_all_avatars(self):
+        """为所有人设建立表情包索引，并定期检查目录变化"""
+        self.catalog.preload(os.path.dirname(os.path.dirname(self.emoji_dir)))
+        self.catalog.start_refresh()
 
-            emoji_files = [f for f in os.listdir(target_dir)
-                          if f.lower().endswith(('.gif', '.jpg', '.png', '.jpeg'))]
-            
-            if not emoji_files:
-                logger.warning(f"目录中未找到表情包: {target_dir}")
+    def switch_avatar(self, avatar_dir: str):
+        """切换到另一个人设的表情包目录（索引已预加载，不重新扫描）"""
+        self.emoji_dir = os.path.join(self.root_dir, avatar_dir, "emojis")
+        logger.info(f"表情包目录已切换: {self.emoji_dir}")
+
+    def get_emoji_for_emotion(self, emotion_type: str, chat_id: Optional[str] = None) -> Optional[str]:
+        """
+        根据情感类型获取对应表情包
+
+        Args:
+            emotion_type: 情感类型
+            chat_id: 聊天ID，用于避开该聊天最近发送过的表情包
+        """
+        try:
+            emoji_path = self.catalog.pick(self.emoji_dir, emotion_type, chat_id)
+            if not emoji_path:
+                logger.warning(f"未找到 {emotion_type} 表情包: {self.emoji_dir}")
                 return None
-                
-            selected = random.choice(emoji_files)
-            emoji_path = os.path.join(target_dir, selected)
             logger.info(f"已选择 {emotion_type} 表情包: {emoji_path}")
             return emoji_path
             
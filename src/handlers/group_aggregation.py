@@ -0,0 +1,94 @@
+"""
+群聊合并回复模块
+负责把同一群聊中同时@机器人的多位成员合并成一次请求，包括:
+- 按成员整理合并窗口内的消息
+- 生成要求按成员分段作答的提示
+- 把结构化回复拆分回每位成员的回复，并找出模型漏答的成员
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+# 回复中每段的成员标记，如 [[张三]]
+SEGMENT_PATTERN = re.compile(r'\[\[([^\[\]\n]+?)\]\]')
+
+
+def group_entries(entries: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """
+    按成员整理消息，保持成员首次发言的顺序
+
+    Args:
+        entries: [(发送者, 消息内容)]
+
+    Returns:
+        Dict[str, List[str]]: 发送者 -> 消息列表
+    """
+    grouped: Dict[str, List[str]] = {}
+    for sender, content in entries:
+        grouped.setdefault(sender, []).append(content)
+    return grouped
+
+
+def build_group_prompt(timestamp: str, entries: List[Tuple[str, str]]) -> str:
+    """
+    生成合并后的请求内容
+
+    Args:
+        timestamp: 第一条消息的时间
+        entries: [(发送者, 消息内容)]
+
+    Returns:
+        str: 要求模型按成员分段回复的消息
+    """
+    lines = [
+        f"[{timestamp}]",
+        "群里有多位成员同时@了你，请分别回复每一位成员。",
+        "每位成员的回复单独成段，以「[[成员名]]」开头，只回复下面出现的成员：",
+    ]
+    for sender, messages in group_entries(entries).items():
+        lines.append(f"[[{sender}]] " + "\n".join(messages))
+    return "\n".join(lines)
+
+
+def split_group_reply(reply: str, senders: List[str]) -> List[Tuple[str, str]]:
+    """
+    把结构化回复拆分为每位成员的回复
+
+    Args:
+        reply: 模型回复
+        senders: 本次合并的成员
+
+    Returns:
+        List[Tuple[str, str]]: [(成员, 回复内容)]；没有识别出任何成员标记时，整段回复发给全部成员
+    """
+    known = set(senders)
+    segments: List[Tuple[str, str]] = []
+    matches = list(SEGMENT_PATTERN.finditer(reply))
+    for i, match in enumerate(matches):
+        sender = match.group(1).strip()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(reply)
+        text = reply[match.end():end].strip()
+        # 模型虚构的成员直接丢弃
+        if text and sender in known:
+            segments.append((sender, text))
+    if not segments:
+        text = SEGMENT_PATTERN.sub('', reply).strip()
+        return [(" @".join(senders), text)] if text else []
+    return segments
+
+
+def missing_senders(segments: List[Tuple[str, str]], senders: List[str]) -> List[str]:
+    """
+    找出拆分结果中没有得到回复的成员
+
+    Args:
+        segments: split_group_reply 的结果
+        senders: 本次合并的成员
+
+    Returns:
+        List[str]: 漏答的成员；整段回复发给全部成员时视为都已回复
+    """
+    answered = {sender for sender, _ in segments}
+    if " @".join(senders) in answered:
+        return []
+    return [sender for sender in senders if sender not in answered]
@@ -2,40 +2,58 @@
 图像处理模块
 负责处理图像相关功能，包括:
 - 图像生成请求识别
-- 随机图片获取
-- API图像生成
+- 随机图片获取（预取池）
+- API图像生成（提示词一次生成并缓存）
 - 临时文件管理
 """
 
 import os
+import json
 import logging
+import threading
+import unicodedata
+import uuid
 import requests
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional, List, Tuple
 import re
 import time
-from src.services.ai.llm_service import LLMService
+from src.services.ai.model_router import get_model_router, CALL_IMAGE_PROMPT
+from src.handlers.intent import get_intent_router, INTENT_RANDOM_IMAGE, INTENT_IMAGE_GENERATION
+from src.services.image_pool import RandomImagePool, make_image_source
+from src.config import RandomImageSettings
+from src.utils.executor import get_executor, POOL_LLM_UTILITY
+from src.utils.metrics import metrics
 
 # 修改logger获取方式，确保与main模块一致
 logger = logging.getLogger('main')
 
+# 提示词缓存条目数
+PROMPT_CACHE_SIZE = 256
+# 忽略的标点和空白，用于归一化中文描述
+PROMPT_PUNCTUATION = re.compile(r'[\s，。！？、；：,.!?;:~～…"\'“”‘’（）()]+')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """归一化图片描述（全角转半角、去标点空白、小写），作为提示词缓存键"""
+    return PROMPT_PUNCTUATION.sub('', unicodedata.normalize('NFKC', prompt)).lower()
+
 class ImageHandler:
-    def __init__(self, root_dir, api_key, base_url, image_model):
+    def __init__(self, root_dir, api_key, base_url, image_model, random_image=None, fuse_prompt_calls=True):
+        """
+        Args:
+            random_image: 随机图片设置（RandomImageSettings），为空时使用默认来源
+            fuse_prompt_calls: 是否用一次调用同时生成扩展提示词、创意提示词和负面词
+        """
         self.root_dir = root_dir
         self.api_key = api_key
         self.base_url = base_url
         self.image_model = image_model
         self.temp_dir = os.path.join(root_dir, "data", "images", "temp")
         
-        # 复用消息模块的AI实例(使用正确的模型名称)
-        self.text_ai = LLMService(
-            api_key=api_key,
-            base_url=base_url,
-            model="deepseek-ai/DeepSeek-V3",  # 修改为默认免费模型
-            max_token=2048,
-            temperature=0.5,
-            max_groups=15
-        )
+        # 提示词扩展/优化属于辅助调用，路由到轻量模型
+        self.text_ai = get_model_router().get_service(CALL_IMAGE_PROMPT, max_groups=15)
         
         # 多语言提示模板
         self.prompt_templates = {
@@ -90,117 +108,56 @@ class ImageHandler:
             "现有通用负面词：{existing_negatives}"
         )
 
+        # 合并生成提示词的模板（要求返回JSON）
+        self.fused_prompt_template = (
+            "你是一位专业插画师，请根据以下图片描述生成绘画提示词，只返回一个JSON对象，不要输出其它内容：\n"
+            "{{\"expanded\": \"英文提示词，包含主体细节（至少3个特征）、环境背景、艺术风格、质量参数\", "
+            "\"creative\": \"英文创意提示词，包含构图指导/色彩方案/光影效果，禁止包含水印/文字/低质量描述\", "
+            "\"negatives\": [\"5个与描述内容冲突的英文负面提示词，不要重复通用负面词\"]}}\n"
+            "描述内容：{prompt}\n"
+            "现有通用负面词：{existing_negatives}"
+        )
+
         # 提示词扩展触发条件
         self.prompt_extend_threshold = 30  # 字符数阈值
 
+        # 提示词生成：默认一次调用完成，结果按归一化后的描述缓存
+        self.fuse_prompt_calls = fuse_prompt_calls
+        self._prompt_cache: "OrderedDict[str, Tuple[str, str, str]]" = OrderedDict()
+        self._prompt_cache_lock = threading.Lock()
+        # 不合并时，两个互不依赖的优化调用在辅助模型线程池中并发执行
+        self.executor = get_executor()
+
         os.makedirs(self.temp_dir, exist_ok=True)
 
+        # 随机图片预取池：后台保持若干张图片就绪，收到请求直接取用
+        random_image = random_image or RandomImageSettings()
+        self.random_image_pool = RandomImagePool(
+            source=make_image_source(random_image.source, root_dir),
+            pool_dir=os.path.join(root_dir, "data", "images", "random_pool"),
+            target=random_image.pool_size,
+            max_bytes=random_image.max_pool_mb * 1024 * 1024
+        )
+
     def is_random_image_request(self, message: str) -> bool:
         """检查消息是否为请求图片的模式"""
-        # 基础词组
-        basic_patterns = [
-            r'来个图',
-            r'来张图',
-            r'来点图',
-            r'想看图',
-        ]
-        
-        # 将消息转换为小写以进行不区分大小写的匹配
-        message = message.lower()
-        
-        # 1. 检查基础模式
-        if any(pattern in message for pattern in basic_patterns):
-            return True
-            
-        # 2. 检查更复杂的模式
-        complex_patterns = [
-            r'来[张个幅]图',
-            r'发[张个幅]图',
-            r'看[张个幅]图',
-        ]
-        
-        if any(re.search(pattern, message) for pattern in complex_patterns):
-            return True
-            
-        return False
+        return INTENT_RANDOM_IMAGE in get_intent_router().route(message)
+
+    def prefetch_random_images(self):
+        """开始在后台预取随机图片"""
+        self.random_image_pool.refill()
 
     def get_random_image(self) -> Optional[str]:
-        """从API获取随机图片并保存"""
+        """从预取池取出一张随机图片（发送后由调用方删除）"""
         try:
-            if not os.path.exists(self.temp_dir):
-                os.makedirs(self.temp_dir)
-                
-            # 获取图片链接
-            response = requests.get('https://t.mwm.moe/pc')
-            if response.status_code == 200:
-                # 生成唯一文件名
-                timestamp = int(time.time())
-                image_path = os.path.join(self.temp_dir, f'image_{timestamp}.jpg')
-                
-                # 保存图片
-                with open(image_path, 'wb') as f:
-                    f.write(response.content)
-                
-                return image_path
+            return self.random_image_pool.take()
         except Exception as e:
             logger.error(f"获取图片失败: {str(e)}")
         return None
 
     def is_image_generation_request(self, text: str) -> bool:
         """判断是否为图像生成请求"""
-        # 基础动词
-        draw_verbs = ["画", "绘", "生成", "创建", "做"]
-        
-        # 图像相关词
-        image_nouns = ["图", "图片", "画", "照片", "插画", "像"]
-        
-        # 数量词
-        quantity = ["一下", "一个", "一张", "个", "张", "幅"]
-        
-        # 组合模式
-        patterns = [
-            r"画.*[猫狗人物花草山水]",
-            r"画.*[一个张只条串份副幅]",
-            r"帮.*画.*",
-            r"给.*画.*",
-            r"生成.*图",
-            r"创建.*图",
-            r"能.*画.*吗",
-            r"可以.*画.*吗",
-            r"要.*[张个幅].*图",
-            r"想要.*图",
-            r"做[一个张]*.*图",
-            r"画画",
-            r"画一画",
-        ]
-        
-        # 1. 检查正则表达式模式
-        if any(re.search(pattern, text) for pattern in patterns):
-            return True
-            
-        # 2. 检查动词+名词组合
-        for verb in draw_verbs:
-            for noun in image_nouns:
-                if f"{verb}{noun}" in text:
-                    return True
-                # 检查带数量词的组合
-                for q in quantity:
-                    if f"{verb}{q}{noun}" in text:
-                        return True
-                    if f"{verb}{noun}{q}" in text:
-                        return True
-        
-        # 3. 检查特定短语
-        special_phrases = [
-            "帮我画", "给我画", "帮画", "给画",
-            "能画吗", "可以画吗", "会画吗",
-            "想要图", "要图", "需要图",
-        ]
-        
-        if any(phrase in text for phrase in special_phrases):
-            return True
-        
-        return False
+        return INTENT_IMAGE_GENERATION in get_intent_router().route(text)
 
     def _expand_prompt(self, prompt: str) -> str:
         """使用AI模型扩展简短提示词"""
@@ -268,17 +225,17 @@ class ImageHandler:
     def _optimize_prompt(self, prompt: str) -> Tuple[str, str]:
         """多阶段提示词优化"""
         try:
-            # 第一阶段：基础优化
-            stage1 = self.text_ai.chat([{
+            # 基础优化和创意增强互不依赖，并发执行
+            stage1_future = self.executor.submit_future(POOL_LLM_UTILITY, self.text_ai.chat, [{
                 "role": "user",
                 "content": self.prompt_templates['basic'].format(prompt=prompt)
             }])
-            
-            # 第二阶段：创意增强
-            stage2 = self.text_ai.chat([{
+            stage2_future = self.executor.submit_future(POOL_LLM_UTILITY, self.text_ai.chat, [{
                 "role": "user",
                 "content": self.prompt_templates['creative'].format(prompt=prompt)
             }])
+            stage1 = stage1_future.result()
+            stage2 = stage2_future.result()
             
             # 混合策略：取两次优化的关键要素
             final_prompt = f"{stage1}, {stage2.split(',')[-1]}"
@@ -288,6 +245,90 @@ class ImageHandler:
             logger.error(f"提示词优化失败: {str(e)}")
             return prompt, "raw"
 
+    def _fused_prompts(self, prompt: str) -> Optional[Tuple[str, str]]:
+        """一次调用生成优化后的提示词和负面提示词，调用或解析失败时返回 None"""
+        try:
+            response = self.text_ai.chat([{
+                "role": "user",
+                "content": self.fused_prompt_template.format(
+                    prompt=prompt,
+                    existing_negatives=', '.join(self.base_negative_prompts[:10])
+                )
+            }], temperature=0.7)
+        except Exception as e:
+            logger.warning(f"合并提示词调用失败，改为逐步生成: {str(e)}")
+            return None
+        match = re.search(r'\{.*\}', response or "", re.S)
+        if not match:
+            logger.warning(f"合并提示词结果不是JSON: {response}")
+            return None
+        try:
+            data = json.loads(match.group(0))
+            expanded = str(data.get('expanded', '')).strip()
+            creative = str(data.get('creative', '')).strip()
+            negatives = data.get('negatives', [])
+            if isinstance(negatives, str):
+                negatives = negatives.split(',')
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"解析合并提示词结果失败: {str(e)}")
+            return None
+        if not expanded:
+            return None
+
+        # 与多阶段优化相同的混合策略：基础提示词加上创意提示词的最后一个要素
+        final_prompt = f"{expanded}, {creative.split(',')[-1].strip()}" if creative else expanded
+        final_negatives = set(self.base_negative_prompts)
+        final_negatives.update(n.strip().lower() for n in negatives if str(n).strip())
+        return final_prompt, ', '.join(final_negatives)
+
+    def _staged_prompts(self, prompt: str) -> Tuple[str, str, str]:
+        """逐步生成：扩展、优化（两次调用并发）、负面提示词"""
+        # 自动扩展短提示词
+        if len(prompt) <= self.prompt_extend_threshold:
+            prompt = self._expand_prompt(prompt)
+
+        # 多阶段提示词优化
+        optimized_prompt, strategy = self._optimize_prompt(prompt)
+
+        # 构建负面提示词
+        negative_prompt = self._build_final_negatives(optimized_prompt)
+        return optimized_prompt, negative_prompt, strategy
+
+    def _prepare_prompts(self, prompt: str) -> Tuple[str, str, str]:
+        """
+        生成绘画提示词和负面提示词，相同描述直接使用缓存
+
+        Returns:
+            Tuple[str, str, str]: (提示词, 负面提示词, 策略)
+        """
+        key = normalize_prompt(prompt)
+        with self._prompt_cache_lock:
+            cached = self._prompt_cache.get(key)
+            if cached is not None:
+                self._prompt_cache.move_to_end(key)
+        if cached is not None:
+            metrics.incr("image_prompt.cache", result="hit")
+            return cached
+        metrics.incr("image_prompt.cache", result="miss")
+
+        started = time.time()
+        result = None
+        if self.fuse_prompt_calls:
+            fused = self._fused_prompts(prompt)
+            if fused is not None:
+                result = (fused[0], fused[1], "fused")
+        if result is None:
+            result = self._staged_prompts(prompt)
+        metrics.observe("image_prompt.latency_ms", (time.time() - started) * 1000, strategy=result[2])
+
+        # 优化失败（使用原始描述或模型返回为空）时不缓存
+        if result[2] != "raw" and result[0].strip(', '):
+            with self._prompt_cache_lock:
+                self._prompt_cache[key] = result
+                while len(self._prompt_cache) > PROMPT_CACHE_SIZE:
+                    self._prompt_cache.popitem(last=False)
+        return result
+
     def _select_quality_profile(self, prompt: str) -> dict:
         """根据提示词复杂度选择质量配置"""
         word_count = len(prompt.split())
@@ -297,20 +338,25 @@ class ImageHandler:
             return self.quality_profiles['standard']
         return self.quality_profiles['fast']
 
-    def generate_image(self, prompt: str) -> Optional[str]:
-        """整合版图像生成方法"""
+    def generate_image(self, prompt: str, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        """
+        整合版图像生成方法
+
+        Args:
+            prompt: 图片描述
+            cancel_event: 取消事件，在调用生成接口前和下载过程中检查
+
+        Returns:
+            Optional[str]: 图片路径，失败或已取消时返回 None
+        """
         try:
-            # 自动扩展短提示词
-            if len(prompt) <= self.prompt_extend_threshold:
-                prompt = self._expand_prompt(prompt)
-            
-            # 多阶段提示词优化
-            optimized_prompt, strategy = self._optimize_prompt(prompt)
+            # 生成提示词和负面提示词（默认一次调用，相同描述使用缓存）
+            optimized_prompt, negative_prompt, strategy = self._prepare_prompts(prompt)
             logger.info(f"优化策略: {strategy}, 优化后提示词: {optimized_prompt}")
-            
-            # 构建负面提示词
-            negative_prompt = self._build_final_negatives(optimized_prompt)
             logger.info(f"最终负面提示词: {negative_prompt}")
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info("图像生成已取消")
+                return None
             
             # 质量配置选择
             quality_config = self._select_quality_profile(optimized_prompt)
@@ -346,14 +392,7 @@ class ImageHandler:
             result = response.json()
             if "data" in result and len(result["data"]) > 0:
                 img_url = result["data"][0]["url"]
-                img_response = requests.get(img_url)
-                if img_response.status_code == 200:
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    temp_path = os.path.join(self.temp_dir, f"image_{timestamp}.jpg")
-                    with open(temp_path, "wb") as f:
-                        f.write(img_response.content)
-                    logger.info(f"图片已保存到: {temp_path}")
-                    return temp_path
+                return self._download_image(img_url, cancel_event)
             logger.error("API返回的数据中没有图片URL")
             return None
             
@@ -361,6 +400,31 @@ class ImageHandler:
             logger.error(f"图像生成失败: {str(e)}")
             return None
 
+    def _download_image(self, img_url: str, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        """边下载边写入临时文件，取消或失败时删除未完成的文件"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        temp_path = os.path.join(self.temp_dir, f"image_{timestamp}_{uuid.uuid4().hex[:8]}.jpg")
+        part_path = f"{temp_path}.part"
+        completed = False
+        try:
+            with requests.get(img_url, stream=True, timeout=30) as img_response:
+                if img_response.status_code != 200:
+                    logger.error(f"下载生成图片失败 - 状态码: {img_response.status_code}")
+                    return None
+                with open(part_path, "wb") as f:
+                    for chunk in img_response.iter_content(64 * 1024):
+                        if cancel_event is not None and cancel_event.is_set():
+                            logger.info("图像生成已取消，停止下载")
+                            return None
+                        f.write(chunk)
+            os.replace(part_path, temp_path)
+            completed = True
+            logger.info(f"图片已保存到: {temp_path}")
+            return temp_path
+        finally:
+            if not completed and os.path.exists(part_path):
+                os.remove(part_path)
+
     def cleanup_temp_dir(self):
         """清理临时目录中的旧图片"""
         try:
@@ -0,0 +1,113 @@
+"""
+消息接入模块
+负责在分发前过滤重复接收的微信消息，包括:
+- 按 (聊天, 发送者, 内容摘要) 生成消息指纹，LRU 记录近期消息的接收时间
+- 只在重建微信连接后的短时间内去重，丢弃重连前已经接收过的消息
+- 预编译群聊@机器人的匹配正则
+- 统计接收和丢弃的消息数
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 重建连接后的去重窗口（秒）：wxauto 重放的旧消息在这段时间内到达
+RECONNECT_WINDOW_SECONDS = 30
+# 只把重连前这段时间（秒）内接收过的消息视为可能被重放
+LOOKBACK_SECONDS = 120
+# LRU 保留的指纹数
+LRU_CAPACITY = 4096
+# 内容不能区分不同消息的占位文本（如动画表情），不参与去重
+NON_IDENTIFYING_CONTENT = frozenset({"[动画表情]"})
+
+
+class MessageDeduplicator:
+    """
+    丢弃重连后重复接收的消息
+
+    平时不去重（用户连续发送相同的短消息是正常的），只记录接收时间；
+    mark_reconnect() 之后的窗口内，重连前不久接收过的消息视为重放并丢弃，每条只抵消一次
+    """
+
+    def __init__(self, reconnect_window: float = RECONNECT_WINDOW_SECONDS,
+                 lookback: float = LOOKBACK_SECONDS, capacity: int = LRU_CAPACITY):
+        self.reconnect_window = reconnect_window
+        self.lookback = lookback
+        self.capacity = capacity
+        # 指纹 -> 最近接收时间
+        self._recent: "OrderedDict[bytes, float]" = OrderedDict()
+        self._reconnected_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(chat_id: str, sender: str, content: str) -> bytes:
+        content_hash = hashlib.sha1(content.encode('utf-8')).digest()
+        return hashlib.blake2b(
+            b'\x00'.join((chat_id.encode('utf-8'), sender.encode('utf-8'), content_hash)),
+            digest_size=16
+        ).digest()
+
+    def mark_reconnect(self, now: Optional[float] = None):
+        """重建微信连接后调用，开启去重窗口"""
+        with self._lock:
+            self._reconnected_at = now if now is not None else time.time()
+
+    def is_duplicate(self, chat_id: str, sender: str, content: str, now: Optional[float] = None) -> bool:
+        """
+        判断消息是否为重连后重放的旧消息，每条消息都会记录接收时间
+
+        Args:
+            chat_id: 聊天名称
+            sender: 发送者
+            content: 消息内容
+            now: 接收时间，默认当前时间
+
+        Returns:
+            bool: 是否为重复消息
+        """
+        if content in NON_IDENTIFYING_CONTENT:
+            return False
+        now = now if now is not None else time.time()
+        fingerprint = self.fingerprint(chat_id, sender, content)
+        with self._lock:
+            last_seen = self._recent.pop(fingerprint, None)
+            self._recent[fingerprint] = now
+            if len(self._recent) > self.capacity:
+                self._recent.popitem(last=False)
+            reconnected_at = self._reconnected_at
+            duplicate = (
+                reconnected_at is not None
+                and now - reconnected_at <= self.reconnect_window
+                and last_seen is not None
+                and reconnected_at - self.lookback <= last_seen < reconnected_at
+            )
+        if duplicate:
+            metrics.incr("ingest.dropped", reason="duplicate")
+            return True
+        metrics.incr("ingest.accepted")
+        return False
+
+
+def compile_mention_pattern(robot_name: str, require_at: bool = False) -> Optional[re.Pattern]:
+    """
+    预编译群聊中@机器人（或叫机器人名字）的匹配正则
+
+    Args:
+        robot_name: 机器人微信名称
+        require_at: 是否必须带 @，用于从消息中去掉@机器人的部分
+
+    Returns:
+        Optional[re.Pattern]: 名称为空时返回 None
+    """
+    if not robot_name:
+        return None
+    prefix = '@' if require_at else '@?'
+    return re.compile(f'{prefix}{re.escape(robot_name)}\u2005')
@@ -0,0 +1,270 @@
+"""
+意图识别模块
+负责一次扫描识别消息中的所有意图，包括:
+- 关键词编译为 Aho-Corasick 自动机
+- 正则规则按意图分组后合并为一个分支表达式，一次 finditer 扫描找出命中的意图
+- 支持从配置文件扩展关键词和正则
+"""
+
+import logging
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.config import config
+from modules.reminder.time_recognition import REMINDER_INTENT_KEYWORDS
+
+logger = logging.getLogger('main')
+
+# 意图类型
+INTENT_VOICE = "voice"
+INTENT_RANDOM_IMAGE = "random_image"
+INTENT_IMAGE_GENERATION = "image_generation"
+INTENT_DEBUG = "debug"
+INTENT_REMINDER = "reminder"
+
+
+def _image_generation_keywords() -> List[str]:
+    """展开画图请求的动词+名词(+数量词)组合和特定短语"""
+    draw_verbs = ["画", "绘", "生成", "创建", "做"]
+    image_nouns = ["图", "图片", "画", "照片", "插画", "像"]
+    quantity = ["一下", "一个", "一张", "个", "张", "幅"]
+    keywords = []
+    for verb in draw_verbs:
+        for noun in image_nouns:
+            keywords.append(f"{verb}{noun}")
+            for q in quantity:
+                keywords.append(f"{verb}{q}{noun}")
+                keywords.append(f"{verb}{noun}{q}")
+    keywords += [
+        "帮我画", "给我画", "帮画", "给画",
+        "能画吗", "可以画吗", "会画吗",
+        "想要图", "要图", "需要图",
+        "画画", "画一画",
+    ]
+    return keywords
+
+
+# 默认关键词（全部为纯文本，编译进自动机）
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    INTENT_VOICE: ["语音"],
+    INTENT_RANDOM_IMAGE: [
+        "来个图", "来张图", "来点图", "想看图",
+        "来幅图", "发张图", "发个图", "发幅图", "看张图", "看个图", "看幅图",
+    ],
+    INTENT_IMAGE_GENERATION: _image_generation_keywords(),
+    INTENT_REMINDER: list(REMINDER_INTENT_KEYWORDS),
+}
+
+# 默认正则（合并为一个分支表达式）
+DEFAULT_PATTERNS: Dict[str, List[str]] = {
+    INTENT_IMAGE_GENERATION: [
+        r"画.*[猫狗人物花草山水]",
+        r"画.*[一个张只条串份副幅]",
+        r"帮.*画.*",
+        r"给.*画.*",
+        r"生成.*图",
+        r"创建.*图",
+        r"能.*画.*吗",
+        r"可以.*画.*吗",
+        r"要.*[张个幅].*图",
+        r"想要.*图",
+        r"做[一个张]*.*图",
+    ],
+    INTENT_DEBUG: [r"^\s*/"],
+}
+
+# 开头的全局标记（(?i)），放进分组后不再合法
+_GLOBAL_FLAGS_RE = re.compile(r"\(\?[aiLmsux]+\)")
+# 按编号引用分组（\1、(?(1)...)），合并进分支表达式后编号会错位
+_NUMBERED_BACKREF_RE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d+\)")
+
+
+class AhoCorasick:
+    """多模式字符串匹配自动机，一次扫描找出所有命中的关键词"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+        self._built = False
+
+    def add(self, keyword: str, label: str):
+        """添加关键词及其标签"""
+        if not keyword:
+            return
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(label)
+        self._built = False
+
+    def build(self):
+        """按广度优先计算失配指针"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            current = queue.popleft()
+            for ch, next_state in self._goto[current].items():
+                queue.append(next_state)
+                fallback = self._fail[current]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] |= self._output[self._fail[next_state]]
+        self._built = True
+
+    def search(self, text: str) -> Set[str]:
+        """返回文本中命中的所有标签"""
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class IntentRouter:
+    """统一意图路由器：一次扫描返回消息命中的所有意图"""
+
+    def __init__(self, keywords: Optional[Dict[str, Iterable[str]]] = None,
+                 patterns: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        初始化意图路由器
+
+        Args:
+            keywords: 追加的 意图 -> 关键词 列表
+            patterns: 追加的 意图 -> 正则 列表
+        """
+        self._keywords: Dict[str, List[str]] = {k: list(v) for k, v in DEFAULT_KEYWORDS.items()}
+        self._patterns: Dict[str, List[str]] = {k: list(v) for k, v in DEFAULT_PATTERNS.items()}
+        self._lock = threading.Lock()
+        for intent, words in (keywords or {}).items():
+            self._keywords.setdefault(intent, []).extend(words)
+        for intent, regexes in (patterns or {}).items():
+            self._patterns.setdefault(intent, []).extend(regexes)
+        self._compile()
+
+    def _compile(self):
+        """编译关键词自动机和合并正则"""
+        automaton = AhoCorasick()
+        for intent, words in self._keywords.items():
+            for word in words:
+                automaton.add(word.lower(), intent)
+        automaton.build()
+
+        # 每个意图一个命名分组，分组之间为分支关系，一次 finditer 扫描全文
+        group_names = {}
+        intent_patterns = {}
+        parts = []
+        for index, (intent, regexes) in enumerate(self._patterns.items()):
+            valid = []
+            for regex in regexes:
+                error = self._check_pattern(regex)
+                if error:
+                    logger.warning(f"意图 {intent} 的正则无法合并，已忽略: {regex} ({error})")
+                    continue
+                valid.append(regex)
+            if not valid:
+                continue
+            group = f"g{index}"
+            group_names[group] = intent
+            intent_patterns[intent] = [re.compile(regex) for regex in valid]
+            parts.append(f"(?P<{group}>{'|'.join(f'(?:{regex})' for regex in valid)})")
+        combined = None
+        if parts:
+            try:
+                combined = re.compile("|".join(parts))
+            except re.error as e:
+                # 例如不同正则里定义了同名分组，退回逐个意图匹配
+                logger.warning(f"意图正则合并失败，改为逐个匹配: {str(e)}")
+
+        self._automaton = automaton
+        self._combined = combined
+        self._group_names = group_names
+        self._intent_patterns = intent_patterns
+
+    @staticmethod
+    def _check_pattern(regex: str) -> Optional[str]:
+        """检查正则能否放进合并表达式的分组中，不能时返回原因"""
+        if _GLOBAL_FLAGS_RE.match(regex):
+            return "合并后全局标记会作用于所有正则，请改写为 (?i:...) 这样的局部标记"
+        if _NUMBERED_BACKREF_RE.search(regex):
+            return "合并后分组编号会变化，请改用命名分组引用 (?P=name)"
+        try:
+            re.compile(f"(?P<_probe>(?:{regex}))")
+        except re.error as e:
+            return str(e)
+        return None
+
+    def add_keywords(self, intent: str, keywords: Iterable[str]):
+        """运行时追加关键词并重新编译"""
+        with self._lock:
+            self._keywords.setdefault(intent, []).extend(keywords)
+            self._compile()
+
+    def add_patterns(self, intent: str, patterns: Iterable[str]):
+        """运行时追加正则并重新编译"""
+        with self._lock:
+            self._patterns.setdefault(intent, []).extend(patterns)
+            self._compile()
+
+    def route(self, text: str) -> Set[str]:
+        """
+        识别消息中的所有意图
+
+        Args:
+            text: 消息内容
+
+        Returns:
+            Set[str]: 命中的意图集合
+        """
+        if not text:
+            return set()
+        intents = self._automaton.search(text.lower())
+        if self._combined is not None:
+            matched = {self._group_names[match.lastgroup] for match in self._combined.finditer(text)}
+            if not matched:
+                return intents
+        elif not self._intent_patterns:
+            return intents
+        else:
+            matched = set()
+        # 匹配会占用文本，其他意图的匹配可能从被占用的范围内开始，逐个确认（未命中任何正则时不需要）
+        for intent, patterns in self._intent_patterns.items():
+            if intent not in matched and any(pattern.search(text) for pattern in patterns):
+                matched.add(intent)
+        return intents | matched
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router() -> IntentRouter:
+    """获取全局意图路由器（首次调用时按配置编译）"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = IntentRouter(
+                keywords=config.intent.keywords,
+                patterns=config.intent.patterns
+            )
+        return _router
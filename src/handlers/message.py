@@ -7,6 +7,7 @@
 - 多媒体消息处理
 """
 
+import itertools
 import logging
 import threading
 import time
@@ -18,6 +19,7 @@ from services.database import Session, ChatMessage
 import random
 import os
 from services.ai.llm_service import LLMService
+from src.services.ai.model_router import get_model_router, CALL_TIME_RECOGNITION
 # 替换旧的记忆处理器导入
 from modules.memory.memory_service import MemoryService
 from config import config
@@ -26,10 +28,29 @@ from modules.reminder.time_recognition import TimeRecognitionService
 from modules.reminder import ReminderService
 # 导入调试命令处理器
 from src.handlers.debug import DebugCommandHandler
+from src.handlers.intent import (
+    get_intent_router, INTENT_DEBUG, INTENT_VOICE, INTENT_RANDOM_IMAGE,
+    INTENT_IMAGE_GENERATION, INTENT_REMINDER
+)
+from src.handlers.message_source import MessageSource, is_system_source
+from src.utils.metrics import metrics
+from src.services.background import get_background_queue, get_load_monitor
+from src.utils.executor import get_executor, POOL_IO
+from src.services.generation_scheduler import get_generation_scheduler
+from src.services.outbox import get_outbox, SerializedWeChat
+from src.handlers.group_aggregation import build_group_prompt, group_entries, missing_senders, split_group_reply
+from src.services.image_jobs import ImageJobQueue
+from src.utils.janitor import get_file_leases
 
 # 修改logger获取方式，确保与main模块一致
 logger = logging.getLogger('main')
 
+# 提醒识别最迟在收到消息后多少秒内执行
+REMINDER_CHECK_DEADLINE = 20
+# 消息队列等待图片识别结果的最长时间（秒）
+PLACEHOLDER_MAX_WAIT = 60
+PLACEHOLDER_TIMEOUT_TEXT = "发送了图片（识别超时）"
+
 class MessageHandler:
     def __init__(self, root_dir, api_key, base_url, model, max_token, temperature, 
                  max_groups, robot_name, prompt_content, image_handler, emoji_handler, voice_handler, memory_service):
@@ -57,10 +78,12 @@ class MessageHandler:
         self.queue_timers = {}    # 存储每个用户的定时器，格式：{queue_key: timer}
         self.QUEUE_TIMEOUT = 8    # 队列等待时间（秒）
         self.queue_lock = threading.Lock()
+        self.placeholders = {}  # 等待图片识别的占位消息，格式：{占位ID: (queue_key, 消息位置, 预留时间)}
+        self._placeholder_seq = itertools.count(1)
         self.chat_contexts = {}
         
-        # 微信实例
-        self.wx = WeChat()
+        # 微信实例，发送调用全局串行
+        self.wx = SerializedWeChat(WeChat())
 
         # 添加 handlers
         self.image_handler = image_handler
@@ -73,26 +96,64 @@ class MessageHandler:
         self.current_avatar = os.path.basename(avatar_path)
         logger.info(f"当前使用角色: {self.current_avatar}")
         
+        # 初始化时间识别服务（路由到轻量模型）
+        self.time_recognition = TimeRecognitionService(
+            get_model_router().get_service(CALL_TIME_RECOGNITION)
+        )
+        logger.info("时间识别服务已初始化")
+
+        # 初始化提醒服务（传入自身实例）
+        self.reminder_service = ReminderService(self)
+        logger.info("提醒服务已初始化")
+
+        # 画图任务队列：后台生成，完成后再发送，不占用回复生成线程
+        image_generation = config.media.image_generation
+        self.image_generation_enabled = image_generation.enabled
+        self.image_jobs = ImageJobQueue(
+            generate=self.image_handler.generate_image,
+            deliver=self._deliver_generated_image,
+            max_concurrent=image_generation.max_concurrent,
+            max_pending=image_generation.max_pending
+        )
+
         # 初始化调试命令处理器
         self.debug_handler = DebugCommandHandler(
             root_dir=root_dir,
             memory_service=memory_service,
-            llm_service=self.deepseek
+            llm_service=self.deepseek,
+            reminder_service=self.reminder_service,
+            image_jobs=self.image_jobs
         )
         logger.info("调试命令处理器已初始化")
-        
-        # 初始化时间识别服务（使用已有的 deepseek 实例）
-        self.time_recognition = TimeRecognitionService(self.deepseek)
-        logger.info("时间识别服务已初始化")
 
-        # 初始化提醒服务（传入自身实例）
-        self.reminder_service = ReminderService(self)
-        logger.info("提醒服务已初始化")
+        # 群聊合并模式：同一群聊的成员共用一个消息队列，一次请求分别回复
+        self.group_aggregation = config.group.aggregate_mentions
+
+        # 统一意图路由器（启动时编译全部触发词）
+        self.intent_router = get_intent_router()
+
+        # 回复生成调度器：按聊天公平排队，单个聊天刷屏不影响其他聊天
+        self.generation_scheduler = get_generation_scheduler()
+        self.generation_scheduler.set_workers(config.llm.max_concurrent_replies)
+
+        # 文本回复交给按聊天排队的发送队列，分段停顿不占用生成线程
+        self.outbox = get_outbox()
+
+        # 负载监测：等待合并和等待生成的消息也算作交互负载，后台任务据此让路
+        self.load_monitor = get_load_monitor()
+        self.load_monitor.set_queue_depth_provider(
+            lambda: len(self.message_queues) + self.generation_scheduler.pending()
+        )
+        self.background_queue = get_background_queue()
+        # 保存聊天记录、系统消息等即发即忘任务使用有界线程池，避免消息洪峰时线程数失控
+        self.executor = get_executor()
 
     def _get_queue_key(self, chat_id: str, sender_name: str, is_group: bool) -> str:
         """生成队列键值
-        在群聊中使用 chat_id + sender_name 作为键，在私聊中仅使用 chat_id"""
-        return f"{chat_id}_{sender_name}" if is_group else chat_id
+        在群聊中使用 chat_id + sender_name 作为键（开启群聊合并时仅使用 chat_id），在私聊中仅使用 chat_id"""
+        if is_group and not self.group_aggregation:
+            return f"{chat_id}_{sender_name}"
+        return chat_id
 
     def save_message(self, sender_id: str, sender_name: str, message: str, reply: str, is_system_message: bool = False):
         """保存聊天记录到数据库和短期记忆"""
@@ -160,14 +221,26 @@ class MessageHandler:
             return self.deepseek.get_response(message, user_id, self.prompt_content)
 
     def handle_user_message(self, content: str, chat_id: str, sender_name: str, 
-                     username: str, is_group: bool = False, is_image_recognition: bool = False):
-        """统一的消息处理入口"""
+                     username: str, is_group: bool = False, is_image_recognition: bool = False,
+                     source: str = MessageSource.USER):
+        """统一的消息处理入口
+
+        Args:
+            source: 消息来源，系统消息（提醒、定时任务、主动消息）跳过消息合并和时间识别
+        """
         try:
-            logger.info(f"收到消息 - 来自: {sender_name}" + (" (群聊)" if is_group else ""))
+            logger.info(f"收到消息 - 来自: {sender_name}, 来源: {source}" + (" (群聊)" if is_group else ""))
             logger.debug(f"消息内容: {content}")
+
+            # 系统消息直接生成回复
+            if is_system_source(source):
+                metrics.incr("messages.received", source=source)
+                self._dispatch_system_message(content, chat_id, sender_name, username, is_group, source)
+                return None
             
             # 处理调试命令
-            if self.debug_handler.is_debug_command(content):
+            if INTENT_DEBUG in self.intent_router.route(content):
+                started = time.time()
                 logger.info(f"检测到调试命令: {content}")
                 intercept, response = self.debug_handler.process_command(
                     command=content,
@@ -179,12 +252,17 @@ class MessageHandler:
                     # 发送调试命令的响应
                     if is_group:
                         response = f"@{sender_name} {response}"
-                    self.wx.SendMsg(msg=response, who=chat_id)
+                    self.outbox.send(chat_id, self._send_text, response, chat_id)
                     
                     # 不记录调试命令的对话
                     logger.info(f"已处理调试命令: {content}")
+                    metrics.incr("messages.received", source=MessageSource.DEBUG)
+                    metrics.incr("messages.processed", source=MessageSource.DEBUG)
+                    metrics.observe("messages.latency_ms", (time.time() - started) * 1000,
+                                    source=MessageSource.DEBUG)
                     return None
             
+            metrics.incr("messages.received", source=source)
             # 将消息添加到队列，不直接处理
             self._add_to_message_queue(content, chat_id, sender_name, username, is_group, is_image_recognition)
             
@@ -196,52 +274,115 @@ class MessageHandler:
                             username: str, is_group: bool, is_image_recognition: bool):
         """添加消息到队列并设置定时器"""
         with self.queue_lock:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            queue_key = self._get_queue_key(chat_id, sender_name, is_group)
-            
-            # 初始化或更新队列
-            if queue_key not in self.message_queues:
-                logger.info(f"[消息队列] 创建新队列 - 用户: {sender_name}" + (" (群聊)" if is_group else ""))
-                self.message_queues[queue_key] = {
-                    'messages': [f"[{current_time}]\n{content}"],  # 第一条消息带时间戳
-                    'chat_id': chat_id,  # 保存原始chat_id用于发送消息
-                    'sender_name': sender_name,
-                    'username': username,
-                    'is_group': is_group,
-                    'is_image_recognition': is_image_recognition,
-                    'last_update': time.time()
-                }
-                logger.debug(f"[消息队列] 首条消息: {content[:50]}...")
-            else:
-                # 添加新消息到现有队列，后续消息不带时间戳
-                self.message_queues[queue_key]['messages'].append(content)
-                self.message_queues[queue_key]['last_update'] = time.time()
-                msg_count = len(self.message_queues[queue_key]['messages'])
-                logger.info(f"[消息队列] 追加消息 - 用户: {sender_name}, 当前消息数: {msg_count}")
-                logger.debug(f"[消息队列] 新增消息: {content[:50]}...")
-
-            # 取消现有的定时器
-            if queue_key in self.queue_timers and self.queue_timers[queue_key]:
-                try:
-                    self.queue_timers[queue_key].cancel()
-                    logger.debug(f"[消息队列] 重置定时器 - 用户: {sender_name}")
-                except Exception as e:
-                    logger.error(f"[消息队列] 取消定时器失败: {str(e)}")
-                self.queue_timers[queue_key] = None
-
-            # 创建新的定时器
-            timer = threading.Timer(
-                self.QUEUE_TIMEOUT, 
-                self._process_message_queue, 
-                args=[queue_key]
-            )
-            timer.daemon = True
-            timer.start()
-            self.queue_timers[queue_key] = timer
-            logger.info(f"[消息队列] 设置新定时器 - 用户: {sender_name}, {self.QUEUE_TIMEOUT}秒后处理")
+            queue_key, _ = self._append_to_queue(content, chat_id, sender_name, username,
+                                                 is_group, is_image_recognition)
+            self._arm_queue_timer(queue_key, sender_name, self.QUEUE_TIMEOUT)
+
+    def _append_to_queue(self, content: str, chat_id: str, sender_name: str,
+                         username: str, is_group: bool, is_image_recognition: bool):
+        """把消息追加到队列（调用方持有队列锁），返回 (队列键, 消息位置)"""
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        queue_key = self._get_queue_key(chat_id, sender_name, is_group)
+
+        # 初始化或更新队列
+        if queue_key not in self.message_queues:
+            logger.info(f"[消息队列] 创建新队列 - 用户: {sender_name}" + (" (群聊)" if is_group else ""))
+            self.message_queues[queue_key] = {
+                'messages': [f"[{current_time}]\n{content}"],  # 第一条消息带时间戳
+                'entries': [(sender_name, content)],  # 按发送者记录原始消息，用于群聊合并
+                'pending': set(),  # 等待图片识别结果的占位消息
+                'first_time': current_time,
+                'chat_id': chat_id,  # 保存原始chat_id用于发送消息
+                'sender_name': sender_name,
+                'username': username,
+                'is_group': is_group,
+                'is_image_recognition': is_image_recognition,
+                'last_update': time.time(),
+                'received_at': time.time()
+            }
+            logger.debug(f"[消息队列] 首条消息: {content[:50]}...")
+        else:
+            # 添加新消息到现有队列，后续消息不带时间戳
+            queue_data = self.message_queues[queue_key]
+            queue_data['messages'].append(content)
+            queue_data['entries'].append((sender_name, content))
+            queue_data['last_update'] = time.time()
+            queue_data['is_image_recognition'] = queue_data['is_image_recognition'] or is_image_recognition
+            msg_count = len(queue_data['messages'])
+            logger.info(f"[消息队列] 追加消息 - 用户: {sender_name}, 当前消息数: {msg_count}")
+            logger.debug(f"[消息队列] 新增消息: {content[:50]}...")
+        return queue_key, len(self.message_queues[queue_key]['messages']) - 1
+
+    def _arm_queue_timer(self, queue_key: str, sender_name: str, delay: float):
+        """重置队列定时器（调用方持有队列锁）"""
+        # 取消现有的定时器
+        if queue_key in self.queue_timers and self.queue_timers[queue_key]:
+            try:
+                self.queue_timers[queue_key].cancel()
+                logger.debug(f"[消息队列] 重置定时器 - 用户: {sender_name}")
+            except Exception as e:
+                logger.error(f"[消息队列] 取消定时器失败: {str(e)}")
+            self.queue_timers[queue_key] = None
+
+        # 创建新的定时器
+        timer = threading.Timer(
+            delay, 
+            self._process_message_queue, 
+            args=[queue_key]
+        )
+        timer.daemon = True
+        timer.start()
+        self.queue_timers[queue_key] = timer
+        logger.info(f"[消息队列] 设置新定时器 - 用户: {sender_name}, {delay:.0f}秒后处理")
+
+    def reserve_placeholder(self, chat_id: str, sender_name: str, username: str, is_group: bool = False) -> int:
+        """
+        在消息队列中为正在识别的图片预留位置，识别完成前队列不会被处理
+
+        Returns:
+            int: 占位ID，识别完成后传给 fill_placeholder
+        """
+        with self.queue_lock:
+            queue_key, index = self._append_to_queue("", chat_id, sender_name, username, is_group, True)
+            placeholder_id = next(self._placeholder_seq)
+            self.message_queues[queue_key]['pending'].add(placeholder_id)
+            self.placeholders[placeholder_id] = (queue_key, index, time.time())
+            self._arm_queue_timer(queue_key, sender_name, self.QUEUE_TIMEOUT)
+        metrics.incr("messages.received", source=MessageSource.USER)
+        metrics.set_gauge("vision.placeholders", len(self.placeholders))
+        return placeholder_id
+
+    def fill_placeholder(self, placeholder_id: int, content: Optional[str]):
+        """填入图片识别结果，并从此刻重新开始等待合并"""
+        with self.queue_lock:
+            slot = self.placeholders.pop(placeholder_id, None)
+            if slot is None:
+                logger.warning(f"[消息队列] 图片识别结果到达过晚，已丢弃: {(content or '')[:50]}")
+                metrics.incr("vision.late_results")
+                return
+            queue_key, index, reserved_at = slot
+            queue_data = self.message_queues[queue_key]
+            queue_data['pending'].discard(placeholder_id)
+            queue_data['messages'][index] += content or ""
+            sender_name = queue_data['entries'][index][0]
+            queue_data['entries'][index] = (sender_name, content or "")
+            queue_data['last_update'] = time.time()
+            self._arm_queue_timer(queue_key, sender_name, self.QUEUE_TIMEOUT)
+        metrics.observe("vision.placeholder_wait_ms", (time.time() - reserved_at) * 1000)
+        metrics.set_gauge("vision.placeholders", len(self.placeholders))
+
+    def _expire_placeholders(self, queue_data: dict):
+        """等待超时的占位消息填入超时提示（调用方持有队列锁）"""
+        for placeholder_id in list(queue_data['pending']):
+            _, index, _ = self.placeholders.pop(placeholder_id)
+            queue_data['messages'][index] += PLACEHOLDER_TIMEOUT_TEXT
+            queue_data['entries'][index] = (queue_data['entries'][index][0], PLACEHOLDER_TIMEOUT_TEXT)
+            metrics.incr("vision.placeholder_timeouts")
+        queue_data['pending'].clear()
+        metrics.set_gauge("vision.placeholders", len(self.placeholders))
 
     def _process_message_queue(self, queue_key: str):
-        """处理消息队列"""
+        """合并到期的消息队列，交给生成调度器按聊天公平排队"""
         try:
             with self.queue_lock:
                 if queue_key not in self.message_queues:
@@ -258,51 +399,192 @@ class MessageHandler:
                     logger.info(f"[消息队列] 等待更多消息 - 用户: {sender_name}, 剩余时间: {self.QUEUE_TIMEOUT - (current_time - last_update):.1f}秒")
                     return
 
-                # 获取并清理队列数据
+                # 还有图片在识别：延后处理，直到识别结果到达或等待超时
+                if queue_data['pending']:
+                    waited = current_time - min(self.placeholders[pid][2] for pid in queue_data['pending'])
+                    if waited < PLACEHOLDER_MAX_WAIT:
+                        logger.info(f"[消息队列] 等待图片识别 - 用户: {sender_name}")
+                        self._arm_queue_timer(queue_key, sender_name,
+                                              min(self.QUEUE_TIMEOUT, PLACEHOLDER_MAX_WAIT - waited))
+                        return
+                    logger.warning(f"[消息队列] 图片识别等待超时 - 用户: {sender_name}")
+                    self._expire_placeholders(queue_data)
+
+                # 获取并清理队列数据（生成回复不再占用队列锁，新消息可以继续入队）
                 queue_data = self.message_queues.pop(queue_key)
                 if queue_key in self.queue_timers:
                     self.queue_timers.pop(queue_key)
+
+            # 去掉识别失败留下的空消息
+            queue_data['entries'] = [(sender, text) for sender, text in queue_data['entries'] if text]
+            if not queue_data['entries']:
+                logger.info("[消息队列] 队列中没有可处理的内容，跳过")
+                return
+            queue_data['messages'] = [msg for msg in queue_data['messages'] if msg.strip()]
                 
-                messages = queue_data['messages']
-                chat_id = queue_data['chat_id']  # 使用保存的原始chat_id
-                username = queue_data['username']
-                sender_name = queue_data['sender_name']
-                is_group = queue_data['is_group']
-                is_image_recognition = queue_data['is_image_recognition']
-
-                # 合并消息
-                combined_message = "\n".join(messages)
-
-                # 打印日志信息
-                logger.info(f"[消息队列] 开始处理 - 用户: {sender_name}, 消息数: {len(messages)}")
-                logger.info("----------------------------------------")
-                logger.info("原始消息列表:")
-                for idx, msg in enumerate(messages, 1):
-                    logger.info(f"{idx}. {msg}")
-                logger.info("\n合并后的消息:")
-                logger.info(f"{combined_message}")
-                logger.info("----------------------------------------")
-
-                # 检查合并后的消息是否包含时间提醒
-                threading.Thread(
-                    target=self._check_time_reminder,
-                    args=(combined_message, chat_id, sender_name)
-                ).start()
-
-                # 检查是否为特殊请求(注释掉了生图功能)
-                if self.voice_handler.is_voice_request(combined_message):
-                    return self._handle_voice_request(combined_message, chat_id, sender_name, username, is_group)
-                elif self.image_handler.is_random_image_request(combined_message):
-                    return self._handle_random_image_request(combined_message, chat_id, sender_name, username, is_group)
-               # elif not is_image_recognition and self.image_handler.is_image_generation_request(combined_message):
-                    #return self._handle_image_generation_request(combined_message, chat_id, sender_name, username, is_group)
-                else:
-                    return self._handle_text_message(combined_message, chat_id, sender_name, username, is_group)
+            # 群聊合并模式下多位成员同时@：合并为一次请求
+            if queue_data['is_group'] and len(group_entries(queue_data['entries'])) > 1:
+                self._submit_group_reply(queue_data)
+                return
+
+            messages = queue_data['messages']
+            chat_id = queue_data['chat_id']  # 使用保存的原始chat_id
+            username = queue_data['username']
+            sender_name = queue_data['sender_name']
+            is_group = queue_data['is_group']
+
+            # 合并消息
+            combined_message = "\n".join(messages)
+
+            # 打印日志信息
+            logger.info(f"[消息队列] 开始处理 - 用户: {sender_name}, 消息数: {len(messages)}")
+            logger.info("----------------------------------------")
+            logger.info("原始消息列表:")
+            for idx, msg in enumerate(messages, 1):
+                logger.info(f"{idx}. {msg}")
+            logger.info("\n合并后的消息:")
+            logger.info(f"{combined_message}")
+            logger.info("----------------------------------------")
+
+            # 一次扫描识别合并消息中的所有意图
+            intents = self.intent_router.route(combined_message)
+
+            # 包含提醒意图时才检查时间提醒（后台执行，相对时间以收到消息的时间为准）
+            if INTENT_REMINDER in intents:
+                self.background_queue.submit(
+                    "time_recognition", self._check_time_reminder,
+                    combined_message, chat_id, sender_name, datetime.now(),
+                    deadline=REMINDER_CHECK_DEADLINE
+                )
+
+            self.generation_scheduler.submit(
+                chat_id, self._generate_user_reply,
+                combined_message, chat_id, sender_name, username, is_group, intents,
+                queue_data['received_at'],
+                source=MessageSource.USER
+            )
 
         except Exception as e:
             logger.error(f"处理消息队列失败: {str(e)}")
             return None
 
+    def _submit_group_reply(self, queue_data: dict):
+        """合并同一群聊中多位成员的消息，交给生成调度器"""
+        chat_id = queue_data['chat_id']
+        entries = queue_data['entries']
+        logger.info(f"[消息队列] 群聊合并处理 - 群聊: {chat_id}, 成员数: {len(group_entries(entries))}, 消息数: {len(entries)}")
+
+        # 提醒按成员分别识别
+        for sender_name, messages in group_entries(entries).items():
+            combined = "\n".join(messages)
+            if INTENT_REMINDER in self.intent_router.route(combined):
+                self.background_queue.submit(
+                    "time_recognition", self._check_time_reminder,
+                    combined, chat_id, sender_name, datetime.now(),
+                    deadline=REMINDER_CHECK_DEADLINE
+                )
+
+        metrics.incr("messages.group_aggregated")
+        metrics.observe("messages.group_senders", len(group_entries(entries)))
+        self.generation_scheduler.submit(
+            chat_id, self._generate_group_reply,
+            chat_id, queue_data['first_time'], entries, queue_data['received_at'],
+            source=MessageSource.USER
+        )
+
+    def _generate_group_reply(self, chat_id: str, first_time: str, entries, received_at: float):
+        """一次请求生成多位成员的回复，再拆分为逐个@的消息（由生成调度器调用）"""
+        try:
+            grouped = group_entries(entries)
+            senders = list(grouped)
+            prompt = build_group_prompt(first_time, entries)
+            with self.load_monitor.interactive():
+                reply = self.get_api_response(prompt, chat_id)
+                logger.info(f"AI回复(群聊合并): {reply}")
+                if "</think>" in reply:
+                    reply = reply.split("</think>", 1)[1].strip()
+
+                segments = split_group_reply(reply, senders)
+                for sender_name, segment in segments:
+                    self.outbox.send(chat_id, self._send_text_reply, f"@{sender_name} {segment}", chat_id)
+
+            # 模型漏答的成员单独生成回复
+            for sender_name in missing_senders(segments, senders):
+                logger.warning(f"群聊合并回复遗漏了成员 {sender_name}，单独生成回复")
+                metrics.incr("messages.group_missing")
+                content = f"[{first_time}]\n" + "\n".join(grouped[sender_name])
+                self.generation_scheduler.submit(
+                    chat_id, self._generate_user_reply,
+                    content, chat_id, sender_name, sender_name, True,
+                    self.intent_router.route(content), received_at,
+                    source=MessageSource.USER
+                )
+
+            self.executor.submit(POOL_IO, self.save_message,
+                                 chat_id, ",".join(senders), prompt, reply, False)
+            metrics.incr("messages.processed", source=MessageSource.USER)
+            return reply
+        except Exception as e:
+            metrics.incr("messages.errors", source=MessageSource.USER)
+            logger.error(f"生成群聊合并回复失败: {str(e)}")
+            return None
+        finally:
+            metrics.observe("messages.latency_ms", (time.time() - received_at) * 1000,
+                            source=MessageSource.USER)
+
+    def _generate_user_reply(self, combined_message: str, chat_id: str, sender_name: str,
+                             username: str, is_group: bool, intents, received_at: float):
+        """按意图生成并发送用户消息的回复（由生成调度器调用）"""
+        try:
+            # 检查是否为特殊请求（画图请求需在配置中开启）
+            with self.load_monitor.interactive():
+                if INTENT_VOICE in intents:
+                    reply = self._handle_voice_request(combined_message, chat_id, sender_name, username, is_group)
+                elif INTENT_RANDOM_IMAGE in intents:
+                    reply = self._handle_random_image_request(combined_message, chat_id, sender_name, username, is_group)
+                elif self.image_generation_enabled and INTENT_IMAGE_GENERATION in intents:
+                    reply = self._handle_image_generation_request(combined_message, chat_id, sender_name, username, is_group)
+                else:
+                    reply = self._handle_text_message(combined_message, chat_id, sender_name, username, is_group)
+
+            metrics.incr("messages.processed", source=MessageSource.USER)
+            return reply
+        except Exception as e:
+            metrics.incr("messages.errors", source=MessageSource.USER)
+            logger.error(f"生成回复失败: {str(e)}")
+            return None
+        finally:
+            metrics.observe("messages.latency_ms", (time.time() - received_at) * 1000,
+                            source=MessageSource.USER)
+
+    def _dispatch_system_message(self, content: str, chat_id: str, sender_name: str,
+                                 username: str, is_group: bool, source: str):
+        """系统消息不进入合并队列，直接交给生成调度器（权重低于用户消息）"""
+        self.generation_scheduler.submit(
+            chat_id, self._process_system_message,
+            content, chat_id, sender_name, username, is_group, source,
+            source=source
+        )
+
+    def _process_system_message(self, content: str, chat_id: str, sender_name: str,
+                                username: str, is_group: bool, source: str):
+        """处理系统消息：跳过意图识别和时间识别，直接生成回复"""
+        started = time.time()
+        try:
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            logger.info(f"[系统消息] 开始处理 - 来源: {source}, 接收者: {chat_id}")
+            with self.load_monitor.interactive():
+                reply = self._handle_text_message(f"[{current_time}]\n{content}", chat_id, sender_name,
+                                                  username, is_group, source=source)
+            metrics.incr("messages.processed", source=source)
+            return reply
+        except Exception as e:
+            metrics.incr("messages.errors", source=source)
+            logger.error(f"处理系统消息失败: {str(e)}")
+            return None
+        finally:
+            metrics.observe("messages.latency_ms", (time.time() - started) * 1000, source=source)
+
     def _handle_voice_request(self, content, chat_id, sender_name, username, is_group):
         """处理语音请求"""
         logger.info("处理语音请求")
@@ -311,30 +593,23 @@ class MessageHandler:
             reply = reply.split("</think>", 1)[1].strip()
         
         voice_path = self.voice_handler.generate_voice(reply)
+        if is_group:
+            text_reply = f"@{sender_name} {reply}"
+        else:
+            text_reply = reply
         if voice_path:
-            try:
-                self.wx.SendFiles(filepath=voice_path, who=chat_id)
-            except Exception as e:
-                logger.error(f"发送语音失败: {str(e)}")
-                if is_group:
-                    reply = f"@{sender_name} {reply}"
-                self.wx.SendMsg(msg=reply, who=chat_id)
-            finally:
-                try:
-                    os.remove(voice_path)
-                except Exception as e:
-                    logger.error(f"删除临时语音文件失败: {str(e)}")
+            # 排队等待发送期间不让清理任务删除语音文件
+            get_file_leases().hold(voice_path)
+            self.outbox.send(chat_id, self._send_voice, voice_path, text_reply, chat_id)
         else:
-            if is_group:
-                reply = f"@{sender_name} {reply}"
-            self.wx.SendMsg(msg=reply, who=chat_id)
+            self.outbox.send(chat_id, self._send_text, text_reply, chat_id)
         
         # 判断是否是系统消息
         is_system_message = sender_name == "System" or username == "System"
         
         # 异步保存消息记录
-        threading.Thread(target=self.save_message, 
-                       args=(username, sender_name, content, reply, is_system_message)).start()
+        self.executor.submit(POOL_IO, self.save_message,
+                             username, sender_name, content, reply, is_system_message)
         return reply
         
     def _handle_random_image_request(self, content, chat_id, sender_name, username, is_group):
@@ -342,64 +617,110 @@ class MessageHandler:
         logger.info("处理随机图片请求")
         image_path = self.image_handler.get_random_image()
         if image_path:
+            get_file_leases().hold(image_path)
+            self.outbox.send(chat_id, self._send_random_image, image_path, content,
+                             chat_id, sender_name, username, is_group)
+            return "给主人你找了一张好看的图片哦~"
+        return None
+
+    def _send_random_image(self, image_path, content, chat_id, sender_name, username, is_group):
+        """发送随机图片及提示语并保存记录（在发送队列中执行）"""
+        try:
+            self.wx.SendFiles(filepath=image_path, who=chat_id)
+            reply = "给主人你找了一张好看的图片哦~"
+        except Exception as e:
+            logger.error(f"发送图片失败: {str(e)}")
+            reply = "抱歉主人，图片发送失败了..."
+        finally:
+            get_file_leases().release(image_path)
             try:
-                self.wx.SendFiles(filepath=image_path, who=chat_id)
-                reply = "给主人你找了一张好看的图片哦~"
+                if os.path.exists(image_path):
+                    os.remove(image_path)
             except Exception as e:
-                logger.error(f"发送图片失败: {str(e)}")
-                reply = "抱歉主人，图片发送失败了..."
-            finally:
-                try:
-                    if os.path.exists(image_path):
-                        os.remove(image_path)
-                except Exception as e:
-                    logger.error(f"删除临时图片失败: {str(e)}")
-            
-            if is_group:
-                reply = f"@{sender_name} {reply}"
+                logger.error(f"删除临时图片失败: {str(e)}")
+
+        if is_group:
+            reply = f"@{sender_name} {reply}"
+        self.wx.SendMsg(msg=reply, who=chat_id)
+
+        # 判断是否是系统消息
+        is_system_message = sender_name == "System" or username == "System"
+
+        # 异步保存消息记录
+        self.executor.submit(POOL_IO, self.save_message,
+                             username, sender_name, content, reply, is_system_message)
+
+    def _send_text(self, reply, chat_id):
+        """直接发送一条文本（在发送队列中执行）"""
+        self.wx.SendMsg(msg=reply, who=chat_id)
+
+    def _send_voice(self, voice_path, reply, chat_id):
+        """发送语音文件，失败时改发文本，发送后删除临时语音（在发送队列中执行）"""
+        try:
+            self.wx.SendFiles(filepath=voice_path, who=chat_id)
+        except Exception as e:
+            logger.error(f"发送语音失败: {str(e)}")
             self.wx.SendMsg(msg=reply, who=chat_id)
-            
-            # A判断是否是系统消息
-            is_system_message = sender_name == "System" or username == "System"
-            
-            # 异步保存消息记录
-            threading.Thread(target=self.save_message, 
-                           args=(username, sender_name, content, reply, is_system_message)).start()
-            return reply
-        return None
-            
+        finally:
+            get_file_leases().release(voice_path)
+            try:
+                os.remove(voice_path)
+            except Exception as e:
+                logger.error(f"删除临时语音文件失败: {str(e)}")
+
     def _handle_image_generation_request(self, content, chat_id, sender_name, username, is_group):
-        """处理图像生成请求"""
+        """处理图像生成请求：加入画图任务队列并立即回复，图片生成后再发送"""
         logger.info("处理画图请求")
-        image_path = self.image_handler.generate_image(content)
+        job = self.image_jobs.submit(chat_id, sender_name, username, is_group, content)
+        if job:
+            reply = f"收到~正在为主人画图，画好就发过来（任务 #{job.id}，/images 查看进度）"
+        else:
+            reply = "抱歉主人，现在要画的图太多了，请稍后再试..."
+        if is_group:
+            reply = f"@{sender_name} {reply}"
+        self.outbox.send(chat_id, self._send_text, reply, chat_id)
+        return reply
+
+    def _deliver_generated_image(self, job):
+        """把画图任务的结果交给发送队列（由画图任务队列调用）"""
+        if job.image_path:
+            get_file_leases().hold(job.image_path)
+        self.outbox.send(job.chat_id, self._send_generated_image, job)
+
+    def _send_generated_image(self, job):
+        """发送画图任务的结果（在发送队列中执行）"""
+        image_path = job.image_path
         if image_path:
             try:
-                self.wx.SendFiles(filepath=image_path, who=chat_id)
+                self.wx.SendFiles(filepath=image_path, who=job.chat_id)
                 reply = "这是按照主人您的要求生成的图片\\(^o^)/~"
             except Exception as e:
                 logger.error(f"发送生成图片失败: {str(e)}")
                 reply = "抱歉主人，图片生成失败了..."
             finally:
+                get_file_leases().release(image_path)
                 try:
                     if os.path.exists(image_path):
                         os.remove(image_path)
                 except Exception as e:
                     logger.error(f"删除临时图片失败: {str(e)}")
-            
-            if is_group:
-                reply = f"@{sender_name} {reply}"
-            self.wx.SendMsg(msg=reply, who=chat_id)
-            
-            # 判断是否是系统消息
-            is_system_message = sender_name == "System" or username == "System"
-            
-            # 异步保存消息记录
-            threading.Thread(target=self.save_message, 
-                           args=(username, sender_name, content, reply, is_system_message)).start()
-            return reply
-        return None
+        else:
+            reply = "抱歉主人，图片生成失败了..."
+
+        if job.is_group:
+            reply = f"@{job.sender_name} {reply}"
+        self.wx.SendMsg(msg=reply, who=job.chat_id)
+
+        # 判断是否是系统消息
+        is_system_message = job.sender_name == "System" or job.username == "System"
 
-    def _handle_text_message(self, content, chat_id, sender_name, username, is_group):
+        # 异步保存消息记录
+        self.executor.submit(POOL_IO, self.save_message,
+                             job.username, job.sender_name, job.prompt, reply, is_system_message)
+        return reply
+
+    def _handle_text_message(self, content, chat_id, sender_name, username, is_group,
+                             source=MessageSource.USER):
         """处理普通文本消息"""
         # 获取AI回复
         reply = self.get_api_response(content, chat_id)
@@ -416,9 +737,19 @@ class MessageHandler:
             logger.debug("已添加群聊@")
 
         # 判断是否是系统消息
-        is_system_message = sender_name == "System" or username == "System"
+        is_system_message = is_system_source(source) or sender_name == "System" or username == "System"
 
-        # 发送文本消息和表情
+        # 发送文本消息和表情（在发送队列中按顺序执行）
+        self.outbox.send(chat_id, self._send_text_reply, reply, chat_id)
+
+        # 异步保存消息记录，标记系统消息
+        self.executor.submit(POOL_IO, self.save_message,
+                             username, sender_name, content, reply, is_system_message)
+
+        return reply
+
+    def _send_text_reply(self, reply: str, chat_id: str):
+        """发送文本回复：按 $ 分段发送，并发送各段中的表情（由发送队列调用）"""
         if '$' in reply:
             parts = [p.strip() for p in reply.split('$') if p.strip()]
             for part in parts:
@@ -439,7 +770,7 @@ class MessageHandler:
                 # 发送该部分包含的表情
                 for emotion_type in emotion_tags:
                     try:
-                        emoji_path = self.emoji_handler.get_emoji_for_emotion(emotion_type)
+                        emoji_path = self.emoji_handler.get_emoji_for_emotion(emotion_type, chat_id)
                         if emoji_path:
                             self.wx.SendFiles(filepath=emoji_path, who=chat_id)
                             logger.debug(f"已发送表情: {emotion_type}")
@@ -465,7 +796,7 @@ class MessageHandler:
             # 发送表情
             for emotion_type in emotion_tags:
                 try:
-                    emoji_path = self.emoji_handler.get_emoji_for_emotion(emotion_type)
+                    emoji_path = self.emoji_handler.get_emoji_for_emotion(emotion_type, chat_id)
                     if emoji_path:
                         self.wx.SendFiles(filepath=emoji_path, who=chat_id)
                         logger.debug(f"已发送表情: {emotion_type}")
@@ -473,17 +804,12 @@ class MessageHandler:
                 except Exception as e:
                     logger.error(f"发送表情失败 - {emotion_type}: {str(e)}")
 
-        # 异步保存消息记录，标记系统消息
-        threading.Thread(target=self.save_message,
-                        args=(username, sender_name, content, reply, is_system_message)).start()
-
-        return reply
-
-    def _check_time_reminder(self, content: str, chat_id: str, sender_name: str):
+    def _check_time_reminder(self, content: str, chat_id: str, sender_name: str,
+                             received_at: Optional[datetime] = None):
         """检查和处理时间提醒"""
         try:
             # 使用 time_recognition 服务识别时间
-            time_infos = self.time_recognition.recognize_time(content)
+            time_infos = self.time_recognition.recognize_time(content, now=received_at)
             if time_infos:
                 for target_time, reminder_content in time_infos:
                     logger.info(f"检测到提醒请求 - 用户: {sender_name}")
@@ -507,8 +833,11 @@ class MessageHandler:
             logger.error(f"处理时间提醒失败: {str(e)}")
 
     def add_to_queue(self, chat_id: str, content: str, sender_name: str,
-                    username: str, is_group: bool = False):
+                    username: str, is_group: bool = False, source: str = MessageSource.USER):
         """添加消息到队列（兼容旧接口）"""
+        metrics.incr("messages.received", source=source)
+        if is_system_source(source):
+            return self._dispatch_system_message(content, chat_id, sender_name, username, is_group, source)
         return self._add_to_message_queue(content, chat_id, sender_name, username, is_group, False)
         
     def process_messages(self, chat_id: str):
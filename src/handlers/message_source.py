@@ -0,0 +1,33 @@
+"""
+消息来源模块
+负责标记消息的来源，包括:
+- 用户消息
+- 提醒、定时任务、主动消息等系统消息
+- 调试命令
+"""
+
+
+class MessageSource:
+    """消息来源（使用字符串常量，便于记录日志和指标标签）"""
+    USER = "user"
+    REMINDER = "reminder"
+    SCHEDULED_TASK = "scheduled_task"
+    AUTO_MESSAGE = "auto_message"
+    DEBUG = "debug"
+
+    ALL = (USER, REMINDER, SCHEDULED_TASK, AUTO_MESSAGE, DEBUG)
+
+
+def is_system_source(source: str) -> bool:
+    """
+    判断是否为系统产生的消息
+
+    系统消息是程序自己生成的提示词，不需要等待合并，也不需要识别时间提醒
+
+    Args:
+        source: 消息来源
+
+    Returns:
+        bool: 是否为系统消息
+    """
+    return source in (MessageSource.REMINDER, MessageSource.SCHEDULED_TASK, MessageSource.AUTO_MESSAGE)
@@ -0,0 +1,111 @@
+"""
+图片识别合批模块
+负责把同一聊天短时间内收到的多张图片合并识别，包括:
+- 按聊天收集等待识别的图片，窗口结束或达到上限时提交
+- 单张图片走普通识别，多张图片走一次多图请求
+- 识别结果按占位ID逐张填回消息队列，线程池丢弃请求时立即填入空结果
+- 图片从加入到识别结束（或被丢弃）期间持有文件租约，不会被临时文件清理删除
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.services.scheduler import get_scheduler
+from src.utils.executor import get_executor, POOL_VISION
+from src.utils.janitor import get_file_leases
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 合批窗口（秒）：第一张图片到达后等待同一聊天的后续图片
+BATCH_WINDOW_SECONDS = 1.5
+# 单次请求最多包含的图片数
+MAX_BATCH_SIZE = 6
+# 统一调度器中的任务分组
+JOB_GROUP = "vision_batch"
+
+
+class VisionBatcher:
+    """按聊天合并图片识别请求"""
+
+    def __init__(self, recognize_one: Callable[[str], str], recognize_many: Callable[[List[str]], List[str]],
+                 deliver: Callable[[int, Optional[str]], None], window: float = BATCH_WINDOW_SECONDS,
+                 max_batch: int = MAX_BATCH_SIZE):
+        """
+        Args:
+            recognize_one: 识别单张图片
+            recognize_many: 一次识别多张图片，返回与输入顺序对应的结果
+            deliver: 结果回调 (占位ID, 识别结果)
+            window: 合批窗口（秒）
+            max_batch: 单次请求最多包含的图片数
+        """
+        self.recognize_one = recognize_one
+        self.recognize_many = recognize_many
+        self.deliver = deliver
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.scheduler = get_scheduler()
+        self.executor = get_executor()
+        self._pending: Dict[str, List[Tuple[int, str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _job_id(chat_id: str) -> str:
+        return f"{JOB_GROUP}_{chat_id}"
+
+    def add(self, chat_id: str, placeholder_id: int, image_path: str):
+        """加入等待识别的图片"""
+        get_file_leases().hold(image_path)
+        with self._lock:
+            items = self._pending.setdefault(chat_id, [])
+            items.append((placeholder_id, image_path))
+            if len(items) >= self.max_batch:
+                batch = self._pending.pop(chat_id)
+                self.scheduler.remove_job(self._job_id(chat_id))
+            else:
+                batch = None
+                if len(items) == 1:
+                    self.scheduler.call_later(self.window, self.flush, chat_id,
+                                              job_id=self._job_id(chat_id), group=JOB_GROUP)
+        if batch:
+            self._submit(batch)
+
+    def flush(self, chat_id: str):
+        """提交该聊天等待中的图片"""
+        with self._lock:
+            batch = self._pending.pop(chat_id, None)
+        if batch:
+            self._submit(batch)
+
+    def _submit(self, batch: List[Tuple[int, str]]):
+        metrics.observe("vision.batch_window_size", len(batch))
+        self.executor.submit(POOL_VISION, self._run, batch, on_drop=lambda: self._expire(batch))
+
+    def _expire(self, batch: List[Tuple[int, str]]):
+        """识别请求被线程池丢弃，占位不再等待识别结果"""
+        self._release(batch)
+        for placeholder_id, _ in batch:
+            self.deliver(placeholder_id, None)
+
+    @staticmethod
+    def _release(batch: List[Tuple[int, str]]):
+        """释放批次中图片的文件租约"""
+        leases = get_file_leases()
+        for _, path in batch:
+            leases.release(path)
+
+    def _run(self, batch: List[Tuple[int, str]]):
+        results: List[Optional[str]] = [None] * len(batch)
+        try:
+            paths = [path for _, path in batch]
+            if len(batch) == 1:
+                results[0] = self.recognize_one(paths[0])
+            else:
+                results = self.recognize_many(paths)
+        except Exception as e:
+            logger.error(f"图片识别失败: {str(e)}")
+        finally:
+            self._release(batch)
+            for (placeholder_id, _), result in zip(batch, results):
+                self.deliver(placeholder_id, result)
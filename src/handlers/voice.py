@@ -2,22 +2,38 @@
 语音处理模块
 负责处理语音相关功能，包括:
 - 语音请求识别
-- TTS语音生成
+- TTS语音生成（长回复按句并发合成）
+- 合成结果缓存
 - 语音文件管理
 - 清理临时文件
 """
 
 import os
 import logging
+import shutil
+import time
+import uuid
 import requests
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from src.handlers.intent import get_intent_router, INTENT_VOICE
+from src.services.tts import TTSCache, split_sentences, concat_wav, is_wav
+from src.utils.executor import get_executor, POOL_TTS, POLICY_BLOCK
+from src.utils.metrics import metrics
 
 # 修改logger获取方式，确保与main模块一致
 logger = logging.getLogger('main')
 
+# tts 线程池的队列长度上限
+TTS_QUEUE_SIZE = 64
+
 class VoiceHandler:
-    def __init__(self, root_dir, tts_api_url):
+    def __init__(self, root_dir, tts_api_url, cache_mb: int = 100, max_workers: int = 3):
+        """
+        Args:
+            cache_mb: 合成结果缓存的大小上限（MB）
+            max_workers: 同时合成的句子数
+        """
         self.root_dir = root_dir
         self.tts_api_url = tts_api_url
         self.voice_dir = os.path.join(root_dir, "data", "voices")
@@ -25,37 +41,114 @@ class VoiceHandler:
         # 确保语音目录存在
         os.makedirs(self.voice_dir, exist_ok=True)
 
+        # 合成结果缓存（语音目录下的子目录，清理临时语音文件时不受影响）
+        self.cache = TTSCache(os.path.join(self.voice_dir, "cache"), max_bytes=cache_mb * 1024 * 1024)
+        # 分句合成使用共享执行器中的 tts 线程池
+        self.executor = get_executor()
+        self.executor.configure_pool(POOL_TTS, max_workers, TTS_QUEUE_SIZE, POLICY_BLOCK)
+
     def is_voice_request(self, text: str) -> bool:
         """判断是否为语音请求"""
-        voice_keywords = ["语音"]
-        return any(keyword in text for keyword in voice_keywords)
+        return INTENT_VOICE in get_intent_router().route(text)
+
+    def _new_voice_path(self) -> str:
+        """生成唯一的临时语音文件名（分句并行合成时同一微秒内可能生成多个，加随机后缀）"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return os.path.join(self.voice_dir, f"voice_{timestamp}_{uuid.uuid4().hex[:8]}.wav")
+
+    def _request_tts(self, text: str, voice_path: str) -> bool:
+        """调用TTS API，结果写入 voice_path"""
+        started = time.time()
+        response = requests.get(self.tts_api_url, params={"text": text}, stream=True, timeout=60)
+        try:
+            if response.status_code != 200:
+                logger.error(f"语音生成失败: {response.status_code}")
+                return False
+            with open(voice_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    if chunk:
+                        f.write(chunk)
+            return True
+        finally:
+            response.close()
+            metrics.observe("tts.request_ms", (time.time() - started) * 1000)
+
+    def _synthesize(self, text: str) -> Optional[str]:
+        """
+        合成一段文本，优先使用缓存
+
+        Returns:
+            Optional[str]: 缓存中的语音文件路径（调用方用完后释放）；结果不是 WAV 时返回未缓存的临时文件；
+            合成失败返回 None
+        """
+        key = self.cache.key(self.tts_api_url, text)
+        cached = self.cache.get(key)
+        if cached:
+            return cached
+        voice_path = self._new_voice_path()
+        try:
+            synthesized = self._request_tts(text, voice_path)
+        except Exception as e:
+            # 单句失败不中断其他句子，由整段合成兜底
+            logger.error(f"分句语音合成失败: {str(e)}")
+            synthesized = False
+        if not synthesized:
+            if os.path.exists(voice_path):
+                os.remove(voice_path)
+            return None
+        if not is_wav(voice_path):
+            # 非 WAV 结果无法拼接，也不缓存
+            return voice_path
+        return self.cache.put(key, voice_path) or voice_path
 
     def generate_voice(self, text: str) -> Optional[str]:
-        """调用TTS API生成语音"""
+        """
+        调用TTS API生成语音：长回复按句并发合成后拼接，已合成过的句子直接复用
+
+        Returns:
+            Optional[str]: 临时语音文件路径（发送后由调用方删除）
+        """
+        started = time.time()
+        clips: List[Optional[str]] = []
         try:
             # 确保语音目录存在
             if not os.path.exists(self.voice_dir):
                 os.makedirs(self.voice_dir)
-                
-            # 生成唯一的文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            voice_path = os.path.join(self.voice_dir, f"voice_{timestamp}.wav")
-            
-            # 调用TTS API
-            response = requests.get(f"{self.tts_api_url}?text={text}", stream=True)
-            if response.status_code == 200:
-                with open(voice_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
+
+            sentences = split_sentences(text) or [text]
+            clips = self.executor.map(POOL_TTS, self._synthesize, sentences)
+            metrics.observe("tts.sentences", len(sentences))
+
+            voice_path = self._new_voice_path()
+            if len(clips) == 1 and clips[0]:
+                # 单句直接复制，缓存文件保留
+                if os.path.dirname(clips[0]) == self.cache.cache_dir:
+                    shutil.copyfile(clips[0], voice_path)
+                else:
+                    os.replace(clips[0], voice_path)
                 return voice_path
-            else:
-                logger.error(f"语音生成失败: {response.status_code}")
-                return None
-                
+
+            if all(clips) and concat_wav(clips, voice_path):
+                return voice_path
+
+            # 有句子合成失败或无法拼接时，整段合成一次
+            logger.warning("分句合成失败，改为整段合成")
+            metrics.incr("tts.fallbacks")
+            return voice_path if self._request_tts(text, voice_path) else None
+
         except Exception as e:
             logger.error(f"语音生成失败: {str(e)}")
             return None
+        finally:
+            # 释放缓存片段，清理未进入缓存的临时片段
+            for clip in clips:
+                if not clip:
+                    continue
+                if os.path.dirname(clip) == self.cache.cache_dir:
+                    self.cache.release(clip)
+                elif os.path.exists(clip):
+                    os.remove(clip)
+            metrics.observe("tts.latency_ms", (time.time() - started) * 1000)
 
     def cleanup_voice_dir(self):
         """清理语音目录中的旧文件"""
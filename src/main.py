@@ -7,18 +7,25 @@ import os
 import shutil
 from config import config, DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL, MODEL, MAX_TOKEN, TEMPERATURE, MAX_GROUPS
 from wxauto import WeChat
-import re
 from handlers.emoji import EmojiHandler
 from handlers.image import ImageHandler
 from handlers.message import MessageHandler
 from handlers.voice import VoiceHandler
+from src.handlers.message_source import MessageSource
 from src.services.ai.llm_service import LLMService
 from src.services.ai.image_recognition_service import ImageRecognitionService
+from src.services.ai.vision_cache import VisionCache
 from modules.memory.memory_service import MemoryService
 from utils.logger import LoggerConfig
 from utils.console import print_status
 from colorama import init, Style
 from src.AutoTasker.autoTasker import AutoTasker
+from src.services.proactive import ProactiveMessenger, QuietWindow
+from src.services.background import get_load_monitor
+from src.handlers.ingest import MessageDeduplicator, compile_mention_pattern
+from src.utils.executor import get_executor, POOL_VISION
+from src.handlers.vision_batcher import VisionBatcher
+from src.utils.janitor import TempFileJanitor, get_file_leases
 
 # 创建一个事件对象来控制线程的终止
 stop_event = threading.Event()
@@ -61,6 +68,14 @@ class ChatBot:
         self.wx = WeChat()
         self.robot_name = self.wx.A_MyIcon.Name  # 移除括号，直接访问Name属性
         logger.info(f"机器人名称: {self.robot_name}")
+        self.mention_pattern = compile_mention_pattern(self.robot_name, require_at=True)
+        self.executor = get_executor()
+        # 同一聊天短时间内的多张图片合并为一次识别请求
+        self.vision_batcher = VisionBatcher(
+            recognize_one=self.moonshot_ai.recognize_image,
+            recognize_many=self.moonshot_ai.recognize_images,
+            deliver=self.message_handler.fill_placeholder
+        )
 
     def process_user_messages(self, chat_id):
         """处理用户消息队列"""
@@ -97,8 +112,8 @@ class ChatBot:
             username = msg.sender
             content = getattr(msg, 'content', None) or getattr(msg, 'text', None)
             
-            # 重置倒计时
-            start_countdown()
+            # 该聊天重新开始计时
+            proactive_messenger.touch(chatName)
             
             # 简化日志输出
             logger.info(f"收到消息 - 来自: {username}" + (" (群聊)" if is_group else ""))
@@ -106,27 +121,38 @@ class ChatBot:
             
             img_path = None
             is_emoji = False
-            is_image_recognition = False
             
             # 处理群聊@消息
-            if is_group and self.robot_name and content:
-                content = re.sub(f'@{self.robot_name}\u2005', '', content).strip()
+            if is_group and self.mention_pattern and content:
+                content = self.mention_pattern.sub('', content).strip()
             
             if content and content.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
                 img_path = content
-                is_emoji = False
                 content = None
 
             # 检查动画表情
             if content and "[动画表情]" in content:
-                img_path = emoji_handler.capture_and_save_screenshot(username)
                 is_emoji = True
                 content = None
 
-            if img_path:
-                recognized_text = self.moonshot_ai.recognize_image(img_path, is_emoji)
-                content = recognized_text if content is None else f"{content} {recognized_text}"
-                is_image_recognition = True
+            # 图片识别交给识别线程池，监听线程只在消息队列中预留位置
+            if img_path or is_emoji:
+                placeholder_id = self.message_handler.reserve_placeholder(
+                    chat_id=chatName,
+                    sender_name=username,
+                    username=username,
+                    is_group=is_group
+                )
+                if is_emoji:
+                    # 动画表情需要截图，单独识别
+                    # 队列满被丢弃时占位立即置空，消息队列不必等到超时
+                    self.executor.submit(POOL_VISION, self.recognize_to_placeholder,
+                                         placeholder_id, username, img_path, is_emoji,
+                                         on_drop=lambda: self.message_handler.fill_placeholder(placeholder_id, None))
+                else:
+                    # 合批器在识别结束或请求被丢弃前持有该图片的文件租约
+                    self.vision_batcher.add(chatName, placeholder_id, img_path)
+                return
 
             # 处理消息
             if content:
@@ -137,13 +163,27 @@ class ChatBot:
                     chat_id=chatName,
                     sender_name=sender_name,
                     username=username,
-                    is_group=is_group,
-                    is_image_recognition=is_image_recognition
+                    is_group=is_group
                 )
 
         except Exception as e:
             logger.error(f"消息处理失败: {str(e)}")
 
+    def recognize_to_placeholder(self, placeholder_id, username, img_path, is_emoji):
+        """在识别线程池中识别图片（动画表情先截图），结果填回消息队列的预留位置"""
+        recognized_text = None
+        try:
+            if is_emoji:
+                img_path = emoji_handler.capture_and_save_screenshot(username)
+            if img_path:
+                # 识别期间不让临时文件清理删除截图
+                with get_file_leases().lease(img_path):
+                    recognized_text = self.moonshot_ai.recognize_image(img_path, is_emoji)
+        except Exception as e:
+            logger.error(f"图片识别失败: {str(e)}")
+        finally:
+            self.message_handler.fill_placeholder(placeholder_id, recognized_text)
+
 # 读取提示文件
 avatar_dir = os.path.join(root_dir, config.behavior.context.avatar_dir)
 prompt_path = os.path.join(avatar_dir, "avatar.md")
@@ -152,15 +192,20 @@ with open(prompt_path, "r", encoding="utf-8") as file:
 
 # 创建全局实例
 emoji_handler = EmojiHandler(root_dir)
+emoji_handler.preload_all_avatars()
 image_handler = ImageHandler(
     root_dir=root_dir,
     api_key=config.llm.api_key,
     base_url=config.llm.base_url,
-    image_model=config.media.image_generation.model
+    image_model=config.media.image_generation.model,
+    random_image=config.media.random_image
 )
+image_handler.prefetch_random_images()
 voice_handler = VoiceHandler(
     root_dir=root_dir,
-    tts_api_url=config.media.text_to_speech.tts_api_url
+    tts_api_url=config.media.text_to_speech.tts_api_url,
+    cache_mb=config.media.text_to_speech.cache_mb,
+    max_workers=config.media.text_to_speech.max_workers
 )
 memory_service = MemoryService(
     root_dir=root_dir,
@@ -174,13 +219,16 @@ moonshot_ai = ImageRecognitionService(
     api_key=config.media.image_recognition.api_key,
     base_url=config.media.image_recognition.base_url,
     temperature=config.media.image_recognition.temperature,
-    model=config.media.image_recognition.model
+    model=config.media.image_recognition.model,
+    cache=VisionCache()
 )
 
 # 获取机器人名称
 wx = WeChat()
 ROBOT_WX_NAME = wx.A_MyIcon.Name
 logger.info(f"获取到机器人名称: {ROBOT_WX_NAME}")
+# 群聊中@机器人或叫机器人名字的匹配正则（启动时编译一次）
+ROBOT_MENTION_PATTERN = compile_mention_pattern(ROBOT_WX_NAME)
 
 message_handler = MessageHandler(
     root_dir=root_dir,
@@ -209,89 +257,36 @@ for i in listen_list:
 # 消息队列接受消息时间间隔
 wait = 1
 
-# 全局变量
-last_chat_time = None
-countdown_timer = None
-is_countdown_running = False
-unanswered_count = 0  # 新增未回复计数器
-countdown_end_time = None  # 新增倒计时结束时间
-
-def update_last_chat_time():
-    """更新最后一次聊天时间"""
-    global last_chat_time, unanswered_count
-    last_chat_time = datetime.now()
-    unanswered_count = 0  # 重置未回复计数器
-    logger.info(f"更新最后聊天时间: {last_chat_time}，重置未回复计数器为0")
-
-def is_quiet_time() -> bool:
-    """检查当前是否在安静时间段内"""
-    try:
-        current_time = datetime.now().time()
-        quiet_start = datetime.strptime(config.behavior.quiet_time.start, "%H:%M").time()
-        quiet_end = datetime.strptime(config.behavior.quiet_time.end, "%H:%M").time()
-        
-        if quiet_start <= quiet_end:
-            # 如果安静时间不跨天
-            return quiet_start <= current_time <= quiet_end
-        else:
-            # 如果安静时间跨天（比如22:00到次日08:00）
-            return current_time >= quiet_start or current_time <= quiet_end
-    except Exception as e:
-        logger.error(f"检查安静时间出错: {str(e)}")
-        return False  # 出错时默认不在安静时间
-
-def get_random_countdown_time():
-    """获取随机倒计时时间"""
-    # 将小时转换为秒，并确保是整数
-    min_seconds = int(config.behavior.auto_message.min_hours * 3600)
-    max_seconds = int(config.behavior.auto_message.max_hours * 3600)
-    return random.uniform(min_seconds, max_seconds) # bug修复转换问题
-
-def auto_send_message():
-    """自动发送消息"""
-    global unanswered_count  # 引用全局变量
-
-    if is_quiet_time():
-        logger.info("当前处于安静时间，跳过自动发送消息")
-        start_countdown()
-        return
-        
-    if listen_list:
-        user_id = random.choice(listen_list)
-        unanswered_count += 1  # 每次发送消息时增加未回复计数
-        reply_content = f"{config.behavior.auto_message.content} 这是对方第{unanswered_count}次未回复你, 你可以选择模拟对方未回复后的小脾气"
-        logger.info(f"自动发送消息到 {user_id}: {reply_content}")
-        try:
-            message_handler.add_to_queue(
-                chat_id=user_id,
-                content=reply_content,  # 使用更新后的内容
-                sender_name="System",
-                username="System",
-                is_group=False
-            )
-            start_countdown()
-        except Exception as e:
-            logger.error(f"自动发送消息失败: {str(e)}")
-            start_countdown()
-    else:
-        logger.error("没有可用的聊天对象")
-        start_countdown()
-
-def start_countdown():
-    """开始新的倒计时"""
-    global countdown_timer, is_countdown_running, countdown_end_time  # 添加 countdown_end_time
-    
-    if countdown_timer:
-        countdown_timer.cancel()
-    
-    countdown_seconds = get_random_countdown_time()
-    countdown_end_time = datetime.now() + timedelta(seconds=countdown_seconds)  # 设置结束时间
-    logger.info(f"开始新的倒计时: {countdown_seconds/3600:.2f}小时")
-    
-    countdown_timer = threading.Timer(countdown_seconds, auto_send_message)
-    countdown_timer.daemon = True
-    countdown_timer.start()
-    is_countdown_running = True
+def send_auto_message(chat_id: str, unanswered_count: int):
+    """向长时间未回复的聊天发送主动消息"""
+    reply_content = f"{config.behavior.auto_message.content} 这是对方第{unanswered_count}次未回复你, 你可以选择模拟对方未回复后的小脾气"
+    logger.info(f"自动发送消息到 {chat_id}: {reply_content}")
+    message_handler.add_to_queue(
+        chat_id=chat_id,
+        content=reply_content,
+        sender_name="System",
+        username="System",
+        is_group=False,
+        source=MessageSource.AUTO_MESSAGE
+    )
+
+# 主动消息服务（每个聊天独立计时）
+quiet_window = QuietWindow(config.behavior.quiet_time.start, config.behavior.quiet_time.end)
+proactive_messenger = ProactiveMessenger(
+    send=send_auto_message,
+    min_hours=config.behavior.auto_message.min_hours,
+    max_hours=config.behavior.auto_message.max_hours,
+    quiet_window=quiet_window,
+    max_per_tick=config.behavior.auto_message.max_per_tick
+)
+# 安静时间内后台任务不必等待消息队列清空
+get_load_monitor().set_idle_provider(lambda: quiet_window.contains(datetime.now()))
+
+# 重连后重复接收的消息在分发前丢弃
+message_deduplicator = MessageDeduplicator()
+
+# 运行期间定期清理临时文件
+temp_file_janitor = TempFileJanitor(root_dir)
 
 def message_listener():
     wx = None
@@ -308,6 +303,8 @@ def message_listener():
                     time.sleep(5)
                     continue
                 last_window_check = current_time
+                # 重建连接后 wxauto 可能重放已接收的消息
+                message_deduplicator.mark_reconnect()
             
             msgs = wx.GetListenMessage()
             if not msgs:
@@ -334,9 +331,14 @@ def message_listener():
                             continue  
                             # 接收窗口名跟发送人一样，代表是私聊，否则是群聊
                         if who == msg.sender:
-
+                            if message_deduplicator.is_duplicate(who, msg.sender, content):
+                                logger.debug(f"重复消息，忽略: {content}")
+                                continue
                             chat_bot.handle_wxauto_message(msg, msg.sender) # 处理私聊信息
-                        elif ROBOT_WX_NAME != '' and (bool(re.search(f'@{ROBOT_WX_NAME}\u2005', msg.content)) or bool(re.search(f'{ROBOT_WX_NAME}\u2005', msg.content))): 
+                        elif ROBOT_MENTION_PATTERN and ROBOT_MENTION_PATTERN.search(content):
+                            if message_deduplicator.is_duplicate(who, msg.sender, content):
+                                logger.debug(f"重复消息，忽略: {content}")
+                                continue
                             # 修改：在群聊被@时或者被叫名字，传入群聊ID(who)作为回复目标
                             chat_bot.handle_wxauto_message(msg, who, is_group=True) 
                         else:
@@ -401,10 +403,6 @@ def initialize_auto_tasks(message_handler):
         auto_tasker = AutoTasker(message_handler)
         print_status("创建AutoTasker实例成功", "success", "CHECK")
         
-        # 清空现有任务
-        auto_tasker.scheduler.remove_all_jobs()
-        print_status("清空现有任务", "info", "CLEAN")
-        
         # 从配置文件读取任务信息
         if hasattr(config, 'behavior') and hasattr(config.behavior, 'schedule_settings'):
             schedule_settings = config.behavior.schedule_settings
@@ -412,25 +410,21 @@ def initialize_auto_tasks(message_handler):
                 tasks = schedule_settings.tasks
                 if tasks:
                     print_status(f"从配置文件读取到 {len(tasks)} 个任务", "info", "TASK")
-                    tasks_added = 0
-                    
-                    # 遍历所有任务并添加
-                    for task in tasks:
-                        try:
-                            # 添加定时任务
-                            auto_tasker.add_task(
-                                task_id=task.task_id,
-                                chat_id=listen_list[0],  # 使用 listen_list 中的第一个聊天ID
-                                content=task.content,
-                                schedule_type=task.schedule_type,
-                                schedule_time=task.schedule_time
-                            )
-                            tasks_added += 1
-                            print_status(f"成功添加任务 {task.task_id}: {task.content}", "success", "CHECK")
-                        except Exception as e:
-                            print_status(f"添加任务 {task.task_id} 失败: {str(e)}", "error", "ERROR")
-                    
-                    print_status(f"成功添加 {tasks_added}/{len(tasks)} 个任务", "info", "TASK")
+
+                    # 整组校验后一次性同步，只更新有变化的任务
+                    tasks_list = [{
+                        'task_id': task.task_id,
+                        'chat_id': listen_list[0],  # 使用 listen_list 中的第一个聊天ID
+                        'content': task.content,
+                        'schedule_type': task.schedule_type,
+                        'schedule_time': task.schedule_time,
+                        'is_active': task.is_active
+                    } for task in tasks]
+                    try:
+                        added, changed, removed = auto_tasker.sync_tasks(tasks_list)
+                        print_status(f"任务同步完成: 新增 {added}，修改 {changed}，删除 {removed}", "success", "CHECK")
+                    except ValueError as e:
+                        print_status(f"同步任务失败，保留原有任务: {str(e)}", "error", "ERROR")
                 else:
                     print_status("配置文件中没有找到任务", "warning", "WARNING")
         else:
@@ -448,12 +442,8 @@ def switch_avatar(new_avatar_name):
     # 更新配置
     config.behavior.context.avatar_dir = f"avatars/{new_avatar_name}"
     
-    # 重新初始化 emoji_handler
-    global emoji_handler
-    emoji_handler = EmojiHandler(root_dir)
-    
-    # 更新 message_handler 中的 emoji_handler
-    message_handler.emoji_handler = emoji_handler
+    # 切换表情包目录（表情包索引启动时已为所有人设加载）
+    emoji_handler.switch_avatar(config.behavior.context.avatar_dir)
 
 def main():
     try:
@@ -500,8 +490,11 @@ def main():
 
         # 启动自动消息
         print_status("启动自动消息系统...", "info", "CLOCK")
-        start_countdown()
+        proactive_messenger.register(listen_list)
         print_status("自动消息系统已启动", "success", "CHECK")
+
+        # 启动临时文件清理
+        temp_file_janitor.start()
         
         print("-" * 50)
         print_status("系统初始化完成", "success", "STAR_2")
@@ -534,8 +527,7 @@ def main():
         logger.error(f"主程序异常: {str(e)}", exc_info=True)  # 添加详细日志记录
     finally:
         # 清理资源
-        if countdown_timer:
-            countdown_timer.cancel()
+        proactive_messenger.stop()
         
         # 设置事件以停止线程
         stop_event.set()
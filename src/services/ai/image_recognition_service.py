@@ -2,22 +2,54 @@
 图像识别 AI 服务模块
 提供与图像识别 API 的交互功能，包括:
 - 图像识别
+- 识别结果缓存
 - 文本生成
 - API请求处理
 - 错误处理
 """
 
-import base64
 import logging
+import re
 import requests
-from typing import Optional
+from typing import List, Optional
 import os
 
+from src.services.ai.vision_payload import prepare_image, build_vision_body
+from src.utils.metrics import metrics
+
 # 修改logger获取方式，确保与main模块一致
 logger = logging.getLogger('main')
 
+# 多图识别结果中每张图片的编号，如 [[图1]]
+BATCH_SEGMENT_PATTERN = re.compile(r'\[\[图(\d+)\]\]')
+
+
+def split_batch_descriptions(content: str, count: int) -> Optional[List[str]]:
+    """
+    按编号拆分多图识别结果
+
+    Returns:
+        Optional[List[str]]: 每张图片的描述，编号缺失或重复时返回 None
+    """
+    matches = list(BATCH_SEGMENT_PATTERN.finditer(content))
+    descriptions = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+        index = int(match.group(1))
+        text = content[match.end():end].strip()
+        if index in descriptions or not 1 <= index <= count or not text:
+            return None
+        descriptions[index] = text
+    if len(descriptions) != count:
+        return None
+    return [descriptions[i] for i in range(1, count + 1)]
+
 class ImageRecognitionService:
-    def __init__(self, api_key: str, base_url: str, temperature: float, model: str):
+    def __init__(self, api_key: str, base_url: str, temperature: float, model: str, cache=None):
+        """
+        Args:
+            cache: 识别结果缓存（VisionCache），为空时不缓存
+        """
         self.api_key = api_key
         self.base_url = base_url
         # 确保 temperature 在有效范围内
@@ -27,12 +59,123 @@ class ImageRecognitionService:
             'Content-Type': 'application/json'
         }
         self.model = model  # "moonshot-v1-8k-vision-preview"
+        self.cache = cache
         
         if temperature > 1.0:
             logger.warning(f"Temperature值 {temperature} 超出范围，已自动调整为 1.0")
 
     def recognize_image(self, image_path: str, is_emoji: bool = False) -> str:
-        """使用 Moonshot AI 识别图片内容并返回文本"""
+        """使用 Moonshot AI 识别图片内容并返回文本，相同图片优先使用缓存结果"""
+        if self.cache is None or not os.path.exists(image_path):
+            return self._recognize(image_path, is_emoji)
+
+        try:
+            sha256, phash, aspect = self.cache.fingerprint(image_path, is_emoji)
+        except Exception as e:
+            logger.error(f"计算图片缓存键失败: {str(e)}")
+            return self._recognize(image_path, is_emoji)
+
+        cached = self.cache.get(sha256, phash, aspect, is_emoji)
+        if cached is not None:
+            logger.info(f"图片识别命中缓存: {cached}")
+            return cached
+
+        recognized_text = self._recognize(image_path, is_emoji)
+        # 只缓存成功的识别结果
+        if recognized_text.startswith(("发送了图片：", "发送了表情包：")):
+            self.cache.put(sha256, phash, aspect, is_emoji, recognized_text)
+        return recognized_text
+
+    def recognize_images(self, image_paths: List[str]) -> List[str]:
+        """
+        一次请求识别多张图片（未命中缓存的图片合并为一个多图请求），失败时逐张识别
+
+        Args:
+            image_paths: 图片路径列表
+
+        Returns:
+            List[str]: 与输入顺序对应的识别结果
+        """
+        results: List[Optional[str]] = [None] * len(image_paths)
+        keys = [None] * len(image_paths)
+        for i, path in enumerate(image_paths):
+            if self.cache is None or not os.path.exists(path):
+                continue
+            try:
+                keys[i] = self.cache.fingerprint(path, False)
+                results[i] = self.cache.get(*keys[i], False)
+            except Exception as e:
+                logger.error(f"计算图片缓存键失败: {str(e)}")
+
+        misses = [i for i, result in enumerate(results) if result is None]
+        if len(misses) > 1:
+            descriptions = self._recognize_batch([image_paths[i] for i in misses])
+            if descriptions is not None:
+                metrics.incr("vision.batches")
+                metrics.observe("vision.batch_size", len(misses))
+                for i, description in zip(misses, descriptions):
+                    results[i] = "发送了图片：" + description
+                    if keys[i] is not None:
+                        self.cache.put(*keys[i], False, results[i])
+                misses = []
+            else:
+                metrics.incr("vision.batch_fallbacks")
+                logger.warning(f"多图识别失败，改为逐张识别 {len(misses)} 张图片")
+
+        for i in misses:
+            if keys[i] is None:
+                results[i] = self.recognize_image(image_paths[i])
+            else:
+                results[i] = self._recognize_cached(image_paths[i], keys[i])
+        return results
+
+    def _recognize_cached(self, image_path: str, key) -> str:
+        """识别已确认未命中缓存的图片并写入缓存"""
+        recognized_text = self._recognize(image_path, False)
+        if recognized_text.startswith("发送了图片："):
+            self.cache.put(*key, False, recognized_text)
+        return recognized_text
+
+    def _recognize_batch(self, image_paths: List[str]) -> Optional[List[str]]:
+        """多图请求，返回每张图片的描述；请求失败或无法按图片拆分时返回 None"""
+        images = []
+        try:
+            for path in image_paths:
+                if os.path.getsize(path) > 100 * 1024 * 1024:
+                    return None
+                images.append(prepare_image(path))
+            text_prompt = (
+                f"下面按顺序共有{len(images)}张图片，请逐张描述。"
+                f"每张图片单独成段，以「[[图1]]」「[[图2]]」这样的编号开头"
+            )
+            body = build_vision_body(self.model, images, text_prompt, self.temperature)
+            try:
+                response = requests.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=self.headers,
+                    data=body,
+                    timeout=30 + 10 * len(images)
+                )
+            finally:
+                body.close()
+            if response.status_code != 200:
+                logger.error(f"多图识别请求失败 - 状态码: {response.status_code}, 响应: {response.text}")
+                return None
+            content = response.json()['choices'][0]['message']['content']
+            descriptions = split_batch_descriptions(content, len(images))
+            if descriptions is None:
+                logger.warning(f"多图识别结果无法按图片拆分: {content}")
+            else:
+                logger.info(f"Moonshot AI多图识别结果: {descriptions}")
+            return descriptions
+        except Exception as e:
+            logger.error(f"多图识别失败: {str(e)}")
+            for image in images:
+                image.close()
+            return None
+
+    def _recognize(self, image_path: str, is_emoji: bool = False) -> str:
+        """调用识别 API"""
         try:
             # 验证图片路径
             if not os.path.exists(image_path):
@@ -45,10 +188,9 @@ class ImageRecognitionService:
                 logger.error(f"图片文件过大 ({file_size:.2f}MB): {image_path}")
                 return "抱歉，图片文件太大了"
 
-            # 读取并编码图片
+            # 缩放并重新编码图片（请求体在上传时流式生成）
             try:
-                with open(image_path, 'rb') as img_file:
-                    image_content = base64.b64encode(img_file.read()).decode('utf-8')
+                image = prepare_image(image_path)
             except Exception as e:
                 logger.error(f"读取图片文件失败: {str(e)}")
                 return "抱歉，读取图片时出现错误"
@@ -57,36 +199,19 @@ class ImageRecognitionService:
             text_prompt = "请描述这个图片" if not is_emoji else "这是一张微信聊天的图片截图，请描述这个聊天窗口左边的聊天用户用户发送的最后一张表情，不要去识别聊天用户的头像"
             
             # 准备请求数据
-            data = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_content}"
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": text_prompt
-                            }
-                        ]
-                    }
-                ],
-                "temperature": self.temperature
-            }
+            body = build_vision_body(self.model, [image], text_prompt, self.temperature)
 
             # 发送请求
             try:
-                response = requests.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=self.headers,
-                    json=data,
-                    timeout=30  # 添加超时设置
-                )
+                try:
+                    response = requests.post(
+                        f"{self.base_url}/chat/completions",
+                        headers=self.headers,
+                        data=body,
+                        timeout=30  # 添加超时设置
+                    )
+                finally:
+                    body.close()
                 
                 # 检查响应状态
                 if response.status_code != 200:
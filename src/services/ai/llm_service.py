@@ -23,13 +23,15 @@ from tenacity import (
     wait_random_exponential,
     retry_if_exception_type
 )
+from src.utils.metrics import metrics
 
 # 修改logger获取方式，确保与main模块一致
 logger = logging.getLogger('main')
 
 class LLMService:
     def __init__(self, api_key: str, base_url: str, model: str,
-                 max_token: int, temperature: float, max_groups: int):
+                 max_token: int, temperature: float, max_groups: int,
+                 call_class: str = "chat"):
         """
         强化版AI服务初始化
 
@@ -39,8 +41,9 @@ class LLMService:
         :param max_token: 最大token限制
         :param temperature: 创造性参数(0~2)
         :param max_groups: 最大对话轮次记忆
-        :param system_prompt: 系统级提示词
+        :param call_class: 调用类别，用于耗时和token统计
         """
+        self.call_class = call_class
         self.client = OpenAI(
             api_key=api_key,
             base_url=base_url,
@@ -66,6 +69,30 @@ class LLMService:
         else:
             self.available_models = []
 
+    def _record_call(self, started: float, usage=None, success: bool = True):
+        """
+        记录一次API调用的耗时与token用量（按调用类别统计）
+
+        :param started: 调用开始时间（perf_counter）
+        :param usage: 响应中的usage对象或字典
+        :param success: 调用是否成功
+        """
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        metrics.observe("llm.latency_ms", elapsed_ms, call_class=self.call_class)
+        metrics.incr("llm.calls", call_class=self.call_class)
+        if not success:
+            metrics.incr("llm.errors", call_class=self.call_class)
+            return
+        if usage is None:
+            return
+        if not isinstance(usage, dict):
+            usage = {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0),
+                "completion_tokens": getattr(usage, "completion_tokens", 0)
+            }
+        metrics.incr("llm.prompt_tokens", usage.get("prompt_tokens") or 0, call_class=self.call_class)
+        metrics.incr("llm.completion_tokens", usage.get("completion_tokens") or 0, call_class=self.call_class)
+
     def _manage_context(self, user_id: str, message: str, role: str = "user"):
         """
         上下文管理器（支持动态记忆窗口）
@@ -285,6 +312,7 @@ class LLMService:
                 }
                 
                 # 使用 requests 库向 Ollama API 发送 POST 请求
+                started = time.perf_counter()
                 try:
                     response = requests.post(
                         f"{str(self.client.base_url)}",
@@ -300,12 +328,17 @@ class LLMService:
                         logger.debug("Ollama API响应内容: %s", raw_content)
                     else:
                         raise ValueError("错误的API响应结构")
-                        
+
+                    self._record_call(started, {
+                        "prompt_tokens": response_data.get("prompt_eval_count", 0),
+                        "completion_tokens": response_data.get("eval_count", 0)
+                    })
                     clean_content = self._sanitize_response(raw_content)
                     self._manage_context(user_id, clean_content, "assistant")
                     return clean_content
                     
                 except Exception as e:
+                    self._record_call(started, success=False)
                     logger.error(f"Ollama API请求失败: {str(e)}")
                     raise
 
@@ -322,7 +355,13 @@ class LLMService:
                 }
                 
                 # 使用 OpenAI 客户端发送请求
-                response = self.client.chat.completions.create(**request_config)
+                started = time.perf_counter()
+                try:
+                    response = self.client.chat.completions.create(**request_config)
+                except Exception:
+                    self._record_call(started, success=False)
+                    raise
+                self._record_call(started, response.usage)
                 # 验证 API 响应结构
                 if not self._validate_response(response.model_dump()):
                     raise ValueError("错误的API响应结构")
@@ -377,6 +416,7 @@ class LLMService:
         Returns:
             str: AI的回复内容
         """
+        started = time.perf_counter()
         try:
             response = self.client.chat.completions.create(
                 model=self.config["model"],
@@ -384,6 +424,7 @@ class LLMService:
                 temperature=kwargs.get('temperature', self.config["temperature"]),
                 max_tokens=self.config["max_token"]
             )
+            self._record_call(started, response.usage)
             
             if not self._validate_response(response.model_dump()):
                 raise ValueError("Invalid API response structure")
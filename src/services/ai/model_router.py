@@ -0,0 +1,88 @@
+"""
+模型路由模块
+根据调用类别选择合适的模型，包括:
+- 人设对话使用主模型
+- 时间识别、记忆摘要、绘图提示词等辅助调用使用轻量模型
+- 同一配置复用同一个服务实例
+"""
+
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from src.config import config, LLMSettings
+from src.services.ai.llm_service import LLMService
+
+logger = logging.getLogger('main')
+
+# 调用类别
+CALL_CHAT = "chat"
+CALL_TIME_RECOGNITION = "time_recognition"
+CALL_MEMORY_SUMMARY = "memory_summary"
+CALL_IMAGE_PROMPT = "image_prompt"
+
+
+class ModelRouter:
+    """按调用类别路由到 (endpoint, model, max_tokens, temperature)"""
+
+    def __init__(self, llm_settings=None, routing_settings=None):
+        """
+        初始化模型路由
+
+        Args:
+            llm_settings: 主模型配置，默认读取全局配置
+            routing_settings: 路由表配置，默认读取全局配置
+        """
+        self.llm_settings = llm_settings or config.llm
+        self.routing_settings = routing_settings or config.model_routing
+        self._services: Dict[Tuple, LLMService] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, call_class: str, fallback: Optional[LLMSettings] = None):
+        """获取调用类别的生效配置，路由未配置的字段取自 fallback（默认为主模型配置）"""
+        return self.routing_settings.resolve(call_class, fallback or self.llm_settings)
+
+    def get_service(self, call_class: str, max_groups: int = 5,
+                    fallback: Optional[LLMSettings] = None) -> LLMService:
+        """
+        获取调用类别对应的LLM服务实例
+
+        Args:
+            call_class: 调用类别
+            max_groups: 上下文轮数（辅助调用只需要很小的上下文）
+            fallback: 路由未配置的字段使用的模型配置，默认为主模型配置
+
+        Returns:
+            LLMService: 相同配置下复用的服务实例
+        """
+        route = self.resolve(call_class, fallback)
+        key = (call_class, route.base_url, route.api_key, route.model, route.max_tokens, route.temperature,
+               max_groups)
+        with self._lock:
+            service = self._services.get(key)
+            if service is None:
+                service = LLMService(
+                    api_key=route.api_key,
+                    base_url=route.base_url,
+                    model=route.model,
+                    max_token=route.max_tokens,
+                    temperature=route.temperature,
+                    max_groups=max_groups,
+                    call_class=call_class
+                )
+                self._services[key] = service
+                logger.info(f"模型路由: {call_class} -> {route.model}")
+            return service
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """获取全局模型路由实例"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
@@ -0,0 +1,223 @@
+"""
+图片识别缓存模块
+负责复用相同图片的识别结果，包括:
+- 按文件内容的 SHA-256 精确匹配
+- 按感知哈希（dHash）匹配重新压缩、缩放过的同一张图片，宽高比须接近（排除裁剪过或不同的图片）
+- 结果持久化到 SQLite，超过容量时按最近使用时间淘汰
+- 统计命中率
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from src.services.database import Session, VisionCacheRecord
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 缓存条目上限
+MAX_ENTRIES = 5000
+# 感知哈希的最大汉明距离（64位中不同的位数），不超过该值且宽高比接近时视为同一张图片
+MAX_HASH_DISTANCE = 4
+# 感知哈希匹配允许的宽高比相对误差（缩放会有取整误差，裁剪会明显改变宽高比）
+ASPECT_TOLERANCE = 0.03
+# dHash 尺寸：缩放到 (HASH_SIZE + 1) x HASH_SIZE 后比较相邻像素
+HASH_SIZE = 8
+
+
+def file_sha256(path: str) -> str:
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dhash(path: str) -> Tuple[Optional[int], Optional[float]]:
+    """
+    计算图片的差异哈希（dHash）和宽高比
+
+    Returns:
+        Tuple[Optional[int], Optional[float]]: (64位无符号哈希, 宽/高)，无法解码时返回 (None, None)
+    """
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            img.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))  # JPEG 直接按缩小尺寸解码
+            gray = img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+        pixels = np.asarray(gray, dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+        return int(np.packbits(bits).view('>u8')[0]), width / height
+    except Exception as e:
+        logger.debug(f"计算图片感知哈希失败 {path}: {str(e)}")
+        return None, None
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class VisionCache:
+    """图片识别结果缓存（vision_cache 表 + 内存中的感知哈希索引）"""
+
+    def __init__(self, session_factory=Session, max_entries: int = MAX_ENTRIES,
+                 max_distance: int = MAX_HASH_DISTANCE, aspect_tolerance: float = ASPECT_TOLERANCE):
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.aspect_tolerance = aspect_tolerance
+        self._lock = threading.Lock()
+        # 普通图片的感知哈希索引: sha256 -> (dhash, 宽高比)；表情截图包含整个聊天窗口，只做精确匹配
+        self._hash_index: Dict[str, Tuple[int, float]] = {}
+        self._hash_keys = []
+        self._hash_array = np.zeros(0, dtype=np.uint64)
+        self._aspect_array = np.zeros(0, dtype=np.float64)
+        self._hits = 0
+        self._lookups = 0
+        self._load_index()
+
+    def _load_index(self):
+        session = self.session_factory()
+        try:
+            # 没有宽高比的旧条目只参与精确匹配
+            rows = session.query(VisionCacheRecord.sha256, VisionCacheRecord.dhash, VisionCacheRecord.aspect).filter(
+                VisionCacheRecord.is_emoji.is_(False),
+                VisionCacheRecord.dhash.isnot(None),
+                VisionCacheRecord.aspect.isnot(None)
+            ).all()
+            self._hash_index = {sha: (_to_unsigned(value), aspect) for sha, value, aspect in rows}
+            self._rebuild_array()
+            logger.info(f"图片识别缓存已加载 {len(self._hash_index)} 条感知哈希")
+        except Exception as e:
+            logger.error(f"加载图片识别缓存失败: {str(e)}")
+        finally:
+            session.close()
+
+    def _rebuild_array(self):
+        self._hash_keys = list(self._hash_index)
+        self._hash_array = np.array([self._hash_index[k][0] for k in self._hash_keys], dtype=np.uint64)
+        self._aspect_array = np.array([self._hash_index[k][1] for k in self._hash_keys], dtype=np.float64)
+
+    def _nearest(self, value: int, aspect: float) -> Optional[str]:
+        """查找宽高比接近的图片中汉明距离最小且不超过阈值的一张（调用方持有锁）"""
+        if not len(self._hash_array):
+            return None
+        xor = np.bitwise_xor(self._hash_array, np.uint64(value))
+        distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        # 宽高比相差过大的图片不参与比较
+        distances[np.abs(self._aspect_array - aspect) > self.aspect_tolerance * aspect] = HASH_SIZE * HASH_SIZE + 1
+        best = int(np.argmin(distances))
+        if distances[best] <= self.max_distance:
+            return self._hash_keys[best]
+        return None
+
+    def _record_lookup(self, hit: bool, match: str = ""):
+        self._lookups += 1
+        if hit:
+            self._hits += 1
+            metrics.incr("vision_cache.hits", match=match)
+        else:
+            metrics.incr("vision_cache.misses")
+        metrics.set_gauge("vision_cache.hit_rate", round(self._hits / self._lookups, 3))
+
+    def fingerprint(self, path: str, is_emoji: bool) -> Tuple[str, Optional[int], Optional[float]]:
+        """计算缓存键 (sha256, dhash, 宽高比)，表情截图不计算感知哈希"""
+        if is_emoji:
+            return file_sha256(path), None, None
+        return (file_sha256(path),) + dhash(path)
+
+    def get(self, sha256: str, phash: Optional[int], aspect: Optional[float], is_emoji: bool) -> Optional[str]:
+        """
+        查询识别结果
+
+        Args:
+            sha256: 文件内容哈希
+            phash: 感知哈希，为空时只做精确匹配
+            aspect: 宽高比，为空时只做精确匹配
+            is_emoji: 是否为表情截图
+
+        Returns:
+            Optional[str]: 缓存的识别结果，未命中返回 None
+        """
+        session = self.session_factory()
+        try:
+            with self._lock:
+                match = "exact"
+                record = session.get(VisionCacheRecord, (sha256, is_emoji))
+                if record is None and phash is not None and aspect is not None and not is_emoji:
+                    nearest = self._nearest(phash, aspect)
+                    if nearest is not None:
+                        match = "perceptual"
+                        record = session.get(VisionCacheRecord, (nearest, False))
+                if record is None:
+                    self._record_lookup(False)
+                    return None
+                record.hits = (record.hits or 0) + 1
+                record.last_used = datetime.now()
+                result = record.result
+                session.commit()
+                self._record_lookup(True, match)
+                return result
+        except Exception as e:
+            session.rollback()
+            logger.error(f"查询图片识别缓存失败: {str(e)}")
+            return None
+        finally:
+            session.close()
+
+    def put(self, sha256: str, phash: Optional[int], aspect: Optional[float], is_emoji: bool, result: str):
+        """保存识别结果，超过容量时淘汰最久未使用的条目"""
+        indexed = phash is not None and aspect is not None and not is_emoji
+        session = self.session_factory()
+        try:
+            with self._lock:
+                session.merge(VisionCacheRecord(
+                    sha256=sha256,
+                    is_emoji=is_emoji,
+                    dhash=_to_signed(phash) if phash is not None else None,
+                    aspect=aspect,
+                    result=result,
+                    hits=0,
+                    last_used=datetime.now()
+                ))
+                session.flush()
+                evicted = []
+                overflow = session.query(VisionCacheRecord).count() - self.max_entries
+                if overflow > 0:
+                    oldest = session.query(VisionCacheRecord).order_by(
+                        VisionCacheRecord.last_used
+                    ).limit(overflow).all()
+                    for record in oldest:
+                        evicted.append(record.sha256)
+                        session.delete(record)
+                    metrics.incr("vision_cache.evictions", overflow)
+                session.commit()
+
+                if evicted:
+                    for sha in evicted:
+                        self._hash_index.pop(sha, None)
+                    if indexed:
+                        self._hash_index[sha256] = (phash, aspect)
+                    self._rebuild_array()
+                elif indexed and sha256 not in self._hash_index:
+                    self._hash_index[sha256] = (phash, aspect)
+                    self._hash_keys.append(sha256)
+                    self._hash_array = np.append(self._hash_array, np.uint64(phash))
+                    self._aspect_array = np.append(self._aspect_array, aspect)
+                metrics.set_gauge("vision_cache.entries", len(self._hash_index))
+        except Exception as e:
+            session.rollback()
+            logger.error(f"保存图片识别缓存失败: {str(e)}")
+        finally:
+            session.close()
@@ -0,0 +1,173 @@
+"""
+图片识别请求体模块
+负责在上传前处理图片并流式生成请求体，包括:
+- 按需解码图片，缩放到模型实际使用的分辨率
+- 重新编码为指定质量的 JPEG
+- 边读边做 base64 编码，不在内存中保留多份完整副本
+- 预先计算请求体长度，保留 Content-Length
+"""
+
+import base64
+import io
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, List, Sequence, Union
+
+from PIL import Image
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 图片最长边（像素），超过的按比例缩小
+MAX_IMAGE_SIDE = 1280
+# 重新编码的 JPEG 质量
+JPEG_QUALITY = 85
+# 每次读取的原始字节数（3 的倍数，保证分块编码结果可以直接拼接）
+READ_CHUNK = 3 * 64 * 1024
+# 请求体中图片数据的占位符
+IMAGE_PLACEHOLDER = "__IMAGE_BASE64_{}__"
+
+
+@dataclass
+class PreparedImage:
+    """待上传的图片"""
+    stream: BinaryIO
+    size: int
+    mime: str
+
+    def close(self):
+        self.stream.close()
+
+
+def prepare_image(path: str, max_side: int = MAX_IMAGE_SIDE, quality: int = JPEG_QUALITY) -> PreparedImage:
+    """
+    缩放并重新编码图片；无法解码时原样上传
+
+    Args:
+        path: 图片路径
+        max_side: 最长边
+        quality: JPEG 质量
+
+    Returns:
+        PreparedImage: 处理后的图片数据
+    """
+    original_size = os.path.getsize(path)
+    try:
+        with Image.open(path) as img:
+            # JPEG 在解码阶段直接按 1/2、1/4、1/8 缩小，避免解码完整的大图
+            img.draft('RGB', (max_side, max_side))
+            img.thumbnail((max_side, max_side))
+            if img.mode in ('RGBA', 'LA', 'P'):
+                rgba = img.convert('RGBA')
+                img = Image.new('RGB', rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel('A'))
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=quality, optimize=True)
+        size = buffer.tell()
+        buffer.seek(0)
+        metrics.observe("vision.upload_bytes", size)
+        metrics.observe("vision.upload_ratio", size / max(original_size, 1))
+        return PreparedImage(stream=buffer, size=size, mime="image/jpeg")
+    except Exception as e:
+        logger.warning(f"图片预处理失败，使用原图上传 {path}: {str(e)}")
+        metrics.observe("vision.upload_bytes", original_size)
+        return PreparedImage(stream=open(path, 'rb'), size=original_size, mime="image/jpeg")
+
+
+class _Base64Part:
+    """从二进制流中边读边编码的 base64 片段"""
+
+    def __init__(self, image: PreparedImage):
+        self.image = image
+        self.length = 4 * ((image.size + 2) // 3)
+
+    def chunks(self):
+        while True:
+            raw = self.image.stream.read(READ_CHUNK)
+            if not raw:
+                return
+            yield base64.b64encode(raw)
+
+
+class StreamingBody:
+    """
+    流式请求体，实现 read() 和 __len__()，requests 会据此设置 Content-Length 并分块上传
+    """
+
+    def __init__(self, parts: Sequence[Union[bytes, _Base64Part]]):
+        self.parts = list(parts)
+        self.length = sum(len(p) if isinstance(p, bytes) else p.length for p in self.parts)
+        self._iter = self._chunks()
+        self._buffer = b''
+        self._offset = 0
+
+    def _chunks(self):
+        for part in self.parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                yield from part.chunks()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        pieces = []
+        remaining = size
+        while size < 0 or remaining > 0:
+            if self._offset >= len(self._buffer):
+                chunk = next(self._iter, None)
+                if chunk is None:
+                    break
+                self._buffer, self._offset = chunk, 0
+            end = len(self._buffer) if size < 0 else min(len(self._buffer), self._offset + remaining)
+            pieces.append(self._buffer[self._offset:end])
+            remaining -= end - self._offset
+            self._offset = end
+        return b''.join(pieces)
+
+    def close(self):
+        for part in self.parts:
+            if isinstance(part, _Base64Part):
+                part.image.close()
+
+
+def build_vision_body(model: str, images: List[PreparedImage], text: str, temperature: float) -> StreamingBody:
+    """
+    生成图片识别的流式请求体
+
+    Args:
+        model: 模型名称
+        images: 待识别的图片（按顺序放在提示词之前）
+        text: 提示词
+        temperature: 温度
+
+    Returns:
+        StreamingBody: 请求体，上传完成后需要调用 close()
+    """
+    content = [
+        {
+            "type": "image_url",
+            "image_url": {"url": f"data:{image.mime};base64,{IMAGE_PLACEHOLDER.format(i)}"}
+        }
+        for i, image in enumerate(images)
+    ]
+    content.append({"type": "text", "text": text})
+    data = {
+        "model": model,
+        "messages": [{"role": "user", "content": content}],
+        "temperature": temperature
+    }
+    template = json.dumps(data, ensure_ascii=False)
+    parts: List[Union[bytes, _Base64Part]] = []
+    for i, image in enumerate(images):
+        before, template = template.split(IMAGE_PLACEHOLDER.format(i), 1)
+        parts.append(before.encode('utf-8'))
+        parts.append(_Base64Part(image))
+    parts.append(template.encode('utf-8'))
+    return StreamingBody(parts)
@@ -1,43 +1,40 @@
 import logging
-import schedule
-import threading
-import time
 from typing import Dict, Optional
 from src.config import config  # 修改导入路径
+from src.handlers.message_source import MessageSource
+from src.services.scheduler import get_scheduler, CronTrigger, IntervalTrigger
 
 logger = logging.getLogger(__name__)
 
+# 统一调度器中的任务分组
+JOB_GROUP = "auto_task_simple"
+
 class AutoTasker:
     def __init__(self, message_handler):
         self.message_handler = message_handler
         self.tasks: Dict[str, Dict] = {}
-        self.scheduler = schedule.Scheduler()
-        self._thread = None
+        self.scheduler = get_scheduler()
         self._running = False
 
     def start(self):
-        """启动任务调度器"""
-        if self._thread is not None:
+        """启动任务调度器（任务由统一调度器执行，无需轮询线程）"""
+        if self._running:
             return
         
         self._running = True
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
+        for task_id, task in self.tasks.items():
+            self._schedule(task_id, task)
         logger.info("自动任务调度器已启动")
 
     def stop(self):
         """停止任务调度器"""
         self._running = False
-        if self._thread:
-            self._thread.join()
-            self._thread = None
+        self.scheduler.remove_group(JOB_GROUP)
         logger.info("自动任务调度器已停止")
 
-    def _run(self):
-        """运行调度器"""
-        while self._running:
-            self.scheduler.run_pending()
-            time.sleep(1)
+    @staticmethod
+    def _job_id(task_id: str) -> str:
+        return f"{JOB_GROUP}_{task_id}"
 
     def add_task(self, task_id: str, chat_id: str, content: str, 
                  schedule_type: str, schedule_time: str = '', 
@@ -52,9 +49,21 @@ class AutoTasker:
         task = {
             'chat_id': chat_id,
             'content': content,
-            'schedule_type': schedule_type
+            'schedule_type': schedule_type,
+            'schedule_time': schedule_time,
+            'interval': interval
         }
 
+        self.tasks[task_id] = task
+        if self._running:
+            self._schedule(task_id, task)
+        logger.info(f"已添加任务: {task_id}")
+
+    def _schedule(self, task_id: str, task: Dict):
+        """把任务注册到统一调度器"""
+        chat_id = task['chat_id']
+        content = task['content']
+
         def job():
             try:
                 # 修改消息发送方式
@@ -63,29 +72,26 @@ class AutoTasker:
                     content=content,
                     sender_name="System",
                     username="AutoTasker",
-                    is_group=False
+                    is_group=False,
+                    source=MessageSource.SCHEDULED_TASK
                 )
                 logger.info(f"定时任务执行成功: {task_id}")
             except Exception as e:
                 logger.error(f"定时任务执行失败 {task_id}: {str(e)}")
 
-        if schedule_type == 'cron':
-            # 解析cron表达式
-            minute, hour, day, month, day_of_week = schedule_time.split()
-            self.scheduler.every().day.at(f"{hour.zfill(2)}:{minute.zfill(2)}").do(job)
-            logger.info(f"添加定时任务: {task_id}, 时间: {hour}:{minute}")
+        if task['schedule_type'] == 'cron':
+            trigger = CronTrigger.from_crontab(task['schedule_time'])
+            logger.info(f"添加定时任务: {task_id}, cron: {task['schedule_time']}")
         else:
             # 使用时间间隔
-            self.scheduler.every(interval).seconds.do(job)
-            logger.info(f"添加间隔任务: {task_id}, 间隔: {interval}秒")
+            trigger = IntervalTrigger(seconds=int(task['interval']))
+            logger.info(f"添加间隔任务: {task_id}, 间隔: {task['interval']}秒")
 
-        self.tasks[task_id] = task
-        logger.info(f"已添加任务: {task_id}")
+        self.scheduler.add_job(job, trigger, job_id=self._job_id(task_id), group=JOB_GROUP)
 
     def remove_task(self, task_id: str):
         """移除任务"""
         if task_id in self.tasks:
-            # 从调度器中移除所有任务并重新添加其他任务
-            self.scheduler.clear()
+            self.scheduler.remove_job(self._job_id(task_id))
             del self.tasks[task_id]
             logger.info(f"已移除任务: {task_id}") 
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""
+后台任务模块
+负责延后执行不紧急的 LLM 任务（核心记忆更新、提醒识别等），包括:
+- 监测实时负载：进行中的回复数、待处理的消息队列数、对话模型延迟
+- 负载高时暂缓后台任务，空闲或安静时间再执行
+- 每个任务带截止时间，临近截止时无论负载都会执行
+- 截止时间短的任务（如提醒识别）由单独的工作线程执行，不会排在耗时的任务（如核心记忆总结）后面
+- 相同键的任务合并，只保留一个待执行
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 负载阈值
+MAX_INFLIGHT_REPLIES = 1       # 进行中的回复数达到该值视为繁忙
+MAX_PENDING_QUEUES = 1         # 等待合并的消息队列数达到该值视为繁忙
+MAX_CHAT_LATENCY_MS = 15000    # 对话模型近期 p50 延迟超过该值视为繁忙
+# 距截止时间小于该秒数时强制执行
+DEADLINE_SLACK_SECONDS = 2
+# 繁忙时重新检查负载的间隔（秒）
+POLL_INTERVAL_SECONDS = 2
+# 截止时间不超过该秒数的任务进入紧急通道
+URGENT_DEADLINE_SECONDS = 60
+
+# 执行通道：每个通道一个工作线程
+LANE_URGENT = "urgent"
+LANE_NORMAL = "normal"
+
+
+class LoadMonitor:
+    """实时交互负载"""
+
+    def __init__(self):
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._queue_depth_provider: Callable[[], int] = lambda: 0
+        self._idle_provider: Callable[[], bool] = lambda: False
+        self._listeners: List[Callable[[], None]] = []
+
+    @contextmanager
+    def interactive(self):
+        """包裹一次交互回复，期间后台任务让路"""
+        with self._lock:
+            self._inflight += 1
+            metrics.set_gauge("load.inflight_replies", self._inflight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+                metrics.set_gauge("load.inflight_replies", self._inflight)
+            for listener in self._listeners:
+                listener()
+
+    def set_queue_depth_provider(self, provider: Callable[[], int]):
+        """设置待处理消息队列数的来源"""
+        self._queue_depth_provider = provider
+
+    def set_idle_provider(self, provider: Callable[[], bool]):
+        """设置额外的空闲判断（如安静时间），返回 True 且没有进行中的回复时直接执行"""
+        self._idle_provider = provider
+
+    def add_listener(self, listener: Callable[[], None]):
+        """交互回复结束时回调"""
+        self._listeners.append(listener)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def busy_reason(self) -> Optional[str]:
+        """返回繁忙原因，空闲时返回 None"""
+        if self._inflight >= MAX_INFLIGHT_REPLIES:
+            return "inflight"
+        try:
+            if self._idle_provider():
+                return None
+        except Exception as e:
+            logger.error(f"检查空闲状态失败: {str(e)}")
+        try:
+            if self._queue_depth_provider() >= MAX_PENDING_QUEUES:
+                return "queue_depth"
+        except Exception as e:
+            logger.error(f"获取消息队列长度失败: {str(e)}")
+        latency = metrics.get_distribution("llm.latency_ms", call_class="chat")
+        if latency and latency.get("p50", 0) > MAX_CHAT_LATENCY_MS:
+            return "latency"
+        return None
+
+
+@dataclass(order=True)
+class BackgroundJob:
+    """后台任务"""
+    deadline: float
+    seq: int
+    name: str = field(compare=False)
+    func: Callable = field(compare=False)
+    args: Tuple = field(compare=False, default=())
+    kwargs: Dict[str, Any] = field(compare=False, default_factory=dict)
+    key: Optional[str] = field(compare=False, default=None)
+    submitted: float = field(compare=False, default=0.0)
+    cancelled: bool = field(compare=False, default=False)
+
+
+class BackgroundQueue:
+    """
+    按截止时间排序的后台任务队列，避免与交互回复争抢模型
+
+    紧急和普通两个通道各一个工作线程：耗时的普通任务执行期间，截止时间短的任务仍能按时执行
+    """
+
+    def __init__(self, monitor: LoadMonitor):
+        self.monitor = monitor
+        self._heaps: Dict[str, List[BackgroundJob]] = {LANE_URGENT: [], LANE_NORMAL: []}
+        self._keyed: Dict[str, BackgroundJob] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: Dict[str, threading.Thread] = {}
+        monitor.add_listener(self.wake)
+
+    def submit(self, name: str, func: Callable, *args, deadline: float = 300,
+               key: Optional[str] = None, **kwargs) -> bool:
+        """
+        提交后台任务
+
+        Args:
+            name: 任务类型，用作指标标签
+            func: 任务函数
+            deadline: 最迟在多少秒内执行
+            key: 合并键，已有相同键的任务待执行时不再重复提交
+
+        Returns:
+            bool: 是否新加入队列（被合并时返回 False）
+        """
+        now = time.time()
+        with self._cond:
+            if key is not None and key in self._keyed:
+                existing = self._keyed[key]
+                if now + deadline >= existing.deadline:
+                    metrics.incr("background.coalesced", job=name)
+                    return False
+                # 新任务截止更早：替换旧任务
+                existing.cancelled = True
+            job = BackgroundJob(
+                deadline=now + deadline,
+                seq=next(self._seq),
+                name=name,
+                func=func,
+                args=args,
+                kwargs=kwargs,
+                key=key,
+                submitted=now
+            )
+            lane = LANE_URGENT if deadline <= URGENT_DEADLINE_SECONDS else LANE_NORMAL
+            heapq.heappush(self._heaps[lane], job)
+            if key is not None:
+                self._keyed[key] = job
+            metrics.incr("background.submitted", job=name)
+            metrics.set_gauge("background.queue_depth", len(self._heaps[lane]), lane=lane)
+            self._ensure_started(lane)
+            self._cond.notify_all()
+        return True
+
+    def wake(self):
+        """负载变化时唤醒工作线程重新检查"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for heap in self._heaps.values() for job in heap if not job.cancelled)
+
+    def _ensure_started(self, lane: str):
+        if lane not in self._threads:
+            thread = threading.Thread(target=self._run, args=(lane,), name=f"background-{lane}", daemon=True)
+            self._threads[lane] = thread
+            thread.start()
+
+    def _next_job(self, lane: str) -> Tuple[BackgroundJob, str]:
+        """等待直到通道中有任务可以执行，返回 (任务, 执行原因)"""
+        heap = self._heaps[lane]
+        with self._cond:
+            while True:
+                while heap and heap[0].cancelled:
+                    heapq.heappop(heap)
+                if not heap:
+                    self._cond.wait()
+                    continue
+                job = heap[0]
+                remaining = job.deadline - time.time()
+                busy = self.monitor.busy_reason()
+                if busy is None or remaining <= DEADLINE_SLACK_SECONDS:
+                    heapq.heappop(heap)
+                    if job.key is not None and self._keyed.get(job.key) is job:
+                        del self._keyed[job.key]
+                    metrics.set_gauge("background.queue_depth", len(heap), lane=lane)
+                    return job, "idle" if busy is None else "deadline"
+                metrics.incr("background.deferred", reason=busy)
+                self._cond.wait(min(POLL_INTERVAL_SECONDS, max(remaining - DEADLINE_SLACK_SECONDS, 0.1)))
+
+    def _run(self, lane: str):
+        while True:
+            job, reason = self._next_job(lane)
+            metrics.observe("background.wait_ms", (time.time() - job.submitted) * 1000, job=job.name)
+            metrics.incr("background.runs", job=job.name, reason=reason)
+            try:
+                job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                metrics.incr("background.errors", job=job.name)
+                logger.error(f"后台任务 {job.name} 执行失败: {str(e)}")
+
+
+_monitor = LoadMonitor()
+_queue: Optional[BackgroundQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_load_monitor() -> LoadMonitor:
+    """获取全局负载监测器"""
+    return _monitor
+
+
+def get_background_queue() -> BackgroundQueue:
+    """获取全局后台任务队列"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = BackgroundQueue(_monitor)
+        return _queue
@@ -0,0 +1,150 @@
+"""
+cron 表达式模块
+负责解析和计算 crontab 表达式（分 时 日 月 周），包括:
+- 每个字段编译为位集合
+- 通过位运算直接跳到下一个匹配的月/日/时/分
+- 日和周同时限定时按标准 cron 语义取并集，任一字段以 * 开头（如 */2）时取交集
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+MONTH_NAMES = {name: index for index, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+WEEKDAY_NAMES = {name: index for index, name in enumerate(
+    ["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# 字段: (名称, 最小值, 最大值, 名称映射)
+FIELDS: Tuple[Tuple[str, int, int, Dict[str, int]], ...] = (
+    ("分钟", 0, 59, {}),
+    ("小时", 0, 23, {}),
+    ("日期", 1, 31, {}),
+    ("月份", 1, 12, MONTH_NAMES),
+    ("星期", 0, 7, WEEKDAY_NAMES),
+)
+
+# 查找下一次执行时间的最大年数，超过视为永不执行（如 2月30日）
+MAX_YEARS = 8
+
+
+def _next_bit(mask: int, start: int) -> Optional[int]:
+    """返回 mask 中大于等于 start 的最低置位，不存在时返回 None"""
+    shifted = mask >> start
+    if not shifted:
+        return None
+    return start + (shifted & -shifted).bit_length() - 1
+
+
+def _parse_value(value: str, names: Dict[str, int], field_name: str) -> int:
+    value = value.lower()
+    if value in names:
+        return names[value]
+    if not value.isdigit():
+        raise ValueError(f"无效的{field_name}: {value}")
+    return int(value)
+
+
+def _parse_field(expr: str, index: int) -> Tuple[int, bool]:
+    """
+    把一个字段编译为位集合
+
+    Returns:
+        Tuple[int, bool]: (位集合, 是否以 * 开头、不限定)
+    """
+    field_name, low, high, names = FIELDS[index]
+    mask = 0
+    for part in expr.split(","):
+        if not part:
+            raise ValueError(f"无效的{field_name}: {expr}")
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            if not step_str.isdigit() or int(step_str) == 0:
+                raise ValueError(f"无效的{field_name}步长: {step_str}")
+            step = int(step_str)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start = _parse_value(start_str, names, field_name)
+            end = _parse_value(end_str, names, field_name)
+        else:
+            start = _parse_value(part, names, field_name)
+            # "5/15" 表示从 5 开始每 15 个单位
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high and start <= end):
+            raise ValueError(f"{field_name}超出范围 {low}-{high}: {part}")
+        for value in range(start, end + 1, step):
+            mask |= 1 << value
+    # 与标准 cron 一致，以 * 开头的字段（包括 */2）都视为不限定，决定日和周是取交集还是并集
+    return mask, expr.startswith("*")
+
+
+class CronExpression:
+    """编译后的 crontab 表达式"""
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron 表达式需要5个字段（分 时 日 月 周）: {expression}")
+        self.expression = expression
+        self.minutes, _ = _parse_field(parts[0], 0)
+        self.hours, _ = _parse_field(parts[1], 1)
+        self.days, days_any = _parse_field(parts[2], 2)
+        self.months, _ = _parse_field(parts[3], 3)
+        weekdays, weekdays_any = _parse_field(parts[4], 4)
+        # 7 和 0 都表示周日
+        if weekdays & (1 << 7):
+            weekdays = (weekdays | 1) & ~(1 << 7)
+        self.weekdays = weekdays
+        self.days_any = days_any
+        self.weekdays_any = weekdays_any
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = bool(self.days >> dt.day & 1)
+        # datetime.weekday() 周一为0，cron 周日为0
+        weekday_ok = bool(self.weekdays >> ((dt.weekday() + 1) % 7) & 1)
+        if self.days_any or self.weekdays_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> Optional[datetime]:
+        """
+        计算晚于 after 的下一次执行时间（精确到分钟）
+
+        Args:
+            after: 起始时间（不包含）
+
+        Returns:
+            Optional[datetime]: 下一次执行时间，表达式永不匹配时返回 None
+        """
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        year_limit = dt.year + MAX_YEARS
+        while dt.year <= year_limit:
+            month = _next_bit(self.months, dt.month)
+            if month is None:
+                dt = datetime(dt.year + 1, 1, 1)
+                continue
+            if month != dt.month:
+                dt = datetime(dt.year, month, 1)
+
+            if not self._day_matches(dt):
+                dt = datetime(dt.year, dt.month, dt.day) + timedelta(days=1)
+                continue
+
+            hour = _next_bit(self.hours, dt.hour)
+            if hour is None:
+                dt = datetime(dt.year, dt.month, dt.day) + timedelta(days=1)
+                continue
+            if hour != dt.hour:
+                dt = dt.replace(hour=hour, minute=0)
+
+            minute = _next_bit(self.minutes, dt.minute)
+            if minute is None:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            return dt.replace(minute=minute)
+        return None
+
+    def __repr__(self):
+        return f"CronExpression({self.expression!r})"
@@ -5,11 +5,13 @@
 - 创建数据库连接
 - 管理会话
 - 存储聊天记录
+- 存储待执行的提醒
+- 缓存图片识别结果
 """
 
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
+from sqlalchemy import create_engine, inspect, text, Column, Integer, BigInteger, Boolean, Float, String, DateTime, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -39,5 +41,36 @@ class ChatMessage(Base):
     reply = Column(Text)  # 机器人的回复
     created_at = Column(DateTime, default=datetime.now)
 
+class ReminderRecord(Base):
+    __tablename__ = 'reminders'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(String(100), nullable=False)  # 接收提醒的聊天
+    sender_name = Column(String(100))  # 设置提醒的用户
+    content = Column(Text)  # 提醒内容
+    fire_time = Column(DateTime, nullable=False, index=True)  # 提醒时间
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        Index('ix_reminders_chat_fire', 'chat_id', 'fire_time'),
+    )
+
+class VisionCacheRecord(Base):
+    __tablename__ = 'vision_cache'
+
+    sha256 = Column(String(64), primary_key=True)  # 文件内容的 SHA-256
+    is_emoji = Column(Boolean, primary_key=True, default=False)  # 表情截图与普通图片的提示词不同，分开缓存
+    dhash = Column(BigInteger)  # 感知哈希（有符号64位存储）
+    aspect = Column(Float)  # 宽高比，感知哈希匹配时要求接近
+    result = Column(Text, nullable=False)  # 识别结果
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    last_used = Column(DateTime, default=datetime.now, index=True)  # 按最近使用时间淘汰
+
 # 创建数据库表
-Base.metadata.create_all(engine) 
\ No newline at end of file
+Base.metadata.create_all(engine)
+
+# create_all 不修改已有的表，为旧数据库补充后来新增的列
+if 'aspect' not in {column['name'] for column in inspect(engine).get_columns('vision_cache')}:
+    with engine.begin() as connection:
+        connection.execute(text('ALTER TABLE vision_cache ADD COLUMN aspect FLOAT'))
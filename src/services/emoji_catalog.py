@@ -0,0 +1,167 @@
+"""
+表情包目录索引模块
+负责在内存中维护各人设的表情包列表，包括:
+- 启动时为所有人设建立 情感 -> 文件列表 的索引
+- 定期比较目录修改时间，只重建发生变化的人设
+- 选择表情包时不访问磁盘
+- 按聊天记录最近发送的表情包，避免连续重复
+"""
+
+import logging
+import os
+import random
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from src.services.scheduler import get_scheduler, IntervalTrigger
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+EMOJI_EXTENSIONS = ('.gif', '.jpg', '.png', '.jpeg')
+# 检查目录变化的间隔（秒）
+REFRESH_INTERVAL_SECONDS = 30
+# 每个聊天记录的最近发送表情包数
+RECENT_SIZE = 5
+# 记录最近发送表情包的聊天数上限
+MAX_TRACKED_CHATS = 1024
+# 避开最近发送的表情包时的最多抽取次数
+MAX_PICK_ATTEMPTS = 4
+# 统一调度器中的任务
+JOB_ID = "emoji_catalog_refresh"
+JOB_GROUP = "emoji_catalog"
+
+
+class EmojiCatalog:
+    """表情包索引：表情目录 -> 情感 -> 文件路径"""
+
+    def __init__(self, recent_size: int = RECENT_SIZE):
+        self.recent_size = recent_size
+        self._index: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        # 表情目录 -> {目录路径: 修改时间}，包括表情目录本身（新增情感目录时变化）
+        self._mtimes: Dict[str, Dict[str, float]] = {}
+        self._recent: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scan(emoji_dir: str) -> Tuple[Dict[str, Tuple[str, ...]], Dict[str, float]]:
+        index: Dict[str, Tuple[str, ...]] = {}
+        mtimes: Dict[str, float] = {}
+        if not os.path.isdir(emoji_dir):
+            return index, mtimes
+        mtimes[emoji_dir] = os.stat(emoji_dir).st_mtime
+        with os.scandir(emoji_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                mtimes[entry.path] = entry.stat().st_mtime
+                index[entry.name.lower()] = tuple(sorted(
+                    os.path.join(entry.path, f) for f in os.listdir(entry.path)
+                    if f.lower().endswith(EMOJI_EXTENSIONS)
+                ))
+        return index, mtimes
+
+    def load(self, emoji_dir: str):
+        """扫描一个表情目录并替换其索引"""
+        try:
+            index, mtimes = self._scan(emoji_dir)
+        except OSError as e:
+            logger.error(f"加载表情包目录失败 {emoji_dir}: {str(e)}")
+            index, mtimes = {}, {}
+        with self._lock:
+            self._index[emoji_dir] = index
+            self._mtimes[emoji_dir] = mtimes
+        metrics.incr("emoji_catalog.loads")
+        logger.info(f"表情包索引已加载: {emoji_dir}，{sum(len(f) for f in index.values())} 个文件")
+
+    def preload(self, avatars_root: str):
+        """为所有人设建立索引（avatars_root 下每个人设目录中的 emojis 目录）"""
+        if not os.path.isdir(avatars_root):
+            return
+        for name in sorted(os.listdir(avatars_root)):
+            emoji_dir = os.path.join(avatars_root, name, "emojis")
+            if os.path.isdir(emoji_dir):
+                self.load(emoji_dir)
+
+    def refresh(self):
+        """重建目录修改时间发生变化的表情目录"""
+        with self._lock:
+            snapshot = {emoji_dir: dict(mtimes) for emoji_dir, mtimes in self._mtimes.items()}
+        for emoji_dir, mtimes in snapshot.items():
+            if self._changed(emoji_dir, mtimes):
+                logger.info(f"表情包目录已变化，重新加载: {emoji_dir}")
+                metrics.incr("emoji_catalog.reloads")
+                self.load(emoji_dir)
+
+    @staticmethod
+    def _changed(emoji_dir: str, mtimes: Dict[str, float]) -> bool:
+        if not mtimes:
+            # 上次加载时目录不存在
+            return os.path.isdir(emoji_dir)
+        for path, mtime in mtimes.items():
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def start_refresh(self, interval: float = REFRESH_INTERVAL_SECONDS):
+        """在统一调度器中定期检查目录变化"""
+        get_scheduler().add_job(self.refresh, IntervalTrigger(seconds=interval),
+                                job_id=JOB_ID, group=JOB_GROUP)
+
+    def pick(self, emoji_dir: str, emotion: str, chat_id: Optional[str] = None) -> Optional[str]:
+        """
+        随机选择一个表情包，尽量避开该聊天最近发送过的
+
+        Args:
+            emoji_dir: 当前人设的表情目录
+            emotion: 情感类型
+            chat_id: 聊天ID，为空时不记录
+
+        Returns:
+            Optional[str]: 表情包路径，没有对应表情包时返回 None
+        """
+        with self._lock:
+            loaded = emoji_dir in self._index
+        if not loaded:
+            # 未预加载的目录（如运行中新增的人设）首次使用时加载
+            self.load(emoji_dir)
+
+        with self._lock:
+            files = self._index[emoji_dir].get(emotion)
+            if not files:
+                return None
+            recent = self._recent.get(chat_id) if chat_id is not None else None
+            selected = random.choice(files)
+            if recent:
+                attempts = 1
+                while selected in recent and attempts < MAX_PICK_ATTEMPTS:
+                    selected = random.choice(files)
+                    attempts += 1
+                if selected in recent:
+                    metrics.incr("emoji_catalog.repeats")
+            if chat_id is not None:
+                if recent is None:
+                    recent = self._recent[chat_id] = deque(maxlen=self.recent_size)
+                    while len(self._recent) > MAX_TRACKED_CHATS:
+                        self._recent.popitem(last=False)
+                else:
+                    self._recent.move_to_end(chat_id)
+                recent.append(selected)
+        return selected
+
+
+_catalog: Optional[EmojiCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_emoji_catalog() -> EmojiCatalog:
+    """获取全局表情包索引"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = EmojiCatalog()
+        return _catalog
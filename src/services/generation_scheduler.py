@@ -0,0 +1,220 @@
+"""
+回复生成调度模块
+负责在消息合并之后、生成回复之前安排执行顺序，包括:
+- 按聊天做加权公平排队（起始时间公平排队），单个用户连续刷屏不会挤占其他聊天
+- 会话中的第一条回复优先处理
+- 限制每个聊天同时进行的生成数
+- 提醒、定时任务、主动消息等系统消息权重较低
+- 同时进行的生成数可配置，长时间空闲的聊天状态定期清理
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from src.handlers.message_source import MessageSource, is_system_source
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 同时进行的生成数（所有聊天合计），可由配置 llm_settings.max_concurrent_replies 覆盖
+GENERATION_WORKERS = 2
+# 每个聊天同时进行的生成数
+PER_CHAT_LIMIT = 1
+# 权重：用户消息为 1，系统消息每次占用 4 倍的份额
+USER_WEIGHT = 1.0
+SYSTEM_WEIGHT = 0.25
+# 距上次回复超过该秒数视为新会话，第一条回复优先
+NEW_CONVERSATION_SECONDS = 30 * 60
+# 清理空闲聊天状态的最小间隔（秒）
+EVICT_INTERVAL_SECONDS = 60
+
+# 优先级档位，数值越小越先处理
+TIER_FIRST_RESPONSE = 0
+TIER_NORMAL = 1
+
+
+@dataclass
+class GenerationTask:
+    """待生成的回复"""
+    chat_id: str
+    func: Callable
+    args: Tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    source: str = MessageSource.USER
+    tier: int = TIER_NORMAL
+    start_tag: float = 0.0
+    seq: int = 0
+    submitted: float = 0.0
+
+
+@dataclass
+class _ChatState:
+    queue: Deque[GenerationTask] = field(default_factory=deque)
+    running: int = 0
+    finish_tag: float = 0.0
+    last_reply: float = 0.0
+
+
+class GenerationScheduler:
+    """按聊天公平调度回复生成"""
+
+    def __init__(self, workers: int = GENERATION_WORKERS, per_chat_limit: int = PER_CHAT_LIMIT):
+        self.workers = max(1, workers)
+        self.per_chat_limit = max(1, per_chat_limit)
+        self._chats: Dict[str, _ChatState] = {}
+        self._virtual_time = 0.0
+        self._pending = 0
+        self._running = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._last_evict = 0.0
+
+    def set_workers(self, workers: int):
+        """调整同时进行的生成数，减少时多出的线程在完成当前任务后退出"""
+        with self._cond:
+            self.workers = max(1, workers)
+            if self._threads:
+                self._ensure_started()
+            self._cond.notify_all()
+
+    def submit(self, chat_id: str, func: Callable, *args, source: str = MessageSource.USER, **kwargs):
+        """
+        提交一次回复生成
+
+        Args:
+            chat_id: 聊天ID，公平排队和并发限制都按聊天计算
+            func: 生成并发送回复的函数
+            source: 消息来源，系统消息权重较低
+        """
+        now = time.time()
+        weight = SYSTEM_WEIGHT if is_system_source(source) else USER_WEIGHT
+        with self._cond:
+            if now - self._last_evict >= EVICT_INTERVAL_SECONDS:
+                self._evict_idle(now)
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _ChatState()
+            # 用户开启新会话（或首次对话）时，第一条回复优先
+            first_response = (source == MessageSource.USER and not chat.queue and not chat.running
+                              and now - chat.last_reply >= NEW_CONVERSATION_SECONDS)
+            start_tag = max(self._virtual_time, chat.finish_tag)
+            chat.finish_tag = start_tag + 1.0 / weight
+            task = GenerationTask(
+                chat_id=chat_id,
+                func=func,
+                args=args,
+                kwargs=kwargs,
+                source=source,
+                tier=TIER_FIRST_RESPONSE if first_response else TIER_NORMAL,
+                start_tag=start_tag,
+                seq=next(self._seq),
+                submitted=now
+            )
+            chat.queue.append(task)
+            self._pending += 1
+            metrics.incr("generation.submitted", source=source)
+            metrics.set_gauge("generation.pending", self._pending)
+            self._ensure_started()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        """排队中的生成数"""
+        return self._pending
+
+    def _ensure_started(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"generation-{len(self._threads) + 1}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _evict_idle(self, now: float):
+        """
+        删除空闲聊天的状态（调用方持有锁）
+
+        只删除没有排队和进行中的生成、且距上次回复已超过新会话间隔的聊天：
+        下一条回复本来就会作为新会话优先处理，重新创建时只丢掉至多一次生成的公平排队份额
+        """
+        self._last_evict = now
+        idle = [chat_id for chat_id, chat in self._chats.items()
+                if not chat.queue and not chat.running and now - chat.last_reply >= NEW_CONVERSATION_SECONDS]
+        for chat_id in idle:
+            del self._chats[chat_id]
+        metrics.set_gauge("generation.chats", len(self._chats))
+
+    def _pick(self) -> Optional[GenerationTask]:
+        """选出下一个任务（调用方持有锁）；聊天数量不多，直接扫描各聊天的队首"""
+        best_chat, best_key = None, None
+        for chat in self._chats.values():
+            if not chat.queue or chat.running >= self.per_chat_limit:
+                continue
+            head = chat.queue[0]
+            key = (head.tier, head.start_tag, head.seq)
+            if best_key is None or key < best_key:
+                best_chat, best_key = chat, key
+        if best_chat is None:
+            return None
+        task = best_chat.queue.popleft()
+        best_chat.running += 1
+        self._pending -= 1
+        self._running += 1
+        self._virtual_time = max(self._virtual_time, task.start_tag)
+        return task
+
+    def _finish(self, task: GenerationTask):
+        with self._cond:
+            chat = self._chats[task.chat_id]
+            chat.running -= 1
+            chat.last_reply = time.time()
+            self._running -= 1
+            metrics.set_gauge("generation.running", self._running)
+            self._cond.notify_all()
+
+    def _retire(self) -> bool:
+        """线程数超过配置时让当前线程退出（调用方持有锁）"""
+        if len(self._threads) <= self.workers:
+            return False
+        self._threads.remove(threading.current_thread())
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._retire():
+                    return
+                task = self._pick()
+                while task is None:
+                    self._cond.wait()
+                    if self._retire():
+                        return
+                    task = self._pick()
+                metrics.set_gauge("generation.pending", self._pending)
+                metrics.set_gauge("generation.running", self._running)
+            tier = "first_response" if task.tier == TIER_FIRST_RESPONSE else "normal"
+            metrics.observe("generation.queue_wait_ms", (time.time() - task.submitted) * 1000,
+                            source=task.source, tier=tier)
+            try:
+                task.func(*task.args, **task.kwargs)
+            except Exception as e:
+                metrics.incr("generation.errors", source=task.source)
+                logger.error(f"生成回复失败 {task.chat_id}: {str(e)}", exc_info=True)
+            finally:
+                self._finish(task)
+
+
+_scheduler: Optional[GenerationScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_generation_scheduler() -> GenerationScheduler:
+    """获取全局回复生成调度器"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GenerationScheduler()
+        return _scheduler
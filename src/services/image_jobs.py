@@ -0,0 +1,217 @@
+"""
+图片生成任务队列模块
+负责在后台执行画图请求，聊天不必等待图片生成，包括:
+- 收到请求后立即入队，返回任务编号
+- 限制同时生成的数量和排队的任务数
+- 生成完成后交给发送回调
+- 查询任务状态、取消排队中或生成中的任务
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, Optional
+
+from src.utils.executor import get_executor, POOL_IMAGE_GENERATION, POLICY_BLOCK
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+JOB_STATUS_TEXT = {
+    JOB_QUEUED: "排队中",
+    JOB_RUNNING: "生成中",
+    JOB_DONE: "已完成",
+    JOB_FAILED: "失败",
+    JOB_CANCELLED: "已取消",
+}
+
+# 同时生成的图片数
+MAX_CONCURRENT = 1
+# 排队和生成中的任务总数上限，超过时拒绝新请求
+MAX_PENDING = 8
+# 保留的已结束任务数（供状态查询）
+HISTORY_SIZE = 20
+
+
+@dataclass
+class ImageJob:
+    """一次画图请求"""
+    id: int
+    chat_id: str
+    sender_name: str
+    username: str
+    is_group: bool
+    prompt: str
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    image_path: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class ImageJobQueue:
+    """图片生成任务队列"""
+
+    def __init__(self, generate: Callable[[str, threading.Event], Optional[str]],
+                 deliver: Callable[[ImageJob], None], max_concurrent: int = MAX_CONCURRENT,
+                 max_pending: int = MAX_PENDING):
+        """
+        Args:
+            generate: 生成图片 (描述, 取消事件) -> 图片路径，失败或取消时返回 None
+            deliver: 任务结束（成功或失败）后的发送回调，取消的任务不回调
+            max_concurrent: 同时生成的图片数
+            max_pending: 排队和生成中的任务总数上限
+        """
+        self.generate = generate
+        self.deliver = deliver
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_pending = max(1, max_pending)
+        self.executor = get_executor()
+        # 排队的任务保存在本队列中（取消时直接移除），线程池中只有至多 max_concurrent 个取任务循环，提交不会阻塞
+        self.executor.configure_pool(POOL_IMAGE_GENERATION, self.max_concurrent, self.max_concurrent, POLICY_BLOCK)
+        self._jobs: "OrderedDict[int, ImageJob]" = OrderedDict()
+        self._queued: Deque[ImageJob] = deque()
+        self._drains = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _active_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _update_gauges(self):
+        metrics.set_gauge("image_jobs.pending", self._active_count())
+
+    def submit(self, chat_id: str, sender_name: str, username: str, is_group: bool,
+               prompt: str) -> Optional[ImageJob]:
+        """
+        提交画图请求
+
+        Returns:
+            Optional[ImageJob]: 新任务，队列已满时返回 None
+        """
+        with self._lock:
+            if self._active_count() >= self.max_pending:
+                metrics.incr("image_jobs.rejected")
+                logger.warning(f"图片生成队列已满，拒绝请求 - 聊天: {chat_id}")
+                return None
+            job = ImageJob(id=next(self._ids), chat_id=chat_id, sender_name=sender_name,
+                           username=username, is_group=is_group, prompt=prompt)
+            self._jobs[job.id] = job
+            self._queued.append(job)
+            self._prune()
+            self._update_gauges()
+            start_drain = self._drains < self.max_concurrent
+            if start_drain:
+                self._drains += 1
+        metrics.incr("image_jobs.submitted")
+        if start_drain:
+            # 线程池队列长度等于取任务循环数上限，这里不会阻塞提交方
+            self.executor.submit(POOL_IMAGE_GENERATION, self._drain)
+        logger.info(f"图片生成任务 #{job.id} 已入队 - 聊天: {chat_id}")
+        return job
+
+    def _prune(self):
+        """只保留最近的已结束任务（调用方持有锁）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - HISTORY_SIZE)]:
+            del self._jobs[job_id]
+
+    def cancel(self, job_id: int, chat_id: Optional[str] = None) -> bool:
+        """
+        取消任务：排队中的任务不再执行，生成中的任务在下一个检查点停止
+
+        Args:
+            job_id: 任务编号
+            chat_id: 只允许取消该聊天的任务，为空时不限制
+
+        Returns:
+            bool: 是否已取消
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished or (chat_id is not None and job.chat_id != chat_id):
+                return False
+            job.cancel_event.set()
+            if job.status == JOB_QUEUED:
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                self._queued.remove(job)
+            self._update_gauges()
+        metrics.incr("image_jobs.cancelled")
+        logger.info(f"图片生成任务 #{job_id} 已取消")
+        return True
+
+    def list_jobs(self, chat_id: Optional[str] = None) -> List[ImageJob]:
+        """按提交顺序返回任务（含最近结束的任务）"""
+        with self._lock:
+            return [job for job in self._jobs.values() if chat_id is None or job.chat_id == chat_id]
+
+    def _drain(self):
+        """在线程池中依次执行排队的任务，队列为空时退出"""
+        while True:
+            with self._lock:
+                if not self._queued:
+                    self._drains -= 1
+                    return
+                job = self._queued.popleft()
+            self._run(job)
+
+    def _run(self, job: ImageJob):
+        with self._lock:
+            if job.cancel_event.is_set():
+                return
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+        metrics.observe("image_jobs.queue_wait_ms", (job.started_at - job.created_at) * 1000)
+
+        image_path = None
+        try:
+            image_path = self.generate(job.prompt, job.cancel_event)
+        except Exception as e:
+            logger.error(f"图片生成任务 #{job.id} 失败: {str(e)}")
+
+        with self._lock:
+            job.finished_at = time.time()
+            if job.cancel_event.is_set():
+                job.status = JOB_CANCELLED
+            else:
+                job.status = JOB_DONE if image_path else JOB_FAILED
+                job.image_path = image_path
+            self._update_gauges()
+        metrics.incr("image_jobs.finished", status=job.status)
+        metrics.observe("image_jobs.run_ms", (job.finished_at - job.started_at) * 1000)
+
+        if job.status == JOB_CANCELLED:
+            # 取消前已经生成好的图片不再发送
+            self._discard(image_path)
+            return
+        try:
+            self.deliver(job)
+        except Exception as e:
+            logger.error(f"发送生成图片失败 #{job.id}: {str(e)}")
+
+    @staticmethod
+    def _discard(image_path: Optional[str]):
+        if not image_path:
+            return
+        try:
+            if os.path.exists(image_path):
+                os.remove(image_path)
+        except Exception as e:
+            logger.error(f"删除已取消任务的图片失败: {str(e)}")
@@ -0,0 +1,211 @@
+"""
+随机图片预取模块
+负责提前准备随机图片，收到请求时直接取用，包括:
+- 可替换的图片来源：网络地址或本地目录（离线时使用）
+- 后台补充到目标数量，按内容哈希命名，重复图片只保留一份
+- 限制预取目录的总大小
+- 启动时沿用目录中已下载的图片
+"""
+
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional
+
+import requests
+
+from src.utils.executor import get_executor, POOL_IO
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 单张图片大小上限（字节）
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+# 连续获取失败后暂停补充的秒数
+FAILURE_BACKOFF_SECONDS = 60
+# 单轮补充最多尝试的次数（来源返回重复图片时避免空转）
+MAX_ATTEMPTS_PER_FILL = 3
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+
+class UrlImageSource:
+    """每次请求返回一张随机图片的网络地址"""
+
+    def __init__(self, url: str, timeout: float = 15):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self) -> Optional[bytes]:
+        response = requests.get(self.url, timeout=self.timeout, stream=True)
+        try:
+            if response.status_code != 200:
+                logger.error(f"获取随机图片失败 - 状态码: {response.status_code}")
+                return None
+            chunks, size = [], 0
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    logger.warning(f"随机图片超过大小上限，已丢弃: {self.url}")
+                    return None
+                chunks.append(chunk)
+            return b''.join(chunks)
+        finally:
+            response.close()
+
+
+class DirectoryImageSource:
+    """从本地目录中随机挑选图片"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self) -> Optional[bytes]:
+        files = [f for f in os.listdir(self.directory) if f.lower().endswith(IMAGE_EXTENSIONS)]
+        if not files:
+            logger.error(f"本地图片目录为空: {self.directory}")
+            return None
+        with open(os.path.join(self.directory, random.choice(files)), 'rb') as f:
+            content = f.read(MAX_IMAGE_BYTES + 1)
+        if len(content) > MAX_IMAGE_BYTES:
+            logger.warning(f"本地图片超过大小上限，已跳过: {self.directory}")
+            return None
+        return content or None
+
+
+def make_image_source(source: str, root_dir: str = ""):
+    """
+    根据配置创建图片来源
+
+    Args:
+        source: http(s) 地址，或本地目录（相对路径基于 root_dir）
+    """
+    if source.startswith(('http://', 'https://')):
+        return UrlImageSource(source)
+    directory = source if os.path.isabs(source) else os.path.join(root_dir, source)
+    return DirectoryImageSource(directory)
+
+
+class RandomImagePool:
+    """预取的随机图片池"""
+
+    def __init__(self, source, pool_dir: str, target: int = 5, max_bytes: int = 50 * 1024 * 1024):
+        """
+        Args:
+            source: 图片来源，需实现 fetch() -> Optional[bytes]
+            pool_dir: 预取图片的存放目录
+            target: 保持就绪的图片数
+            max_bytes: 预取目录的总大小上限
+        """
+        self.source = source
+        self.pool_dir = pool_dir
+        self.target = max(1, target)
+        self.max_bytes = max_bytes
+        self.executor = get_executor()
+        self._ready: Deque[str] = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._filling = False
+        self._backoff_until = 0.0
+        os.makedirs(pool_dir, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        """沿用上次运行留下的图片"""
+        for name in sorted(os.listdir(self.pool_dir)):
+            path = os.path.join(self.pool_dir, name)
+            if not (os.path.isfile(path) and name.lower().endswith(IMAGE_EXTENSIONS)):
+                continue
+            size = os.path.getsize(path)
+            if len(self._ready) >= self.target or self._bytes + size > self.max_bytes:
+                os.remove(path)
+                continue
+            self._ready.append(path)
+            self._bytes += size
+        metrics.set_gauge("image_pool.ready", len(self._ready))
+
+    def take(self) -> Optional[str]:
+        """
+        取出一张就绪的图片（取出后文件归调用方，发送后可直接删除）
+
+        Returns:
+            Optional[str]: 图片路径；池为空时同步获取一张
+        """
+        with self._lock:
+            path = self._ready.popleft() if self._ready else None
+            if path:
+                self._bytes -= os.path.getsize(path) if os.path.exists(path) else 0
+            metrics.set_gauge("image_pool.ready", len(self._ready))
+        self.refill()
+        if path and os.path.exists(path):
+            metrics.incr("image_pool.served", result="ready")
+            return path
+        # 池为空：退回同步获取
+        metrics.incr("image_pool.served", result="miss")
+        return self._fetch_one(add_to_pool=False)
+
+    def refill(self):
+        """在后台补充到目标数量"""
+        with self._lock:
+            if self._filling or len(self._ready) >= self.target or time.time() < self._backoff_until:
+                return
+            self._filling = True
+        self.executor.submit(POOL_IO, self._fill)
+
+    def _fill(self):
+        try:
+            attempts = 0
+            while attempts < MAX_ATTEMPTS_PER_FILL * self.target:
+                with self._lock:
+                    if len(self._ready) >= self.target:
+                        return
+                attempts += 1
+                if self._fetch_one(add_to_pool=True) is None:
+                    with self._lock:
+                        self._backoff_until = time.time() + FAILURE_BACKOFF_SECONDS
+                    return
+        finally:
+            with self._lock:
+                self._filling = False
+
+    def _fetch_one(self, add_to_pool: bool) -> Optional[str]:
+        """从来源获取一张图片并按内容哈希保存"""
+        started = time.time()
+        try:
+            content = self.source.fetch()
+        except Exception as e:
+            logger.error(f"获取随机图片失败: {str(e)}")
+            content = None
+        metrics.observe("image_pool.fetch_ms", (time.time() - started) * 1000)
+        if not content:
+            metrics.incr("image_pool.fetch_errors")
+            return None
+
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        path = os.path.join(self.pool_dir, f"{digest}.jpg")
+        with self._lock:
+            if path in self._ready:
+                # 来源返回了已在池中的图片
+                metrics.incr("image_pool.duplicates")
+                if not add_to_pool:
+                    # 同步获取的图片归调用方，从池中移出
+                    self._ready.remove(path)
+                    self._bytes -= len(content)
+                return path
+            if add_to_pool and self._bytes + len(content) > self.max_bytes:
+                logger.warning("随机图片池已达大小上限，暂停预取")
+                self._backoff_until = time.time() + FAILURE_BACKOFF_SECONDS
+                return None
+            tmp_path = f"{path}.part"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            if add_to_pool:
+                self._ready.append(path)
+                self._bytes += len(content)
+            metrics.set_gauge("image_pool.ready", len(self._ready))
+            metrics.set_gauge("image_pool.bytes", self._bytes)
+        return path
@@ -0,0 +1,96 @@
+"""
+回复发送模块
+负责在生成线程之外按节奏发送回复，包括:
+- 每个聊天一个先进先出的发送队列，同一聊天的回复按生成顺序发送
+- 不同聊天的发送互不等待，分段发送时的停顿不占用回复生成线程
+- 队列发送完后清理聊天状态，不随聊天数增长
+- 所有微信发送调用经同一把锁串行执行，不同聊天不会同时操作微信窗口
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from src.utils.executor import get_executor, POOL_SEND
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# wxauto 通过界面自动化切换聊天窗口发送消息，任意两次发送都不能交错
+_wx_send_lock = threading.Lock()
+
+
+class SerializedWeChat:
+    """WeChat 的包装，SendMsg/SendFiles 在全局发送锁内执行，其余属性直接转发"""
+
+    def __init__(self, wx):
+        self._wx = wx
+
+    def SendMsg(self, *args, **kwargs):
+        with _wx_send_lock:
+            return self._wx.SendMsg(*args, **kwargs)
+
+    def SendFiles(self, *args, **kwargs):
+        with _wx_send_lock:
+            return self._wx.SendFiles(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._wx, name)
+
+
+class ChatOutbox:
+    """按聊天排队的发送队列，同一聊天同时只有一个发送任务在执行"""
+
+    def __init__(self):
+        self.executor = get_executor()
+        # 聊天ID -> 待发送任务 (函数, 参数, 入队时间)，聊天正在发送时才有条目
+        self._queues: Dict[str, Deque[Tuple[Callable, tuple, float]]] = {}
+        self._lock = threading.Lock()
+
+    def send(self, chat_id: str, func: Callable, *args):
+        """把发送任务加入聊天的发送队列，聊天没有正在进行的发送时立即开始"""
+        with self._lock:
+            queue = self._queues.get(chat_id)
+            if queue is not None:
+                queue.append((func, args, time.time()))
+                return
+            self._queues[chat_id] = deque([(func, args, time.time())])
+            metrics.set_gauge("outbox.chats", len(self._queues))
+        self.executor.submit(POOL_SEND, self._drain, chat_id)
+
+    def _drain(self, chat_id: str):
+        """依次执行聊天队列中的发送任务，队列清空后移除该聊天"""
+        while True:
+            with self._lock:
+                queue = self._queues[chat_id]
+                if not queue:
+                    del self._queues[chat_id]
+                    metrics.set_gauge("outbox.chats", len(self._queues))
+                    return
+                func, args, queued_at = queue.popleft()
+            metrics.observe("outbox.wait_ms", (time.time() - queued_at) * 1000)
+            try:
+                func(*args)
+            except Exception as e:
+                metrics.incr("outbox.errors")
+                logger.error(f"发送回复失败 {chat_id}: {str(e)}")
+
+    def pending(self) -> int:
+        """等待发送的任务数"""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+
+_outbox: Optional[ChatOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> ChatOutbox:
+    """获取全局发送队列"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = ChatOutbox()
+        return _outbox
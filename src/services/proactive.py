@@ -0,0 +1,208 @@
+"""
+主动消息服务
+负责在聊天长时间无回复时主动发起对话，包括:
+- 每个聊天独立记录最后活跃时间和未回复次数
+- 按下一次到期时间组成最小堆，统一调度器中只保留一个定时任务
+- 预先解析安静时间段，安静时间内到期的聊天顺延到安静时间结束
+- 限制每轮最多发送的主动消息数
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.services.scheduler import get_scheduler, DateTrigger
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 统一调度器中的任务ID和分组
+JOB_ID = "auto_message"
+JOB_GROUP = "auto_message"
+# 超出每轮上限的聊天顺延的秒数
+DEFER_SECONDS = 60
+# 安静时间结束后随机错开的最大秒数，避免同时生成
+QUIET_JITTER_SECONDS = 600
+
+
+class QuietWindow:
+    """安静时间段（启动时解析一次，支持跨天）"""
+
+    def __init__(self, start: str, end: str):
+        self.enabled = False
+        try:
+            start_time = datetime.strptime(start, "%H:%M").time()
+            end_time = datetime.strptime(end, "%H:%M").time()
+            self.start_minute = start_time.hour * 60 + start_time.minute
+            self.end_minute = end_time.hour * 60 + end_time.minute
+            self.enabled = True
+        except (TypeError, ValueError) as e:
+            logger.error(f"安静时间配置无效，已忽略: {start}-{end} ({str(e)})")
+
+    def contains(self, dt: datetime) -> bool:
+        """判断时间是否在安静时间段内（含两端）"""
+        if not self.enabled:
+            return False
+        minute = dt.hour * 60 + dt.minute
+        if self.start_minute <= self.end_minute:
+            return self.start_minute <= minute <= self.end_minute
+        return minute >= self.start_minute or minute <= self.end_minute
+
+    def next_allowed(self, dt: datetime) -> datetime:
+        """返回不早于 dt 的第一个非安静时间"""
+        if not self.contains(dt):
+            return dt
+        end = dt.replace(hour=self.end_minute // 60, minute=self.end_minute % 60,
+                         second=0, microsecond=0) + timedelta(minutes=1)
+        if end <= dt:
+            end += timedelta(days=1)
+        return end
+
+
+@dataclass
+class ChatActivity:
+    """单个聊天的活跃状态"""
+    chat_id: str
+    last_active: Optional[datetime] = None
+    unanswered: int = 0
+    due_at: Optional[datetime] = None
+    version: int = 0
+
+
+class ProactiveMessenger:
+    """按聊天跟踪无回复时长并发送主动消息"""
+
+    def __init__(self, send: Callable[[str, int], None], min_hours: float, max_hours: float,
+                 quiet_window: QuietWindow, max_per_tick: int = 3, scheduler=None):
+        """
+        初始化主动消息服务
+
+        Args:
+            send: 发送回调 (chat_id, 未回复次数)
+            min_hours: 最短无回复时长（小时）
+            max_hours: 最长无回复时长（小时）
+            quiet_window: 安静时间段
+            max_per_tick: 每轮最多发送的主动消息数
+            scheduler: 调度器，默认使用全局统一调度器
+        """
+        self.send = send
+        self.min_seconds = int(min_hours * 3600)
+        self.max_seconds = int(max_hours * 3600)
+        self.quiet_window = quiet_window
+        self.max_per_tick = max(1, int(max_per_tick))
+        self.scheduler = scheduler or get_scheduler()
+        self.chats: Dict[str, ChatActivity] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._seq = itertools.count()
+        self._armed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _random_countdown(self) -> float:
+        return random.uniform(self.min_seconds, self.max_seconds)
+
+    def _push(self, chat: ChatActivity, due_at: datetime):
+        chat.version += 1
+        chat.due_at = due_at
+        heapq.heappush(self._heap, (due_at.timestamp(), next(self._seq), chat.chat_id, chat.version))
+
+    def _arm(self):
+        """把调度任务对准堆顶聊天的到期时间（调用方持有锁）"""
+        # 丢弃堆顶的过期条目，避免空跑
+        while self._heap:
+            _, _, chat_id, version = self._heap[0]
+            chat = self.chats.get(chat_id)
+            if chat is not None and chat.version == version:
+                break
+            heapq.heappop(self._heap)
+        # 过期条目过多时重建堆
+        if len(self._heap) > 4 * len(self.chats) + 64:
+            self._heap = [(c.due_at.timestamp(), next(self._seq), c.chat_id, c.version)
+                          for c in self.chats.values() if c.due_at is not None]
+            heapq.heapify(self._heap)
+
+        if not self._heap:
+            if self._armed_at is not None:
+                self.scheduler.remove_job(JOB_ID)
+                self._armed_at = None
+            return
+        due_ts = self._heap[0][0]
+        if self._armed_at == due_ts:
+            return
+        self._armed_at = due_ts
+        self.scheduler.add_job(self._tick, DateTrigger(datetime.fromtimestamp(due_ts)),
+                               job_id=JOB_ID, group=JOB_GROUP)
+
+    def register(self, chat_ids: Iterable[str]):
+        """登记参与主动消息的聊天并开始计时"""
+        now = datetime.now()
+        with self._lock:
+            for chat_id in chat_ids:
+                if chat_id in self.chats:
+                    continue
+                chat = ChatActivity(chat_id=chat_id, last_active=now)
+                self.chats[chat_id] = chat
+                self._push(chat, now + timedelta(seconds=self._random_countdown()))
+            metrics.set_gauge("proactive.chats", len(self.chats))
+            self._arm()
+        logger.info(f"主动消息已启动，共 {len(self.chats)} 个聊天")
+
+    def touch(self, chat_id: str):
+        """聊天收到用户消息：重置未回复次数并重新计时"""
+        now = datetime.now()
+        with self._lock:
+            chat = self.chats.get(chat_id)
+            if chat is None:
+                return
+            chat.last_active = now
+            chat.unanswered = 0
+            self._push(chat, now + timedelta(seconds=self._random_countdown()))
+            self._arm()
+
+    def stop(self):
+        """停止主动消息"""
+        with self._lock:
+            self.chats.clear()
+            self._heap = []
+            self._armed_at = None
+            self.scheduler.remove_job(JOB_ID)
+
+    def get_chat(self, chat_id: str) -> Optional[ChatActivity]:
+        return self.chats.get(chat_id)
+
+    def _tick(self):
+        """处理到期的聊天：安静时间内顺延，超出每轮上限的稍后发送"""
+        now = datetime.now()
+        to_send: List[Tuple[str, int]] = []
+        with self._lock:
+            self._armed_at = None
+            now_ts = now.timestamp()
+            while self._heap and self._heap[0][0] <= now_ts:
+                _, _, chat_id, version = heapq.heappop(self._heap)
+                chat = self.chats.get(chat_id)
+                if chat is None or chat.version != version:
+                    continue
+                if self.quiet_window.contains(now):
+                    resume = self.quiet_window.next_allowed(now)
+                    self._push(chat, resume + timedelta(seconds=random.uniform(0, QUIET_JITTER_SECONDS)))
+                    metrics.incr("proactive.deferred", reason="quiet_time")
+                    continue
+                if len(to_send) >= self.max_per_tick:
+                    self._push(chat, now + timedelta(seconds=DEFER_SECONDS))
+                    metrics.incr("proactive.deferred", reason="tick_cap")
+                    continue
+                chat.unanswered += 1
+                to_send.append((chat_id, chat.unanswered))
+                self._push(chat, now + timedelta(seconds=self._random_countdown()))
+            self._arm()
+
+        for chat_id, unanswered in to_send:
+            try:
+                self.send(chat_id, unanswered)
+                metrics.incr("proactive.sent")
+            except Exception as e:
+                logger.error(f"自动发送消息失败 {chat_id}: {str(e)}")
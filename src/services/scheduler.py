@@ -0,0 +1,281 @@
+"""
+统一调度服务
+负责管理进程内的全部定时任务，包括:
+- 单个截止时间堆，调度线程休眠到最近一个任务到期
+- 固定大小的工作线程池执行任务，同一任务尚未开始的执行按任务ID合并
+- 一次性、固定间隔、cron 三种触发器
+- 延迟和错过执行的指标统计
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.metrics import metrics
+from src.services.cron import CronExpression
+from src.utils.executor import BoundedPool, POLICY_COALESCE
+
+logger = logging.getLogger('main')
+
+DEFAULT_WORKERS = 4
+# 等待执行的任务数上限
+MAX_PENDING_RUNS = 256
+
+
+class DateTrigger:
+    """在指定时间执行一次"""
+
+    def __init__(self, run_date: datetime):
+        self.run_date = run_date
+
+    def next_fire_time(self, previous: Optional[datetime], now: datetime) -> Optional[datetime]:
+        return self.run_date if previous is None else None
+
+    def __repr__(self):
+        return f"date[{self.run_date.strftime('%Y-%m-%d %H:%M:%S')}]"
+
+
+class IntervalTrigger:
+    """按固定间隔重复执行"""
+
+    def __init__(self, seconds: float, start_date: Optional[datetime] = None):
+        if seconds <= 0:
+            raise ValueError(f"无效的时间间隔: {seconds}")
+        self.interval = timedelta(seconds=seconds)
+        self.start_date = start_date
+
+    def next_fire_time(self, previous: Optional[datetime], now: datetime) -> Optional[datetime]:
+        if previous is None:
+            return self.start_date or now + self.interval
+        next_time = previous + self.interval
+        if next_time <= now:
+            # 错过的周期不补跑，直接对齐到下一个周期
+            missed = (now - previous) // self.interval
+            next_time = previous + self.interval * (missed + 1)
+        return next_time
+
+    def __repr__(self):
+        return f"interval[{self.interval.total_seconds():g}s]"
+
+
+class CronTrigger:
+    """按 crontab 表达式（分 时 日 月 周）重复执行"""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.cron = CronExpression(expression)
+
+    @classmethod
+    def from_crontab(cls, expression: str) -> "CronTrigger":
+        return cls(expression)
+
+    def next_fire_time(self, previous: Optional[datetime], now: datetime) -> Optional[datetime]:
+        # 从当前时间往后计算，停机期间错过的执行不补跑
+        return self.cron.next_after(max(previous, now) if previous else now)
+
+    def __repr__(self):
+        return f"cron[{self.expression}]"
+
+
+@dataclass
+class Job:
+    """调度任务"""
+    id: str
+    func: Callable
+    trigger: Any
+    args: Tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    group: str = "default"
+    misfire_grace_time: Optional[float] = None  # 允许的最大延迟（秒），为空时总是执行
+    next_run_time: Optional[datetime] = None
+    version: int = 0
+
+
+class Scheduler:
+    """统一调度器：截止时间最小堆 + 工作线程池"""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        # 任务执行慢于触发间隔时，上一次还没开始的执行被新的一次替换，不会越积越多
+        self._executor = BoundedPool("scheduler", max_workers, MAX_PENDING_RUNS, POLICY_COALESCE)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self):
+        """启动调度线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+        logger.info("统一调度器已启动")
+
+    def shutdown(self, wait: bool = False):
+        """停止调度线程和工作线程池"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and wait:
+            self._thread.join()
+        self._executor.shutdown()
+        logger.info("统一调度器已关闭")
+
+    def add_job(self, func: Callable, trigger, args: Tuple = (), kwargs: Optional[Dict[str, Any]] = None,
+                job_id: Optional[str] = None, group: str = "default",
+                misfire_grace_time: Optional[float] = None) -> str:
+        """
+        添加任务，已存在同ID任务时替换
+
+        Args:
+            func: 任务函数
+            trigger: 触发器（DateTrigger / IntervalTrigger / CronTrigger）
+            args: 位置参数
+            kwargs: 关键字参数
+            job_id: 任务ID，为空时自动生成
+            group: 任务分组，用作指标标签
+            misfire_grace_time: 允许的最大延迟（秒），超过则跳过本次执行
+
+        Returns:
+            str: 任务ID
+        """
+        now = datetime.now()
+        next_run_time = trigger.next_fire_time(None, now)
+        with self._cond:
+            if job_id is None:
+                job_id = f"{group}_{next(self._seq)}"
+            job = Job(
+                id=job_id,
+                func=func,
+                trigger=trigger,
+                args=tuple(args),
+                kwargs=kwargs or {},
+                group=group,
+                misfire_grace_time=misfire_grace_time,
+                # 版本号取自全局计数器，同名任务被移除后重新添加时旧的堆条目也不会匹配
+                version=next(self._seq)
+            )
+            if next_run_time is None:
+                self._jobs.pop(job_id, None)
+                logger.warning(f"任务 {job_id} 没有下一次执行时间，已忽略")
+                return job_id
+            self._jobs[job_id] = job
+            self._push(job, next_run_time)
+            metrics.set_gauge("scheduler.jobs", len(self._jobs))
+        self.start()
+        return job_id
+
+    def call_later(self, delay: float, func: Callable, *args, job_id: Optional[str] = None,
+                   group: str = "default") -> str:
+        """延迟 delay 秒后执行一次"""
+        return self.add_job(func, DateTrigger(datetime.now() + timedelta(seconds=delay)),
+                            args=args, job_id=job_id, group=group)
+
+    def remove_job(self, job_id: str) -> bool:
+        """移除任务（堆中的旧条目在出堆时丢弃）"""
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            metrics.set_gauge("scheduler.jobs", len(self._jobs))
+            return job is not None
+
+    def remove_group(self, group: str) -> int:
+        """移除分组内的全部任务"""
+        with self._cond:
+            job_ids = [job_id for job_id, job in self._jobs.items() if job.group == group]
+            for job_id in job_ids:
+                del self._jobs[job_id]
+            metrics.set_gauge("scheduler.jobs", len(self._jobs))
+            return len(job_ids)
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def get_jobs(self, group: Optional[str] = None) -> List[Job]:
+        with self._cond:
+            return [job for job in self._jobs.values() if group is None or job.group == group]
+
+    def _push(self, job: Job, run_time: datetime):
+        """把任务的下一次执行时间放入堆，必要时唤醒调度线程"""
+        job.next_run_time = run_time
+        entry = (run_time.timestamp(), next(self._seq), job.id, job.version)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._cond.notify()
+
+    def _run(self):
+        """调度线程：休眠到堆顶任务到期，取出全部到期任务提交给线程池"""
+        while True:
+            due: List[Tuple[Job, datetime]] = []
+            with self._cond:
+                while self._running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    timeout = self._heap[0][0] - datetime.now().timestamp()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+
+                now = datetime.now()
+                now_ts = now.timestamp()
+                while self._heap and self._heap[0][0] <= now_ts:
+                    _, _, job_id, version = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job is None or job.version != version:
+                        continue
+                    scheduled = job.next_run_time
+                    next_run_time = job.trigger.next_fire_time(scheduled, now)
+                    if next_run_time is None:
+                        del self._jobs[job_id]
+                    else:
+                        job.version = next(self._seq)
+                        self._push(job, next_run_time)
+                    due.append((job, scheduled))
+                metrics.set_gauge("scheduler.jobs", len(self._jobs))
+
+            for job, scheduled in due:
+                lateness = (now - scheduled).total_seconds()
+                metrics.observe("scheduler.lateness_ms", max(lateness, 0) * 1000, group=job.group)
+                if job.misfire_grace_time is not None and lateness > job.misfire_grace_time:
+                    metrics.incr("scheduler.misfires", group=job.group)
+                    logger.warning(f"任务 {job.id} 延迟 {lateness:.1f} 秒，超过允许范围，跳过本次执行")
+                    continue
+                if not self._executor.submit(self._execute, job, key=job.id):
+                    # 线程池已关闭
+                    return
+
+    def _execute(self, job: Job):
+        """在工作线程中执行任务"""
+        started = datetime.now()
+        try:
+            job.func(*job.args, **job.kwargs)
+            metrics.incr("scheduler.runs", group=job.group)
+        except Exception as e:
+            metrics.incr("scheduler.errors", group=job.group)
+            logger.error(f"执行调度任务 {job.id} 失败: {str(e)}")
+        finally:
+            metrics.observe("scheduler.run_ms", (datetime.now() - started).total_seconds() * 1000,
+                            group=job.group)
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """获取全局调度器（首次添加任务时启动）"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
@@ -0,0 +1,187 @@
+"""
+语音合成辅助模块
+负责 TTS 结果的复用和拼接，包括:
+- 按句切分长回复，便于并发合成和逐句复用
+- WAV 片段按采样帧直接拼接，不重新编码
+- 按 (语音, 文本) 哈希缓存合成结果到磁盘，超过大小上限时按最近使用时间淘汰
+- 返回给调用方的缓存文件在释放前不会被淘汰
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import wave
+from collections import Counter, OrderedDict
+from typing import List, Optional
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 句末标点（保留在句子末尾）
+SENTENCE_END_PATTERN = re.compile(r'[^。！？!?～~…\n]+[。！？!?～~…]*')
+# 短于该长度的句子与后一句合并，避免过碎的片段影响语气
+MIN_SENTENCE_CHARS = 6
+# 缓存目录大小上限（字节）
+MAX_CACHE_BYTES = 100 * 1024 * 1024
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS) -> List[str]:
+    """
+    按句末标点和换行切分文本，过短的句子并入下一句
+
+    Returns:
+        List[str]: 非空句子列表
+    """
+    sentences: List[str] = []
+    carry = ""
+    for match in SENTENCE_END_PATTERN.finditer(text):
+        piece = carry + match.group(0).strip()
+        if not piece:
+            continue
+        if len(piece) < min_chars:
+            carry = piece
+            continue
+        sentences.append(piece)
+        carry = ""
+    if carry:
+        if sentences:
+            sentences[-1] += carry
+        else:
+            sentences.append(carry)
+    return sentences
+
+
+def concat_wav(paths: List[str], output_path: str) -> bool:
+    """
+    按采样帧拼接 WAV 文件
+
+    Returns:
+        bool: 是否成功；片段不是 WAV 或格式（声道、位宽、采样率）不一致时返回 False
+    """
+    try:
+        params = None
+        with wave.open(output_path, 'wb') as out:
+            for path in paths:
+                with wave.open(path, 'rb') as clip:
+                    clip_params = (clip.getnchannels(), clip.getsampwidth(), clip.getframerate())
+                    if params is None:
+                        params = clip_params
+                        out.setnchannels(clip_params[0])
+                        out.setsampwidth(clip_params[1])
+                        out.setframerate(clip_params[2])
+                    elif clip_params != params:
+                        raise wave.Error(f"WAV 格式不一致: {clip_params} != {params}")
+                    out.writeframes(clip.readframes(clip.getnframes()))
+        return True
+    except (wave.Error, EOFError) as e:
+        logger.warning(f"拼接语音片段失败: {str(e)}")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
+
+
+def is_wav(path: str) -> bool:
+    try:
+        with wave.open(path, 'rb'):
+            return True
+    except (wave.Error, EOFError):
+        return False
+
+
+class TTSCache:
+    """TTS 结果的磁盘缓存，文件名为 (语音, 文本) 的哈希"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 文件名 -> 大小，按最近使用排序
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        # 文件名 -> 使用中的次数，使用中的文件不淘汰
+        self._pins: "Counter[str]" = Counter()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """按修改时间（命中时会更新）恢复使用顺序"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.wav') and os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._bytes += size
+        self._evict()
+
+    @staticmethod
+    def key(voice: str, text: str) -> str:
+        return hashlib.sha256(f"{voice}\n{text}".encode('utf-8')).hexdigest()[:40]
+
+    def get(self, key: str) -> Optional[str]:
+        """返回缓存文件路径（使用完后调用 release），未命中返回 None"""
+        name = f"{key}.wav"
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            if name not in self._entries or not os.path.exists(path):
+                size = self._entries.pop(name, None)
+                if size:
+                    self._bytes -= size
+                metrics.incr("tts.cache", result="miss")
+                return None
+            self._entries.move_to_end(name)
+            self._pins[name] += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        metrics.incr("tts.cache", result="hit")
+        return path
+
+    def put(self, key: str, source_path: str) -> Optional[str]:
+        """把合成结果移入缓存目录，返回缓存文件路径（使用完后调用 release）；失败时源文件保持不动"""
+        name = f"{key}.wav"
+        path = os.path.join(self.cache_dir, name)
+        try:
+            os.replace(source_path, path)
+        except OSError as e:
+            logger.error(f"写入语音缓存失败: {str(e)}")
+            return None
+        size = os.path.getsize(path)
+        with self._lock:
+            self._bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._pins[name] += 1
+            self._evict()
+        return path
+
+    def release(self, path: str):
+        """释放 get/put 返回的缓存文件，之后可以被淘汰"""
+        name = os.path.basename(path)
+        with self._lock:
+            if self._pins[name] <= 1:
+                del self._pins[name]
+            else:
+                self._pins[name] -= 1
+
+    def _evict(self):
+        """超过大小上限时删除最久未使用、且不在使用中的文件（调用方持有锁）"""
+        for name in list(self._entries):
+            if self._bytes <= self.max_bytes or len(self._entries) <= 1:
+                break
+            if self._pins[name]:
+                continue
+            size = self._entries.pop(name)
+            self._bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            metrics.incr("tts.cache_evictions")
+        metrics.set_gauge("tts.cache_bytes", self._bytes)
+        metrics.set_gauge("tts.cache_entries", len(self._entries))
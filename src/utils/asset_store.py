@@ -0,0 +1,369 @@
+"""
+人设表情包资源库模块
+负责按内容哈希保存表情包，各人设共用同一份文件，包括:
+- 文件按 SHA-256 保存在 data/assets/<sha256>，人设目录中的表情包是指向它的硬链接
+- 人设 emojis/ 下的文件可能与其他人设共用，修改时必须写入临时文件再 os.replace 替换，
+  不能原地写入（原地写入会同时改掉所有人设和资源库中的这份文件）
+- 每个人设一份清单，记录 情感/文件名 -> 哈希
+- 没有被任何人设清单引用、也没有硬链接的文件由 gc() 删除（文件系统不支持硬链接时以清单为准）
+- 表情包压缩包导入：并行校验和计算哈希，重复文件只保存一份
+- 从已有人设克隆表情包（不改动模板人设）、为已有人设去重（去重时校验共用文件，内容与哈希不符的重新收入）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import zipfile
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple, Union
+
+from src.utils.executor import get_executor, POOL_CPU
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+EMOJI_EXTENSIONS = ('.gif', '.jpg', '.png', '.jpeg')
+# 单个表情包大小上限（字节）
+MAX_ASSET_BYTES = 20 * 1024 * 1024
+# 压缩包解压后的总大小上限（字节）
+MAX_ARCHIVE_BYTES = 200 * 1024 * 1024
+# 文件头签名，用于确认确实是图片
+IMAGE_SIGNATURES = (b'GIF87a', b'GIF89a', b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff')
+MANIFEST_NAME = "emojis.manifest.json"
+
+
+@dataclass
+class ImportResult:
+    """表情包导入结果"""
+    added: int = 0
+    duplicates: int = 0  # 资源库中已有的文件（未占用新空间）
+    rejected: List[str] = field(default_factory=list)
+
+
+def _hash_bytes(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_image(head: bytes) -> bool:
+    return head.startswith(IMAGE_SIGNATURES)
+
+
+def _emoji_relpath(name: str) -> Optional[str]:
+    """
+    校验压缩包中的路径，返回 情感/文件名
+
+    只接受 <情感>/<文件> 或 emojis/<情感>/<文件>，拒绝绝对路径和 ..
+    """
+    parts = [p for p in name.replace('\\', '/').split('/') if p]
+    if parts and parts[0].lower() == 'emojis':
+        parts = parts[1:]
+    if len(parts) != 2 or any(p in ('.', '..') for p in parts) or ':' in name:
+        return None
+    emotion, filename = parts
+    if not filename.lower().endswith(EMOJI_EXTENSIONS) or filename.startswith('.'):
+        return None
+    return f"{emotion.lower()}/{filename}"
+
+
+class AssetStore:
+    """按内容寻址的表情包资源库"""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 资源库目录（如 data/assets）
+        """
+        self.root = root
+        # 哈希在共享执行器的 cpu 线程池中并行计算
+        self.executor = get_executor()
+        # 保存和链接在同一把锁内完成，避免 gc() 删除刚保存、尚未链接的文件
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256)
+
+    # ---- 清单 ----
+
+    @staticmethod
+    def _manifest_path(avatar_dir: str) -> str:
+        return os.path.join(avatar_dir, MANIFEST_NAME)
+
+    def load_manifest(self, avatar_dir: str) -> Dict[str, str]:
+        """读取人设清单: 情感/文件名 -> 哈希"""
+        path = self._manifest_path(avatar_dir)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"读取表情包清单失败 {path}: {str(e)}")
+            return {}
+
+    def _save_manifest(self, avatar_dir: str, manifest: Dict[str, str]):
+        path = self._manifest_path(avatar_dir)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(manifest.items())), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    # ---- 存取 ----
+
+    def _store_bytes(self, sha256: str, content: bytes) -> bool:
+        """保存文件内容，返回是否为新文件"""
+        path = self.blob_path(sha256)
+        with self._lock:
+            if os.path.exists(path):
+                return False
+            tmp_path = f"{path}.part"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return True
+
+    def _store_file(self, sha256: str, source: str, link: bool = True) -> bool:
+        """
+        把已有文件收入资源库，返回是否为新文件
+
+        Args:
+            link: 是否以硬链接收入（不复制）；为 False 时复制，源文件与资源库互不影响
+        """
+        path = self.blob_path(sha256)
+        with self._lock:
+            if os.path.exists(path):
+                return False
+            if link:
+                try:
+                    os.link(source, path)
+                    return True
+                except OSError:
+                    pass
+            tmp_path = f"{path}.part"
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, path)
+        return True
+
+    def _link(self, sha256: str, target: str):
+        """在人设目录中创建指向资源文件的硬链接，文件系统不支持时复制"""
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.link"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(self.blob_path(sha256), tmp_path)
+        except OSError:
+            shutil.copyfile(self.blob_path(sha256), tmp_path)
+            metrics.incr("asset_store.copy_fallbacks")
+        os.replace(tmp_path, target)
+
+    @staticmethod
+    def _list_emojis(avatar_dir: str) -> List[Tuple[str, str]]:
+        """列出人设目录中的表情包: (情感/文件名, 路径)"""
+        emoji_dir = os.path.join(avatar_dir, "emojis")
+        files: List[Tuple[str, str]] = []
+        if os.path.isdir(emoji_dir):
+            for emotion in sorted(os.listdir(emoji_dir)):
+                emotion_dir = os.path.join(emoji_dir, emotion)
+                if not os.path.isdir(emotion_dir):
+                    continue
+                for name in sorted(os.listdir(emotion_dir)):
+                    if name.lower().endswith(EMOJI_EXTENSIONS):
+                        files.append((f"{emotion}/{name}", os.path.join(emotion_dir, name)))
+        return files
+
+    def _verify_blob(self, sha256: str) -> bool:
+        """
+        校验资源文件内容与哈希一致；不一致（被原地改写过）时移除该资源文件，返回 False
+
+        链接到它的人设文件保留，下次 adopt 时按实际内容重新收入
+        """
+        path = self.blob_path(sha256)
+        try:
+            if _hash_file(path) == sha256:
+                return True
+        except OSError:
+            return False
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(path)
+        metrics.incr("asset_store.corrupted")
+        logger.warning(f"资源文件 {sha256} 的内容与哈希不符（可能被原地修改），已移出资源库")
+        return False
+
+    def _is_linked(self, sha256: str, path: str) -> bool:
+        try:
+            return os.path.samefile(self.blob_path(sha256), path)
+        except OSError:
+            return False
+
+    # ---- 对外操作 ----
+
+    def import_zip(self, avatar_dir: str, archive: Union[str, BinaryIO]) -> ImportResult:
+        """
+        导入表情包压缩包（结构为 <情感>/<文件>），并行校验和计算哈希
+
+        Args:
+            avatar_dir: 人设目录
+            archive: 压缩包路径或文件对象
+
+        Returns:
+            ImportResult: 新增、重复和被拒绝的文件
+        """
+        result = ImportResult()
+        with zipfile.ZipFile(archive) as zf:
+            entries: List[Tuple[zipfile.ZipInfo, str]] = []
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                relpath = _emoji_relpath(info.filename)
+                if relpath is None or info.file_size > MAX_ASSET_BYTES:
+                    result.rejected.append(info.filename)
+                    continue
+                entries.append((info, relpath))
+            if sum(info.file_size for info, _ in entries) > MAX_ARCHIVE_BYTES:
+                raise ValueError("压缩包解压后超过大小上限")
+
+            # ZipFile 不能在多个线程中同时读取，先顺序解压，再并行校验和计算哈希
+            contents = [zf.read(info) for info, _ in entries]
+
+        def check(content: bytes) -> Optional[str]:
+            return _hash_bytes(content) if _is_image(content[:16]) else None
+
+        hashes = self.executor.map(POOL_CPU, check, contents)
+
+        manifest = self.load_manifest(avatar_dir)
+        emoji_dir = os.path.join(avatar_dir, "emojis")
+        for (info, relpath), content, sha256 in zip(entries, contents, hashes):
+            if sha256 is None:
+                result.rejected.append(info.filename)
+                continue
+            with self._lock:
+                if self._store_bytes(sha256, content):
+                    result.added += 1
+                else:
+                    result.duplicates += 1
+                self._link(sha256, os.path.join(emoji_dir, *relpath.split('/')))
+            manifest[relpath] = sha256
+        self._save_manifest(avatar_dir, manifest)
+
+        metrics.incr("asset_store.imported", result.added)
+        metrics.incr("asset_store.deduplicated", result.duplicates)
+        logger.info(f"表情包导入完成 {avatar_dir}: 新增 {result.added}，重复 {result.duplicates}，"
+                    f"拒绝 {len(result.rejected)}")
+        return result
+
+    def adopt(self, avatar_dir: str) -> Dict[str, str]:
+        """
+        把人设目录中已有的表情包收入资源库并替换为硬链接
+
+        已链接的文件只按资源文件校验一次（共用同一资源文件的只算一次），校验不通过的重新计算哈希
+
+        Returns:
+            Dict[str, str]: 更新后的清单
+        """
+        manifest = self.load_manifest(avatar_dir)
+        files = self._list_emojis(avatar_dir)
+
+        linked = {manifest[relpath] for relpath, path in files
+                  if relpath in manifest and self._is_linked(manifest[relpath], path)}
+        linked_list = sorted(linked)
+        intact = {sha for sha, ok in zip(linked_list, self.executor.map(POOL_CPU, self._verify_blob, linked_list))
+                  if ok}
+        pending = [(relpath, path) for relpath, path in files
+                   if not (relpath in manifest and manifest[relpath] in intact
+                           and self._is_linked(manifest[relpath], path))]
+        hashes = self.executor.map(POOL_CPU, _hash_file, [path for _, path in pending])
+
+        for (relpath, path), sha256 in zip(pending, hashes):
+            with self._lock:
+                if not self._store_file(sha256, path):
+                    # 资源库中已有相同内容，用硬链接替换这份副本
+                    self._link(sha256, path)
+                    metrics.incr("asset_store.deduplicated")
+            manifest[relpath] = sha256
+
+        present = {relpath for relpath, _ in files}
+        manifest = {relpath: sha for relpath, sha in manifest.items() if relpath in present}
+        self._save_manifest(avatar_dir, manifest)
+        return manifest
+
+    def clone(self, source_avatar_dir: str, target_avatar_dir: str) -> int:
+        """
+        以硬链接方式复制另一个人设的表情包，模板人设的文件和清单保持不变
+
+        模板中尚未收入资源库的文件以复制方式收入，模板文件本身不替换为硬链接
+
+        Returns:
+            int: 链接的文件数
+        """
+        source_manifest = self.load_manifest(source_avatar_dir)
+        files = self._list_emojis(source_avatar_dir)
+        pending = [(relpath, path) for relpath, path in files
+                   if not (relpath in source_manifest and self._is_linked(source_manifest[relpath], path))]
+        hashes = dict(zip((relpath for relpath, _ in pending),
+                          self.executor.map(POOL_CPU, _hash_file, [path for _, path in pending])))
+
+        manifest: Dict[str, str] = {}
+        emoji_dir = os.path.join(target_avatar_dir, "emojis")
+        for relpath, path in files:
+            sha256 = hashes.get(relpath) or source_manifest[relpath]
+            with self._lock:
+                if relpath in hashes:
+                    self._store_file(sha256, path, link=False)
+                self._link(sha256, os.path.join(emoji_dir, *relpath.split('/')))
+            manifest[relpath] = sha256
+        self._save_manifest(target_avatar_dir, manifest)
+        return len(manifest)
+
+    def _referenced(self, avatars_root: str) -> Set[str]:
+        """各人设清单中引用的全部哈希"""
+        referenced: Set[str] = set()
+        if os.path.isdir(avatars_root):
+            for name in os.listdir(avatars_root):
+                avatar_dir = os.path.join(avatars_root, name)
+                if os.path.isdir(avatar_dir):
+                    referenced.update(self.load_manifest(avatar_dir).values())
+        return referenced
+
+    def gc(self, avatars_root: str) -> int:
+        """
+        删除没有人设引用的资源文件
+
+        文件系统不支持硬链接时人设目录中是副本，资源文件的硬链接数始终为 1，
+        因此只删除硬链接数为 1、且不在任何人设清单中的文件
+
+        Args:
+            avatars_root: 人设根目录（如 data/avatars）
+
+        Returns:
+            int: 删除的文件数
+        """
+        removed = 0
+        with self._lock:
+            referenced = self._referenced(avatars_root)
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if not os.path.isfile(path):
+                    continue
+                if name.endswith('.part'):
+                    os.remove(path)
+                    continue
+                if name not in referenced and os.stat(path).st_nlink <= 1:
+                    os.remove(path)
+                    removed += 1
+        if removed:
+            metrics.incr("asset_store.collected", removed)
+            logger.info(f"资源库已清理 {removed} 个未引用的文件")
+        return removed
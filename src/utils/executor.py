@@ -0,0 +1,268 @@
+"""
+有界执行器模块
+负责执行后台的即发即忘任务，包括:
+- 按用途划分的命名线程池（io、llm-utility、cpu、tts、vision、image-gen、send）
+- 每个线程池的线程数和队列长度上限
+- 队列满时的处理策略：阻塞、丢弃最旧任务（被丢弃的任务可以通知提交方）、按键合并
+- 需要结果的调用方通过 submit_future / map 获取 Future，不再各自创建线程池
+- 线程数、队列长度、排队耗时等运行指标
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 队列满时的处理策略
+POLICY_BLOCK = "block"              # 阻塞提交方直到有空位
+POLICY_DROP_OLDEST = "drop_oldest"  # 丢弃队列中最旧的任务
+POLICY_COALESCE = "coalesce"        # 相同键的任务只保留最新一个，队列满时阻塞
+
+# 命名线程池
+POOL_IO = "io"
+POOL_LLM_UTILITY = "llm-utility"
+POOL_CPU = "cpu"
+POOL_TTS = "tts"
+POOL_VISION = "vision"
+POOL_IMAGE_GENERATION = "image-gen"
+POOL_SEND = "send"
+
+# 线程池默认配置: 名称 -> (最大线程数, 队列长度上限, 队列满时的策略)
+DEFAULT_POOLS: Dict[str, Tuple[int, int, str]] = {
+    POOL_IO: (4, 256, POLICY_BLOCK),
+    # 辅助模型调用（如画图提示词优化）
+    POOL_LLM_UTILITY: (2, 64, POLICY_BLOCK),
+    # 计算密集的短任务（如表情包哈希），提交方等待结果，队列满时阻塞
+    POOL_CPU: (max(2, os.cpu_count() or 2), 128, POLICY_BLOCK),
+    # 分句语音合成，线程数由语音处理器按配置调整
+    POOL_TTS: (3, 64, POLICY_BLOCK),
+    # 图片识别：提交方是消息监听线程，不能阻塞；被丢弃的识别立即把占位结果置空，消息队列不必等待
+    POOL_VISION: (2, 32, POLICY_DROP_OLDEST),
+    # 图片生成：排队数由图片生成任务队列限制，这里只决定同时生成的数量
+    POOL_IMAGE_GENERATION: (1, 8, POLICY_BLOCK),
+    # 回复发送：每个聊天同时只占一个线程，分段停顿期间其他聊天仍可发送
+    POOL_SEND: (4, 256, POLICY_BLOCK),
+}
+
+# 线程空闲多少秒后退出
+IDLE_TIMEOUT_SECONDS = 60
+
+
+@dataclass
+class _Task:
+    func: Callable
+    args: Tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    submitted: float = 0.0
+    on_drop: Optional[Callable[[], None]] = None
+    key: Optional[Any] = None
+
+
+class BoundedPool:
+    """线程数和队列长度都有上限的线程池，线程按需创建、空闲退出"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, policy: str = POLICY_BLOCK):
+        if policy not in (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_COALESCE):
+            raise ValueError(f"不支持的队列策略: {policy}")
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self._queue: Deque[_Task] = deque()
+        # 合并键 -> 排队中的任务（仅 coalesce 策略）
+        self._keyed: Dict[Any, _Task] = {}
+        self._cond = threading.Condition()
+        self._workers = 0
+        self._idle = 0
+        self._shutdown = False
+
+    def submit(self, func: Callable, *args, key: Optional[Any] = None,
+               on_drop: Optional[Callable[[], None]] = None, **kwargs) -> bool:
+        """
+        提交任务
+
+        Args:
+            func: 任务函数
+            key: 合并键（仅 coalesce 策略使用），队列中已有相同键的任务时用新任务替换
+            on_drop: 任务被丢弃（drop_oldest 策略队列满）或被同键新任务替换时的回调，在提交新任务的线程中调用
+
+        Returns:
+            bool: 是否已加入队列（线程池关闭时返回 False）
+        """
+        task = _Task(func=func, args=args, kwargs=kwargs, submitted=time.time(), on_drop=on_drop)
+        dropped = None
+        with self._cond:
+            if self._shutdown:
+                return False
+            if self.policy != POLICY_COALESCE:
+                key = None
+            while True:
+                existing = self._keyed.get(key) if key is not None else None
+                if existing is not None:
+                    # 保留原排队位置和提交时间，替换为最新的任务，被替换的任务按丢弃通知
+                    dropped = _Task(func=existing.func, on_drop=existing.on_drop)
+                    existing.func, existing.args, existing.kwargs = func, args, kwargs
+                    existing.on_drop = on_drop
+                    metrics.incr("executor.coalesced", pool=self.name)
+                    break
+                if len(self._queue) < self.max_queue:
+                    self._enqueue(task, key)
+                    break
+                if self.policy == POLICY_DROP_OLDEST:
+                    dropped = self._queue.popleft()
+                    self._forget(dropped)
+                    metrics.incr("executor.dropped", pool=self.name)
+                    logger.warning(f"线程池 {self.name} 队列已满，丢弃最旧的任务")
+                    self._enqueue(task, key)
+                    break
+                metrics.incr("executor.blocked", pool=self.name)
+                self._cond.wait()
+                if self._shutdown:
+                    return False
+        if dropped is not None and dropped.on_drop is not None:
+            try:
+                dropped.on_drop()
+            except Exception as e:
+                logger.error(f"线程池 {self.name} 丢弃任务的回调失败: {str(e)}")
+        return True
+
+    def _enqueue(self, task: _Task, key: Optional[Any]):
+        """加入队列并按需唤醒或创建工作线程，调用方需持有锁"""
+        self._queue.append(task)
+        if key is not None:
+            task.key = key
+            self._keyed[key] = task
+        metrics.incr("executor.submitted", pool=self.name)
+        metrics.set_gauge("executor.queue_depth", len(self._queue), pool=self.name)
+
+        if self._idle:
+            self._cond.notify_all()
+        elif self._workers < self.max_workers:
+            self._workers += 1
+            metrics.set_gauge("executor.threads", self._workers, pool=self.name)
+            threading.Thread(target=self._worker, name=f"{self.name}-{self._workers}", daemon=True).start()
+
+    def _forget(self, task: _Task):
+        """任务离开队列后移除合并键，调用方需持有锁"""
+        if task.key is not None and self._keyed.get(task.key) is task:
+            del self._keyed[task.key]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._shutdown:
+                    self._idle += 1
+                    notified = self._cond.wait(IDLE_TIMEOUT_SECONDS)
+                    self._idle -= 1
+                    if not notified and not self._queue:
+                        break
+                if not self._queue:
+                    self._workers -= 1
+                    metrics.set_gauge("executor.threads", self._workers, pool=self.name)
+                    return
+                task = self._queue.popleft()
+                self._forget(task)
+                metrics.set_gauge("executor.queue_depth", len(self._queue), pool=self.name)
+                # 唤醒因队列满而阻塞的提交方
+                self._cond.notify_all()
+
+            started = time.time()
+            metrics.observe("executor.queue_wait_ms", (started - task.submitted) * 1000, pool=self.name)
+            try:
+                task.func(*task.args, **task.kwargs)
+            except Exception as e:
+                metrics.incr("executor.errors", pool=self.name)
+                logger.error(f"线程池 {self.name} 任务执行失败: {str(e)}", exc_info=True)
+            finally:
+                metrics.observe("executor.run_ms", (time.time() - started) * 1000, pool=self.name)
+
+    def submit_future(self, func: Callable, *args, key: Optional[Any] = None, **kwargs) -> Future:
+        """提交任务并返回 Future，任务异常由 Future 传给调用方，被丢弃或被同键任务替换时 Future 取消"""
+        future: Future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        if not self.submit(run, key=key, on_drop=future.cancel):
+            future.set_exception(RuntimeError(f"线程池 {self.name} 已关闭"))
+        return future
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def shutdown(self):
+        """停止接收新任务，已排队的任务继续执行完"""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+
+class Executor:
+    """命名线程池集合"""
+
+    def __init__(self, pools: Optional[Dict[str, Tuple[int, int, str]]] = None):
+        self._pools: Dict[str, BoundedPool] = {}
+        self._lock = threading.Lock()
+        for name, (max_workers, max_queue, policy) in (pools or DEFAULT_POOLS).items():
+            self.configure_pool(name, max_workers, max_queue, policy)
+
+    def configure_pool(self, name: str, max_workers: int, max_queue: int, policy: str = POLICY_BLOCK) -> BoundedPool:
+        """新增或替换命名线程池"""
+        pool = BoundedPool(name, max_workers, max_queue, policy)
+        with self._lock:
+            old = self._pools.get(name)
+            self._pools[name] = pool
+        if old:
+            old.shutdown()
+        return pool
+
+    def pool(self, name: str) -> BoundedPool:
+        with self._lock:
+            if name not in self._pools:
+                raise KeyError(f"线程池不存在: {name}")
+            return self._pools[name]
+
+    def submit(self, pool: str, func: Callable, *args, key: Optional[Any] = None,
+               on_drop: Optional[Callable[[], None]] = None, **kwargs) -> bool:
+        """向命名线程池提交任务"""
+        return self.pool(pool).submit(func, *args, key=key, on_drop=on_drop, **kwargs)
+
+    def submit_future(self, pool: str, func: Callable, *args, key: Optional[Any] = None, **kwargs) -> Future:
+        """向命名线程池提交任务并返回 Future"""
+        return self.pool(pool).submit_future(func, *args, key=key, **kwargs)
+
+    def map(self, pool: str, func: Callable, items: Iterable) -> List[Any]:
+        """
+        在命名线程池中并行执行 func(item)，按输入顺序返回结果
+
+        不要在同一线程池的任务中调用，否则可能因等待自身线程池的空位而死锁
+        """
+        futures = [self.submit_future(pool, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> Executor:
+    """获取全局执行器"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = Executor()
+        return _executor
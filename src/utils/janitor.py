@@ -0,0 +1,190 @@
+"""
+临时文件定期清理模块
+负责在运行期间限制临时目录的大小和文件存活时间，包括:
+- 每个目录单独设置最长保留时间和大小上限
+- 每次清理只对目录做一次 os.scandir
+- 跳过正在等待发送或识别的文件（文件租约）
+- 在统一调度器中定期执行，记录回收的字节数
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.services.scheduler import get_scheduler, IntervalTrigger
+from src.utils.cleanup import CleanupUtils
+from src.utils.metrics import metrics
+
+logger = logging.getLogger('main')
+
+# 清理间隔（秒）
+SWEEP_INTERVAL_SECONDS = 600
+# 最近修改时间在该秒数内的文件不清理（可能仍在写入）
+MIN_AGE_SECONDS = 120
+# 文件租约默认有效期（秒），持有方异常退出时租约自动失效
+DEFAULT_LEASE_SECONDS = 600
+# 统一调度器中的任务
+JOB_ID = "temp_file_janitor"
+JOB_GROUP = "janitor"
+
+
+@dataclass
+class DirectoryBudget:
+    """一个临时目录的清理规则（只处理目录下的文件，不进入子目录）"""
+    name: str
+    path: str
+    max_age_hours: float
+    max_mb: float
+
+
+class FileLeases:
+    """
+    正在使用的文件（等待发送、等待识别），清理时跳过
+
+    租约带有效期，持有方忘记释放时到期自动失效
+    """
+
+    def __init__(self):
+        self._leases: Dict[str, Tuple[int, float]] = {}  # 路径 -> (持有数, 到期时间)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def hold(self, path: str, ttl: float = DEFAULT_LEASE_SECONDS):
+        key = self._key(path)
+        with self._lock:
+            count, expires = self._leases.get(key, (0, 0.0))
+            self._leases[key] = (count + 1, max(expires, time.time() + ttl))
+
+    def release(self, path: str):
+        key = self._key(path)
+        with self._lock:
+            count, expires = self._leases.get(key, (0, 0.0))
+            if count <= 1:
+                self._leases.pop(key, None)
+            else:
+                self._leases[key] = (count - 1, expires)
+
+    @contextmanager
+    def lease(self, path: Optional[str], ttl: float = DEFAULT_LEASE_SECONDS):
+        """在 with 块内持有文件租约，path 为空时不做任何事"""
+        if not path:
+            yield
+            return
+        self.hold(path, ttl)
+        try:
+            yield
+        finally:
+            self.release(path)
+
+    def is_held(self, path: str) -> bool:
+        key = self._key(path)
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None:
+                return False
+            if lease[1] < time.time():
+                del self._leases[key]
+                return False
+            return True
+
+
+_file_leases = FileLeases()
+
+
+def get_file_leases() -> FileLeases:
+    """获取全局文件租约表"""
+    return _file_leases
+
+
+def default_budgets(root_dir: str) -> List[DirectoryBudget]:
+    """默认清理规则：生成的图片和语音、截图、wxauto 下载的文件"""
+    return [
+        DirectoryBudget("image_temp", os.path.join(root_dir, "data", "images", "temp"), 1, 200),
+        DirectoryBudget("voices", os.path.join(root_dir, "data", "voices"), 1, 100),
+        DirectoryBudget("screenshot", os.path.join(root_dir, "screenshot"), 1, 100),
+        DirectoryBudget("wxauto", os.path.join(root_dir, "wxautoFiles"), 24, 500),
+    ]
+
+
+class TempFileJanitor(CleanupUtils):
+    """运行期间定期清理临时目录，启动时的整体清理仍由 CleanupUtils 完成"""
+
+    def __init__(self, root_dir: str, budgets: Optional[List[DirectoryBudget]] = None,
+                 leases: Optional[FileLeases] = None):
+        super().__init__(root_dir)
+        self.budgets = budgets if budgets is not None else default_budgets(root_dir)
+        self.leases = leases or get_file_leases()
+
+    def sweep_directory(self, budget: DirectoryBudget, now: Optional[float] = None) -> Tuple[int, int]:
+        """
+        按规则清理一个目录：先删除过期文件，仍超过大小上限时从最旧的文件开始删除
+
+        Returns:
+            Tuple[int, int]: (删除的文件数, 回收的字节数)
+        """
+        now = now or time.time()
+        if not os.path.isdir(budget.path):
+            return 0, 0
+
+        files = []  # (修改时间, 大小, 路径)
+        with os.scandir(budget.path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+                except OSError:
+                    continue
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        max_age = budget.max_age_hours * 3600
+        max_bytes = budget.max_mb * 1024 * 1024
+        removed, reclaimed = 0, 0
+        for mtime, size, path in files:
+            age = now - mtime
+            expired = age > max_age
+            if not expired and total <= max_bytes:
+                # 文件按修改时间排序，后面的更新且目录已在上限内
+                break
+            if age < MIN_AGE_SECONDS or self.leases.is_held(path):
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                # 文件可能正被微信或发送方占用，下次再试
+                logger.debug(f"清理临时文件失败 {path}: {str(e)}")
+                continue
+            total -= size
+            removed += 1
+            reclaimed += size
+        metrics.set_gauge("janitor.dir_bytes", total, dir=budget.name)
+        return removed, reclaimed
+
+    def sweep(self):
+        """按所有规则清理一次"""
+        started = time.time()
+        for budget in self.budgets:
+            try:
+                removed, reclaimed = self.sweep_directory(budget, now=started)
+            except Exception as e:
+                logger.error(f"清理临时目录失败 {budget.path}: {str(e)}")
+                continue
+            if removed:
+                metrics.incr("janitor.files_removed", removed, dir=budget.name)
+                metrics.incr("janitor.bytes_reclaimed", reclaimed, dir=budget.name)
+                logger.info(f"已清理 {budget.path}: {removed} 个文件，{reclaimed / 1024 / 1024:.1f}MB")
+        metrics.observe("janitor.sweep_ms", (time.time() - started) * 1000)
+
+    def start(self, interval: float = SWEEP_INTERVAL_SECONDS):
+        """在统一调度器中定期清理"""
+        get_scheduler().add_job(self.sweep, IntervalTrigger(seconds=interval),
+                                job_id=JOB_ID, group=JOB_GROUP)
+        logger.info(f"临时文件清理已启动，间隔 {interval} 秒")
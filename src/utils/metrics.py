@@ -0,0 +1,145 @@
+"""
+运行指标模块
+提供进程内的轻量指标统计，包括:
+- 计数器
+- 耗时/数值分布统计
+- 瞬时值（gauge）
+- 文本报告输出（供调试命令查看）
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+def _make_key(name: str, labels: Dict[str, str]) -> str:
+    """将指标名和标签拼接为唯一键"""
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{label_str}}}"
+
+
+class _Distribution:
+    """数值分布统计，保留最近的样本用于计算分位数"""
+
+    def __init__(self, max_samples: int = 512):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "sum": self.total,
+        }
+
+
+class MetricsRegistry:
+    """线程安全的指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._distributions: Dict[str, _Distribution] = {}
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """计数器累加"""
+        key = _make_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """设置瞬时值"""
+        key = _make_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """记录一次数值观测（如耗时、token数）"""
+        key = _make_key(name, labels)
+        with self._lock:
+            dist = self._distributions.get(key)
+            if dist is None:
+                dist = self._distributions[key] = _Distribution()
+            dist.add(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """统计代码块耗时（毫秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000, **labels)
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_make_key(name, labels), 0)
+
+    def get_gauge(self, name: str, default: Optional[float] = None, **labels) -> Optional[float]:
+        with self._lock:
+            return self._gauges.get(_make_key(name, labels), default)
+
+    def get_distribution(self, name: str, **labels) -> Optional[dict]:
+        with self._lock:
+            dist = self._distributions.get(_make_key(name, labels))
+            return dist.to_dict() if dist else None
+
+    def snapshot(self) -> dict:
+        """获取所有指标的快照"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "distributions": {k: v.to_dict() for k, v in self._distributions.items()},
+            }
+
+    def format_report(self, prefix: str = "") -> str:
+        """生成可读的指标报告"""
+        snap = self.snapshot()
+        lines = []
+        for key, value in sorted(snap["counters"].items()):
+            if key.startswith(prefix):
+                lines.append(f"{key} = {value:g}")
+        for key, value in sorted(snap["gauges"].items()):
+            if key.startswith(prefix):
+                lines.append(f"{key} = {value:g}")
+        for key, dist in sorted(snap["distributions"].items()):
+            if key.startswith(prefix):
+                lines.append(
+                    f"{key}: n={dist['count']} avg={dist['avg']:.1f} "
+                    f"p50={dist['p50']:.1f} p99={dist['p99']:.1f} max={dist['max']:.1f}"
+                )
+        return "\n".join(lines) if lines else "(暂无指标)"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._distributions.clear()
+
+
+# 全局指标实例，统一通过 src.utils.metrics 导入
+metrics = MetricsRegistry()
@@ -1,11 +1,33 @@
 import os
 import shutil
+import zipfile
 from flask import Blueprint, jsonify, request
 from pathlib import Path
+from src.utils.asset_store import AssetStore
 
 avatar_bp = Blueprint('avatar', __name__)
 
 AVATARS_DIR = Path('data/avatars')
+ASSETS_DIR = Path('data/assets')
+
+_asset_store = None
+
+def get_asset_store():
+    """表情包资源库（各人设的表情包以硬链接共用同一份文件）"""
+    global _asset_store
+    if _asset_store is None:
+        _asset_store = AssetStore(str(ASSETS_DIR))
+    return _asset_store
+
+def resolve_avatar_dir(avatar_name):
+    """把人设名称解析为 AVATARS_DIR 下的直接子目录，名称含路径（如 ../）时返回 None"""
+    if not avatar_name:
+        return None
+    root = AVATARS_DIR.resolve()
+    avatar_dir = (root / avatar_name).resolve()
+    if avatar_dir.parent != root:
+        return None
+    return avatar_dir
 
 def parse_md_content(content):
     """解析markdown内容为字典格式"""
@@ -66,7 +88,9 @@ def load_avatar_content():
         return jsonify({'status': 'error', 'message': '未指定人设名称'})
         
     try:
-        avatar_dir = AVATARS_DIR / avatar
+        avatar_dir = resolve_avatar_dir(avatar)
+        if avatar_dir is None:
+            return jsonify({'status': 'error', 'message': '无效的人设名称'})
         avatar_file = avatar_dir / 'avatar.md'
         
         if not avatar_file.exists():
@@ -90,18 +114,27 @@ def create_avatar():
     try:
         data = request.get_json()
         avatar_name = data.get('avatar_name')
+        # 可选：沿用已有人设的表情包（硬链接，不复制文件）
+        template_avatar = data.get('template_avatar')
         
         if not avatar_name:
             return jsonify({'status': 'error', 'message': '未提供人设名称'})
             
         # 创建人设目录
-        avatar_dir = AVATARS_DIR / avatar_name
+        avatar_dir = resolve_avatar_dir(avatar_name)
+        if avatar_dir is None:
+            return jsonify({'status': 'error', 'message': '无效的人设名称'})
         if avatar_dir.exists():
             return jsonify({'status': 'error', 'message': '该人设已存在'})
+        template_dir = resolve_avatar_dir(template_avatar) if template_avatar else None
+        if template_avatar and (template_dir is None or not template_dir.is_dir()):
+            return jsonify({'status': 'error', 'message': '模板人设不存在'})
             
         # 创建目录结构
         avatar_dir.mkdir(parents=True)
         (avatar_dir / 'emojis').mkdir()
+        if template_avatar:
+            get_asset_store().clone(str(template_dir), str(avatar_dir))
         
         # 创建avatar.md文件
         avatar_file = avatar_dir / 'avatar.md'
@@ -146,16 +179,66 @@ def delete_avatar():
         if not avatar_name:
             return jsonify({'status': 'error', 'message': '未提供人设名称'})
             
-        avatar_dir = AVATARS_DIR / avatar_name
+        avatar_dir = resolve_avatar_dir(avatar_name)
+        if avatar_dir is None:
+            return jsonify({'status': 'error', 'message': '无效的人设名称'})
         if not avatar_dir.exists():
             return jsonify({'status': 'error', 'message': '人设不存在'})
             
-        # 删除整个人设目录
+        # 删除整个人设目录，再清理不再被任何人设引用的表情包
         shutil.rmtree(avatar_dir)
+        get_asset_store().gc(str(AVATARS_DIR))
         return jsonify({'status': 'success', 'message': '人设已删除'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+@avatar_bp.route('/import_emoji_pack', methods=['POST'])
+def import_emoji_pack():
+    """导入表情包压缩包（结构为 <情感>/<文件>），重复文件只保存一份"""
+    try:
+        avatar_name = request.form.get('avatar')
+        pack = request.files.get('file')
+        
+        if not avatar_name:
+            return jsonify({'status': 'error', 'message': '未提供人设名称'})
+        if pack is None:
+            return jsonify({'status': 'error', 'message': '未上传压缩包'})
+            
+        avatar_dir = resolve_avatar_dir(avatar_name)
+        if avatar_dir is None:
+            return jsonify({'status': 'error', 'message': '无效的人设名称'})
+        if not avatar_dir.exists():
+            return jsonify({'status': 'error', 'message': '人设目录不存在'})
+            
+        result = get_asset_store().import_zip(str(avatar_dir), pack.stream)
+        return jsonify({
+            'status': 'success',
+            'added': result.added,
+            'duplicates': result.duplicates,
+            'rejected': result.rejected
+        })
+    except zipfile.BadZipFile:
+        return jsonify({'status': 'error', 'message': '不是有效的压缩包'})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@avatar_bp.route('/dedupe_emojis', methods=['POST'])
+def dedupe_emojis():
+    """把所有人设的表情包收入资源库，相同文件只保留一份"""
+    try:
+        store = get_asset_store()
+        total = 0
+        if not AVATARS_DIR.is_dir():
+            return jsonify({'status': 'success', 'files': 0})
+        for entry in AVATARS_DIR.iterdir():
+            # 与其他接口一样解析并校验目录，跳过指向人设根目录以外的链接
+            avatar_dir = resolve_avatar_dir(entry.name)
+            if avatar_dir and (avatar_dir / 'emojis').is_dir():
+                total += len(store.adopt(str(avatar_dir)))
+        return jsonify({'status': 'success', 'files': total})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
 @avatar_bp.route('/save_avatar', methods=['POST'])
 def save_avatar():
     """保存人设设定"""
@@ -166,7 +249,9 @@ def save_avatar():
         return jsonify({'status': 'error', 'message': '未提供人设名称'})
         
     try:
-        avatar_dir = AVATARS_DIR / avatar_name
+        avatar_dir = resolve_avatar_dir(avatar_name)
+        if avatar_dir is None:
+            return jsonify({'status': 'error', 'message': '无效的人设名称'})
         avatar_file = avatar_dir / 'avatar.md'
         
         if not avatar_dir.exists():
@@ -219,7 +304,9 @@ def save_avatar_raw():
         if content is None:
             return jsonify({'status': 'error', 'message': '未提供内容'})
             
-        avatar_dir = AVATARS_DIR / avatar_name
+        avatar_dir = resolve_avatar_dir(avatar_name)
+        if avatar_dir is None:
+            return jsonify({'status': 'error', 'message': '无效的人设名称'})
         avatar_file = avatar_dir / 'avatar.md'
         
         if not avatar_dir.exists():
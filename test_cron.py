@@ -0,0 +1,129 @@
+"""
+cron 表达式测试模块
+测试 crontab 表达式的解析和下一次执行时间计算，包括:
+- 字段解析、名称和范围校验
+- 步长、区间、列表
+- 日和周的交集/并集规则
+- 永不匹配的表达式
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from src.services.cron import CronExpression
+
+
+def brute_force_next(expression: str, after: datetime) -> datetime:
+    """逐分钟查找下一次执行时间，作为对照"""
+    cron = CronExpression(expression)
+    fields = expression.split()
+    restricted = not (fields[2].startswith("*") or fields[4].startswith("*"))
+    dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    while True:
+        day_ok = bool(cron.days >> dt.day & 1)
+        weekday_ok = bool(cron.weekdays >> ((dt.weekday() + 1) % 7) & 1)
+        day_match = (day_ok or weekday_ok) if restricted else (day_ok and weekday_ok)
+        if (cron.months >> dt.month & 1 and day_match
+                and cron.hours >> dt.hour & 1 and cron.minutes >> dt.minute & 1):
+            return dt
+        dt += timedelta(minutes=1)
+
+
+class CronExpressionTests(unittest.TestCase):
+    """cron 表达式测试类"""
+
+    def setUp(self):
+        # 2026-10-19 是周一
+        self.now = datetime(2026, 10, 19, 10, 7, 30)
+
+    def test_every_minute(self):
+        """每分钟执行时取下一分钟，秒清零"""
+        self.assertEqual(CronExpression("* * * * *").next_after(self.now),
+                         datetime(2026, 10, 19, 10, 8))
+
+    def test_fixed_time_rolls_to_next_day(self):
+        """当天时刻已过时顺延到次日"""
+        self.assertEqual(CronExpression("0 9 * * *").next_after(self.now),
+                         datetime(2026, 10, 20, 9, 0))
+
+    def test_minute_step_and_offset(self):
+        """*/15 和 5/20 两种步长写法"""
+        self.assertEqual(CronExpression("*/15 * * * *").next_after(self.now),
+                         datetime(2026, 10, 19, 10, 15))
+        self.assertEqual(CronExpression("5/20 * * * *").next_after(self.now),
+                         datetime(2026, 10, 19, 10, 25))
+
+    def test_weekday_range(self):
+        """工作日区间，周五之后跳到下周一"""
+        friday = datetime(2026, 10, 23, 18, 0)
+        self.assertEqual(CronExpression("30 9 * * 1-5").next_after(friday),
+                         datetime(2026, 10, 26, 9, 30))
+
+    def test_names_and_sunday_alias(self):
+        """月份、星期名称，7 和 0 都表示周日"""
+        self.assertEqual(CronExpression("0 8 * * sun").next_after(self.now),
+                         datetime(2026, 10, 25, 8, 0))
+        self.assertEqual(CronExpression("0 8 * * 7").next_after(self.now),
+                         datetime(2026, 10, 25, 8, 0))
+        self.assertEqual(CronExpression("0 0 1 jan *").next_after(self.now),
+                         datetime(2027, 1, 1, 0, 0))
+
+    def test_day_of_month_step(self):
+        """日期字段的 */2 取奇数日"""
+        self.assertEqual(CronExpression("0 0 */2 * *").next_after(self.now),
+                         datetime(2026, 10, 21, 0, 0))
+        self.assertEqual(CronExpression("0 0 */2 * *").next_after(datetime(2026, 10, 31, 12, 0)),
+                         datetime(2026, 11, 1, 0, 0))
+
+    def test_day_of_month_step_with_weekday_is_intersection(self):
+        """日期以 * 开头（*/2）时视为不限定，与星期取交集：奇数日且是周一"""
+        self.assertEqual(CronExpression("0 0 */2 * 1").next_after(self.now),
+                         datetime(2026, 11, 9, 0, 0))
+
+    def test_restricted_day_and_weekday_is_union(self):
+        """日期和星期都限定时取并集：每月1号或者每周五"""
+        cron = CronExpression("0 12 1 * 5")
+        self.assertEqual(cron.next_after(self.now), datetime(2026, 10, 23, 12, 0))
+        self.assertEqual(cron.next_after(datetime(2026, 10, 30, 12, 0)), datetime(2026, 11, 1, 12, 0))
+
+    def test_month_without_day_31(self):
+        """没有31号的月份被跳过"""
+        self.assertEqual(CronExpression("0 0 31 * *").next_after(self.now),
+                         datetime(2026, 10, 31, 0, 0))
+        self.assertEqual(CronExpression("0 0 31 * *").next_after(datetime(2026, 10, 31, 0, 0)),
+                         datetime(2026, 12, 31, 0, 0))
+
+    def test_leap_day(self):
+        """2月29日只在闰年执行"""
+        self.assertEqual(CronExpression("0 0 29 2 *").next_after(self.now),
+                         datetime(2028, 2, 29, 0, 0))
+
+    def test_never_matches(self):
+        """2月30日永不执行"""
+        self.assertIsNone(CronExpression("0 0 30 2 *").next_after(self.now))
+
+    def test_matches_brute_force(self):
+        """与逐分钟查找的结果一致"""
+        expressions = [
+            "0 0 */2 * *", "0 0 */2 * 1", "0 0 */2 * */2", "0 12 1,15 * 5",
+            "30 9 * * 1-5", "*/15 * * 2 *", "0 0 1 * 1", "5/20 3 * * 0", "0 18 * 3-5 sat",
+        ]
+        for expression in expressions:
+            after = self.now
+            for _ in range(5):
+                expected = brute_force_next(expression, after)
+                with self.subTest(expression=expression, after=after):
+                    self.assertEqual(CronExpression(expression).next_after(after), expected)
+                after = expected
+
+    def test_invalid_expressions(self):
+        """字段数、范围、步长、名称错误时抛出 ValueError"""
+        for expression in ["* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *",
+                           "* * * 13 *", "*/0 * * * *", "* * * * funday", "5-1 * * * *", "1,,2 * * * *"]:
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    CronExpression(expression)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+群聊合并回复测试模块
+测试多位成员同时@机器人时的合并和拆分，包括:
+- 按成员整理消息
+- 合并请求的提示内容
+- 结构化回复的拆分和漏答成员
+"""
+
+import unittest
+
+from src.handlers.group_aggregation import (
+    group_entries, build_group_prompt, split_group_reply, missing_senders
+)
+
+
+class GroupAggregationTests(unittest.TestCase):
+    """群聊合并回复测试类"""
+
+    def setUp(self):
+        self.entries = [("张三", "在吗"), ("李四", "今天吃什么"), ("张三", "问个问题")]
+        self.senders = ["张三", "李四", "王五"]
+
+    def test_group_entries_keeps_first_speaker_order(self):
+        """按成员首次发言顺序整理消息"""
+        grouped = group_entries(self.entries)
+        self.assertEqual(list(grouped), ["张三", "李四"])
+        self.assertEqual(grouped["张三"], ["在吗", "问个问题"])
+
+    def test_prompt_lists_every_sender(self):
+        """提示中每位成员一段"""
+        prompt = build_group_prompt("2026-10-19 10:00:00", self.entries)
+        self.assertTrue(prompt.startswith("[2026-10-19 10:00:00]"))
+        self.assertIn("[[张三]] 在吗\n问个问题", prompt)
+        self.assertIn("[[李四]] 今天吃什么", prompt)
+
+    def test_split_segments(self):
+        """按成员标记拆分，漏答的成员单独列出"""
+        segments = split_group_reply("[[张三]] 你好呀\n[[李四]] 吃面吧", self.senders)
+        self.assertEqual(segments, [("张三", "你好呀"), ("李四", "吃面吧")])
+        self.assertEqual(missing_senders(segments, self.senders), ["王五"])
+
+    def test_unknown_and_empty_segments_are_dropped(self):
+        """虚构的成员和空段落被丢弃"""
+        segments = split_group_reply("[[赵六]] 胡说\n[[张三]]\n[[李四]] 好的", self.senders)
+        self.assertEqual(segments, [("李四", "好的")])
+        self.assertEqual(missing_senders(segments, self.senders), ["张三", "王五"])
+
+    def test_unstructured_reply_goes_to_everyone(self):
+        """没有成员标记时整段回复发给全部成员，不算漏答"""
+        segments = split_group_reply("大家好", self.senders)
+        self.assertEqual(segments, [("张三 @李四 @王五", "大家好")])
+        self.assertEqual(missing_senders(segments, self.senders), [])
+
+    def test_empty_reply(self):
+        """空回复时所有成员都算漏答"""
+        segments = split_group_reply("  ", self.senders)
+        self.assertEqual(segments, [])
+        self.assertEqual(missing_senders(segments, self.senders), self.senders)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+消息接入测试模块
+测试重连后的重复消息过滤和@机器人匹配，包括:
+- 平时不去重
+- 重连窗口内丢弃重连前接收过的消息，每条只抵消一次
+- 窗口和回溯范围之外不去重
+"""
+
+import unittest
+
+from src.handlers.ingest import MessageDeduplicator, compile_mention_pattern
+
+
+class MessageDeduplicatorTests(unittest.TestCase):
+    """重复消息过滤测试类"""
+
+    def setUp(self):
+        self.dedup = MessageDeduplicator(reconnect_window=30, lookback=120)
+
+    def test_no_dedupe_without_reconnect(self):
+        """没有重连时相同消息都接收"""
+        self.assertFalse(self.dedup.is_duplicate("chat", "张三", "哈哈", now=100))
+        self.assertFalse(self.dedup.is_duplicate("chat", "张三", "哈哈", now=101))
+
+    def test_replay_after_reconnect_is_dropped_once(self):
+        """重连后重放的旧消息丢弃一次，之后再发相同内容正常接收"""
+        self.assertFalse(self.dedup.is_duplicate("chat", "张三", "在吗", now=100))
+        self.dedup.mark_reconnect(now=110)
+        self.assertTrue(self.dedup.is_duplicate("chat", "张三", "在吗", now=112))
+        self.assertFalse(self.dedup.is_duplicate("chat", "张三", "在吗", now=113))
+
+    def test_fingerprint_includes_chat_and_sender(self):
+        """不同聊天或不同发送者的相同内容不算重复"""
+        self.dedup.is_duplicate("chat", "张三", "在吗", now=100)
+        self.dedup.mark_reconnect(now=110)
+        self.assertFalse(self.dedup.is_duplicate("chat", "李四", "在吗", now=111))
+        self.assertFalse(self.dedup.is_duplicate("other", "张三", "在吗", now=111))
+
+    def test_outside_window_or_lookback(self):
+        """重连窗口结束后、或重连很久之前接收的消息，不去重"""
+        self.dedup.is_duplicate("chat", "张三", "早", now=0)
+        self.dedup.is_duplicate("chat", "张三", "晚", now=100)
+        self.dedup.mark_reconnect(now=200)
+        self.assertFalse(self.dedup.is_duplicate("chat", "张三", "早", now=201))
+        self.assertFalse(self.dedup.is_duplicate("chat", "张三", "晚", now=231))
+
+    def test_non_identifying_content_is_never_duplicate(self):
+        """动画表情占位文本不参与去重"""
+        self.dedup.is_duplicate("chat", "张三", "[动画表情]", now=100)
+        self.dedup.mark_reconnect(now=110)
+        self.assertFalse(self.dedup.is_duplicate("chat", "张三", "[动画表情]", now=111))
+
+    def test_capacity_evicts_oldest(self):
+        """超过容量时淘汰最久的指纹"""
+        dedup = MessageDeduplicator(reconnect_window=30, lookback=120, capacity=2)
+        for index, content in enumerate(["一", "二", "三"]):
+            dedup.is_duplicate("chat", "张三", content, now=100 + index)
+        dedup.mark_reconnect(now=110)
+        self.assertFalse(dedup.is_duplicate("chat", "张三", "一", now=111))
+        self.assertTrue(dedup.is_duplicate("chat", "张三", "三", now=111))
+
+
+class MentionPatternTests(unittest.TestCase):
+    """@机器人匹配测试类"""
+
+    def test_mention(self):
+        """名称为空时不匹配，require_at 时必须带 @"""
+        self.assertIsNone(compile_mention_pattern(""))
+        loose = compile_mention_pattern("小助手")
+        strict = compile_mention_pattern("小助手", require_at=True)
+        self.assertEqual(loose.sub("", "@小助手\u2005你好"), "你好")
+        self.assertEqual(strict.sub("", "小助手\u2005你好"), "小助手\u2005你好")
+        self.assertEqual(strict.sub("", "@小助手\u2005你好"), "你好")
+
+
+if __name__ == "__main__":
+    unittest.main()
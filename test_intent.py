@@ -0,0 +1,102 @@
+"""
+意图识别测试模块
+测试一次扫描的意图路由，包括:
+- 关键词自动机
+- 合并正则与逐个意图确认
+- 自定义关键词和正则
+- 无法合并的正则被忽略而不是导致初始化失败
+"""
+
+import unittest
+
+from src.handlers.intent import (
+    AhoCorasick, IntentRouter,
+    INTENT_VOICE, INTENT_RANDOM_IMAGE, INTENT_IMAGE_GENERATION, INTENT_DEBUG, INTENT_REMINDER
+)
+
+
+class AhoCorasickTests(unittest.TestCase):
+    """关键词自动机测试类"""
+
+    def test_overlapping_keywords(self):
+        """重叠和互为后缀的关键词都能命中"""
+        automaton = AhoCorasick()
+        automaton.add("he", "a")
+        automaton.add("she", "b")
+        automaton.add("hers", "c")
+        automaton.add("his", "d")
+        self.assertEqual(automaton.search("ushers"), {"a", "b", "c"})
+        self.assertEqual(automaton.search("this"), {"d"})
+        self.assertEqual(automaton.search("xyz"), set())
+
+
+class IntentRouterTests(unittest.TestCase):
+    """意图路由测试类"""
+
+    def setUp(self):
+        self.router = IntentRouter()
+
+    def test_keywords(self):
+        """默认关键词"""
+        self.assertEqual(self.router.route("发条语音给我"), {INTENT_VOICE})
+        self.assertEqual(self.router.route("来张图看看"), {INTENT_RANDOM_IMAGE})
+        self.assertIn(INTENT_REMINDER, self.router.route("十分钟后提醒我喝水"))
+
+    def test_patterns(self):
+        """默认正则"""
+        self.assertIn(INTENT_IMAGE_GENERATION, self.router.route("你能帮我把这只猫画出来吗"))
+        self.assertEqual(self.router.route("/help"), {INTENT_DEBUG})
+
+    def test_multiple_intents(self):
+        """一条消息命中多个意图"""
+        intents = self.router.route("/draw 帮我画一只猫，十分钟后提醒我")
+        self.assertTrue({INTENT_DEBUG, INTENT_IMAGE_GENERATION, INTENT_REMINDER} <= intents)
+
+    def test_overlapping_pattern_matches_are_confirmed(self):
+        """一个意图的匹配占用了文本时，其他意图仍被识别"""
+        router = IntentRouter(patterns={"a": [r"ab.*"], "b": [r"bc"]})
+        self.assertTrue({"a", "b"} <= router.route("abc"))
+
+    def test_plain_message(self):
+        """普通消息和空消息没有意图"""
+        self.assertEqual(self.router.route("今天天气不错"), set())
+        self.assertEqual(self.router.route(""), set())
+
+    def test_custom_keywords_and_patterns(self):
+        """构造时和运行时追加的关键词、正则"""
+        router = IntentRouter(keywords={"weather": ["天气"]}, patterns={"order": [r"下单\d+"]})
+        self.assertEqual(router.route("今天天气不错"), {"weather"})
+        self.assertEqual(router.route("下单42"), {"order"})
+        router.add_keywords("greeting", ["早安"])
+        router.add_patterns("farewell", [r"晚安$"])
+        self.assertEqual(router.route("早安"), {"greeting"})
+        self.assertEqual(router.route("大家晚安"), {"farewell"})
+
+    def test_keywords_are_case_insensitive(self):
+        """关键词匹配不区分大小写"""
+        router = IntentRouter(keywords={"greeting": ["Hello"]})
+        self.assertEqual(router.route("HELLO there"), {"greeting"})
+
+    def test_unmergeable_patterns_are_skipped(self):
+        """全局标记、编号引用和无效正则被忽略，其余正则正常工作"""
+        with self.assertLogs("main", level="WARNING"):
+            router = IntentRouter(patterns={"x": ["(?i)hello", r"(a)\1", "(", "bye"]})
+        self.assertEqual(router.route("bye"), {"x"})
+        self.assertEqual(router.route("hello aa"), set())
+
+    def test_scoped_flags_are_allowed(self):
+        """局部标记可以合并"""
+        router = IntentRouter(patterns={"x": ["(?i:hello)"]})
+        self.assertEqual(router.route("HELLO"), {"x"})
+
+    def test_duplicate_group_names_fall_back_to_per_intent(self):
+        """不同意图使用同名分组时合并失败，退回逐个意图匹配"""
+        with self.assertLogs("main", level="WARNING"):
+            router = IntentRouter(patterns={"x": ["(?P<n>foo)"], "y": ["(?P<n>bar)"]})
+        self.assertEqual(router.route("foo"), {"x"})
+        self.assertEqual(router.route("bar"), {"y"})
+        self.assertEqual(router.route("/help"), {INTENT_DEBUG})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+统一调度器测试模块
+测试截止时间堆调度器，包括:
+- 一次性、固定间隔、cron 触发器
+- 按到期时间顺序执行
+- 移除、替换任务后旧的堆条目不再触发
+- 分组管理
+"""
+
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from src.services.scheduler import Scheduler, DateTrigger, IntervalTrigger, CronTrigger
+
+
+class TriggerTests(unittest.TestCase):
+    """触发器测试类"""
+
+    def test_date_trigger_fires_once(self):
+        """一次性触发器只返回一次执行时间"""
+        run_date = datetime(2026, 10, 19, 12, 0)
+        trigger = DateTrigger(run_date)
+        self.assertEqual(trigger.next_fire_time(None, datetime(2026, 10, 19, 10, 0)), run_date)
+        self.assertIsNone(trigger.next_fire_time(run_date, run_date))
+
+    def test_interval_trigger_skips_missed_periods(self):
+        """固定间隔触发器不补跑错过的周期"""
+        trigger = IntervalTrigger(seconds=60)
+        previous = datetime(2026, 10, 19, 10, 0)
+        self.assertEqual(trigger.next_fire_time(previous, previous), previous + timedelta(seconds=60))
+        late = previous + timedelta(seconds=150)
+        self.assertEqual(trigger.next_fire_time(previous, late), previous + timedelta(seconds=180))
+
+    def test_interval_trigger_rejects_non_positive(self):
+        """间隔必须大于0"""
+        with self.assertRaises(ValueError):
+            IntervalTrigger(seconds=0)
+
+    def test_cron_trigger_counts_from_now(self):
+        """cron 触发器从当前时间往后计算，停机期间错过的执行不补跑"""
+        trigger = CronTrigger("0 * * * *")
+        previous = datetime(2026, 10, 19, 8, 0)
+        now = datetime(2026, 10, 19, 10, 30)
+        self.assertEqual(trigger.next_fire_time(previous, now), datetime(2026, 10, 19, 11, 0))
+
+
+class SchedulerTests(unittest.TestCase):
+    """调度器测试类"""
+
+    def setUp(self):
+        self.scheduler = Scheduler(max_workers=2)
+        self.runs = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.scheduler.shutdown(wait=True)
+
+    def record(self, name):
+        with self.lock:
+            self.runs.append(name)
+
+    def wait_for(self, count, timeout=3.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.lock:
+                if len(self.runs) >= count:
+                    return
+            time.sleep(0.01)
+
+    def test_jobs_run_in_deadline_order(self):
+        """后添加但先到期的任务先执行"""
+        self.scheduler = Scheduler(max_workers=1)
+        self.scheduler.call_later(0.4, self.record, "late", job_id="late")
+        self.scheduler.call_later(0.1, self.record, "early", job_id="early")
+        self.scheduler.call_later(0.25, self.record, "middle", job_id="middle")
+        self.wait_for(3)
+        self.assertEqual(self.runs, ["early", "middle", "late"])
+        self.assertEqual(self.scheduler.get_jobs(), [])
+
+    def test_removed_job_does_not_fire(self):
+        """移除的任务在出堆时丢弃"""
+        self.scheduler.call_later(0.1, self.record, "removed", job_id="job")
+        self.assertTrue(self.scheduler.remove_job("job"))
+        self.scheduler.call_later(0.2, self.record, "kept", job_id="other")
+        self.wait_for(1)
+        time.sleep(0.1)
+        self.assertEqual(self.runs, ["kept"])
+
+    def test_replaced_job_uses_new_schedule(self):
+        """同ID重新添加后，旧的堆条目不会提前触发新任务"""
+        self.scheduler.call_later(0.1, self.record, "old", job_id="job")
+        self.scheduler.remove_job("job")
+        self.scheduler.call_later(0.5, self.record, "new", job_id="job")
+        time.sleep(0.3)
+        self.assertEqual(self.runs, [])
+        self.wait_for(1)
+        self.assertEqual(self.runs, ["new"])
+
+    def test_interval_job_repeats(self):
+        """固定间隔任务重复执行直到移除"""
+        self.scheduler.add_job(self.record, IntervalTrigger(seconds=0.1), args=("tick",), job_id="tick")
+        self.wait_for(3)
+        self.scheduler.remove_job("tick")
+        with self.lock:
+            count = len(self.runs)
+        time.sleep(0.3)
+        self.assertGreaterEqual(count, 3)
+        self.assertLessEqual(len(self.runs), count + 1)
+
+    def test_remove_group(self):
+        """按分组移除任务"""
+        self.scheduler.call_later(10, self.record, "a", group="reminder")
+        self.scheduler.call_later(10, self.record, "b", group="reminder")
+        self.scheduler.call_later(10, self.record, "c", group="other")
+        self.assertEqual(self.scheduler.remove_group("reminder"), 2)
+        self.assertEqual([job.group for job in self.scheduler.get_jobs()], ["other"])
+
+    def test_past_date_job_is_ignored(self):
+        """没有下一次执行时间的任务不加入调度"""
+        class NeverTrigger:
+            def next_fire_time(self, previous, now):
+                return None
+
+        self.scheduler.add_job(self.record, NeverTrigger(), args=("never",), job_id="never")
+        self.assertIsNone(self.scheduler.get_job("never"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+本地时间解析测试模块
+测试提醒消息的本地中文时间解析，包括:
+- 相对时间和绝对时间
+- 提醒内容提取
+- 需要交给 LLM 判断的不确定情况
+- 无提醒意图或无时间线索的消息
+"""
+
+import unittest
+from datetime import datetime
+
+from modules.reminder.time_recognition import (
+    LocalTimeParser, chinese_to_int, PARSE_OK, PARSE_AMBIGUOUS, PARSE_NOT_TIME_RELATED
+)
+
+
+class ChineseNumberTests(unittest.TestCase):
+    """中文数字转换测试类"""
+
+    def test_numbers(self):
+        """中文和阿拉伯数字"""
+        cases = {"15": 15, "两": 2, "十": 10, "十五": 15, "二十三": 23, "一百零五": 105, "三十": 30}
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(chinese_to_int(text), expected)
+
+    def test_invalid(self):
+        """无法识别时返回 None"""
+        self.assertIsNone(chinese_to_int(""))
+        self.assertIsNone(chinese_to_int("半"))
+
+
+class LocalTimeParserTests(unittest.TestCase):
+    """本地时间解析测试类"""
+
+    def setUp(self):
+        self.parser = LocalTimeParser()
+        # 2026-10-19 周一 上午10点
+        self.now = datetime(2026, 10, 19, 10, 0)
+
+    def assertParsed(self, text, expected):
+        status, reminders = self.parser.parse(text, self.now)
+        self.assertEqual(status, PARSE_OK, text)
+        self.assertEqual(reminders, expected, text)
+
+    def assertStatus(self, text, expected_status):
+        status, reminders = self.parser.parse(text, self.now)
+        self.assertEqual(status, expected_status, text)
+        self.assertIsNone(reminders, text)
+
+    def test_relative_time(self):
+        """相对时间"""
+        self.assertParsed("三分钟后提醒我喝水", [(datetime(2026, 10, 19, 10, 3), "喝水")])
+        self.assertParsed("一个半小时后叫我", [(datetime(2026, 10, 19, 11, 30), "叫我")])
+        self.assertParsed("过十分钟提醒我关火", [(datetime(2026, 10, 19, 10, 10), "关火")])
+
+    def test_content_keeps_leading_characters(self):
+        """提醒内容按整词去掉"我""一下"和语气词，不误删内容里的字"""
+        self.assertParsed("提醒我30分钟后下楼", [(datetime(2026, 10, 19, 10, 30), "下楼")])
+        self.assertParsed("提醒我一下十分钟后喝水哦", [(datetime(2026, 10, 19, 10, 10), "喝水")])
+        self.assertParsed("三分钟后提醒我下载一下文件吧",
+                          [(datetime(2026, 10, 19, 10, 3), "下载一下文件")])
+
+    def test_absolute_time(self):
+        """日期、时段和时刻"""
+        self.assertParsed("明天早上八点提醒我开会", [(datetime(2026, 10, 20, 8, 0), "开会")])
+        self.assertParsed("下午三点半提醒我取快递", [(datetime(2026, 10, 19, 15, 30), "取快递")])
+        self.assertParsed("下周三晚上7点提醒我交作业", [(datetime(2026, 10, 28, 19, 0), "交作业")])
+        self.assertParsed("21:30提醒我睡觉", [(datetime(2026, 10, 19, 21, 30), "睡觉")])
+
+    def test_clock_without_date_picks_next_occurrence(self):
+        """没有日期和时段时取最近的未来时刻"""
+        self.assertParsed("提醒我三点钟开会", [(datetime(2026, 10, 19, 15, 0), "开会")])
+        self.assertParsed("提醒我九点半开会", [(datetime(2026, 10, 19, 21, 30), "开会")])
+
+    def test_content_before_keyword(self):
+        """内容在关键词之前"""
+        self.assertParsed("明天下午三点开会记得提醒我", [(datetime(2026, 10, 20, 15, 0), "开会")])
+
+    def test_multiple_reminders(self):
+        """一条消息多个提醒"""
+        self.assertParsed("三分钟后提醒我喝水，五分钟后提醒我吃饭", [
+            (datetime(2026, 10, 19, 10, 3), "喝水"),
+            (datetime(2026, 10, 19, 10, 5), "吃饭"),
+        ])
+
+    def test_bare_dian_is_not_a_clock(self):
+        """没有时段和日期的"数字+点"不当作时刻"""
+        self.assertStatus("提醒我喝一点水", PARSE_AMBIGUOUS)
+        self.assertStatus("提醒我三点开会", PARSE_AMBIGUOUS)
+
+    def test_weak_triggers_are_ambiguous(self):
+        """只有"记得""别忘了"触发时交给 LLM"""
+        self.assertStatus("记得明天下午三点开会", PARSE_AMBIGUOUS)
+        self.assertStatus("别忘了明天三点开会", PARSE_AMBIGUOUS)
+
+    def test_past_markers_are_ambiguous(self):
+        """提到过去的时间时交给 LLM"""
+        self.assertStatus("上次你提醒我明天三点交报告", PARSE_AMBIGUOUS)
+        self.assertStatus("提醒我昨天说的那件事明天三点办", PARSE_AMBIGUOUS)
+
+    def test_fuzzy_time_is_ambiguous(self):
+        """模糊时间交给 LLM"""
+        self.assertStatus("待会提醒我洗衣服", PARSE_AMBIGUOUS)
+        self.assertStatus("明天提醒我洗衣服", PARSE_AMBIGUOUS)
+
+    def test_not_time_related(self):
+        """没有提醒意图，或有意图但没有任何时间线索"""
+        self.assertStatus("今天天气不错", PARSE_NOT_TIME_RELATED)
+        self.assertStatus("提醒我喝水", PARSE_NOT_TIME_RELATED)
+        self.assertStatus("记得吃饭", PARSE_NOT_TIME_RELATED)
+
+    def test_timestamp_prefix_is_ignored(self):
+        """消息队列加上的时间戳不参与解析"""
+        self.assertParsed("[2026-10-19 10:00:00]\n三分钟后提醒我喝水",
+                          [(datetime(2026, 10, 19, 10, 3), "喝水")])
+
+
+if __name__ == "__main__":
+    unittest.main()